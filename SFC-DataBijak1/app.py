@@ -147,98 +147,388 @@
 # if __name__ == '__main__':
 #     application = create_app()
 #     application.run(debug=True, host='0.0.0.0', port=5000)
-from flask import Flask, render_template, jsonify, request
-from models import db, UserSession
+import threading
+from functools import wraps
+from importlib.metadata import version
+from flask import Flask, render_template, jsonify, request, url_for
+from models import db, UserSession, upgrade_schema
 from data_loader import loader, TOP_TICKERS
+from cache import LRUCache
+import storage
+from responses import data_etag, frame_columns, json_response, not_modified
+from listing import format_cursor, parse_cursor
+from jobs import JobRunner, get_job
+from pipeline_stub import run_pipeline
 from config import MONGO_URI  # Optional Mongo
-import plotly.graph_objects as go
-import plotly.express as px
-from plotly.subplots import make_subplots
-import pandas as pd
 
 app = Flask(__name__)
 app.config.from_pyfile('config.py')
 db.init_app(app)
+storage.init_app(app)
+
+def check_schema():
+    """Warn when the database needs migrate_schema.py; never changes it (call in an app context)."""
+    pending = upgrade_schema(dry_run=True)
+    if pending:
+        print(f"Database schema is behind models.py ({len(pending)} change(s)); "
+              f"run `python migrate_schema.py --dry-run` to review them.")
 
 with app.app_context():
     db.create_all()
+    check_schema()
+
+chart_cache = LRUCache(app.config['CHART_CACHE_SIZE'])
+_job_runner_lock = threading.Lock()
+PLOTLY_VERSION = version('plotly')  # read from package metadata, without importing plotly
+_plotly_js = None
+
+def job_runner():
+    """The serving app's JobRunner, created on the first trigger rather than at import.
+
+    Creating it fails the jobs a previous server left unfinished, which only the
+    process that serves /trigger may do; scripts importing this module must not.
+    """
+    with _job_runner_lock:
+        runner = app.extensions.get('job_runner')
+        if runner is None:
+            runner = app.extensions['job_runner'] = JobRunner(app, run_pipeline, app.config['PIPELINE_WORKERS'])
+    return runner
+
+def requires_data(view):
+    """Wait (up to LOADER_WAIT_TIMEOUT) for the data loader, else answer 503 'warming up'."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if not loader.wait(app.config['LOADER_WAIT_TIMEOUT']):
+            headers = {'Retry-After': '5'}
+            if request.path.startswith('/api/'):
+                return jsonify({'status': 'warming_up'}), 503, headers
+            return render_template('warming_up.html'), 503, headers
+        return view(*args, **kwargs)
+    return wrapper
 
 @app.route('/')
+@requires_data
 def index():
     """Nasdaq-like dashboard: Summary stats, top tickers table."""
-    summary = {
-        'total_rows': len(loader.data),
-        'total_anomalies': len(loader.anomalies),
-        'tickers': len(TOP_TICKERS),
-        'top_tickers': loader.data.groupby('ticker')['close'].last().to_dict()
-    
-    }
+    # Precomputed with the snapshot, so a page view is O(tickers)
+    summary = loader.summary
     return render_template('index.html', summary=summary, tickers=TOP_TICKERS)
 
+@app.route('/api/summary')
+@requires_data
+def api_summary():
+    """The dashboard summary as JSON, one entry per ticker."""
+    summary = loader.summary
+    tickers = []
+    for t in summary.tickers.values():
+        # A NaN float would serialise as bare NaN, which is not JSON
+        row = {k: None if isinstance(v, float) and v != v else v for k, v in t._asdict().items()}
+        row['last_date'] = t.last_date.isoformat()
+        row['last_anomaly_date'] = t.last_anomaly_date.isoformat() if t.last_anomaly_date else None
+        tickers.append(row)
+    return jsonify({
+        'data_version': summary.version,
+        'loaded_at': summary.loaded_at,
+        'total_rows': summary.total_rows,
+        'total_anomalies': summary.total_anomalies,
+        'tickers': tickers,
+    })
 
 
-@app.route('/ticker/<symbol>')
-def ticker(symbol):
-    """Ticker details: Chart with anomalies (Nasdaq-style)."""
-    if symbol not in TOP_TICKERS:
-        return render_template('404.html'), 404
-    
-    df = loader.get_ticker_data(symbol)
-    if df.empty:
-        return render_template('404.html'), 404
-    
+
+def chart_points():
+    """?max_points= for a decimated series, clamped to CHART_MAX_POINTS_RANGE."""
+    lo, hi = app.config['CHART_MAX_POINTS_RANGE']
+    return min(max(request.args.get('max_points', app.config['CHART_MAX_POINTS'], type=int), lo), hi)
+
+
+def decimate(df, max_points, method='lttb'):
+    """Downsample a ticker slice on 'close' for plotting, always keeping anomaly rows."""
+    import numpy as np
+    from downsample import downsample
+    keep = np.flatnonzero(df['anomaly'].to_numpy() == 1)
+    idx = downsample(df.index.values, df['close'].to_numpy(dtype='float64'), max_points, method=method, keep=keep)
+    return df.iloc[idx]
+
+def render_chart(symbol, df, anomalies, height=600):
+    """Render the price/anomaly chart as an HTML fragment (plotly.js is served separately)."""
+    # plotly is only needed here; importing it lazily keeps app startup fast
+    import plotly.graph_objects as go
+    from plotly.subplots import make_subplots
+
     # Plotly chart (from .py plot_all_tickers logic, normalized)
     fig = make_subplots(specs=[[{"secondary_y": False}]])
     fig.add_trace(go.Scatter(x=df.index, y=df['close'], mode='lines', name='Close Price',
                              line=dict(color='#003366')), secondary_y=False)
-    anomalies = df[df['anomaly'] == 1]
     if not anomalies.empty:
         fig.add_trace(go.Scatter(x=anomalies.index, y=anomalies['close'], mode='markers',
                                  name='Anomalies', marker=dict(color='red', size=10, symbol='x')), secondary_y=False)
-    
-    fig.update_layout(title=f'{symbol} Stock Price & Anomalies', 
+
+    fig.update_layout(title=f'{symbol} Stock Price & Anomalies',
                       xaxis_title='Date', yaxis_title='Price (USD)',
-                      template='plotly_white', height=600)
-    chart_html = fig.to_html(full_html=False)
-    print(df.tail().to_dict('records'))
+                      template='plotly_white', height=height)
+    return fig.to_html(full_html=False, include_plotlyjs=False)
+
+@app.route('/ticker/<symbol>')
+@requires_data
+def ticker(symbol):
+    """Ticker details: Chart with anomalies (Nasdaq-style)."""
+    if symbol not in TOP_TICKERS:
+        return render_template('404.html'), 404
+    
+    # One snapshot, so the cached chart's version matches the rows it was drawn from
+    snap = loader.snapshot()
+    df = snap.ticker_data(symbol)
+    if df.empty:
+        return render_template('404.html'), 404
+
+    # Rendered charts are cached per (symbol, data version, options)
+    height = min(max(request.args.get('height', 600, type=int), 300), 1200)
+    max_points = chart_points()
+    version = snap.version
+    chart_cache.sync_version(version)
+    key = (symbol, version, height, max_points)
+    chart_html = chart_cache.get(key)
+    if chart_html is None:
+        chart_html = render_chart(symbol, decimate(df, max_points), snap.ticker_anomalies(symbol), height=height)
+        chart_cache.put(key, chart_html)
     return render_template('ticker.html', symbol=symbol, chart=chart_html, data=df.tail().to_dict('records'))
 
+@app.route('/api/series/<ticker>')
+@requires_data
+def api_series(ticker):
+    """Close series for [from, to], decimated to about max_points (LTTB or min/max buckets)."""
+    import numpy as np
+    max_points = chart_points()
+    method = request.args.get('method', 'lttb')
+    if method not in ('lttb', 'minmax'):
+        return jsonify({'error': f'Unknown method {method!r}'}), 400
+    try:
+        df = loader.get_ticker_range(ticker, request.args.get('from'), request.args.get('to'))
+    except ValueError:
+        return jsonify({'error': 'Invalid from/to date'}), 400
+    if df.empty:
+        return jsonify({'error': f'No data for {ticker}'}), 404
+
+    points = decimate(df, max_points, method=method)
+    flagged = points[points['anomaly'] == 1]
+    return jsonify({
+        'ticker': ticker,
+        'total': len(df),
+        'points': len(points),
+        'dates': np.datetime_as_string(points.index.values, unit='D').tolist(),
+        'close': points['close'].tolist(),
+        'anomalies': {
+            'dates': np.datetime_as_string(flagged.index.values, unit='D').tolist(),
+            'close': flagged['close'].tolist(),
+        },
+    })
+
+@app.route('/api/score/<ticker>', methods=['POST'])
+@requires_data
+def api_score(ticker):
+    """Score a batch of new bars (JSON records or text/csv) against the ticker's model."""
+    import numpy as np
+    from scoring import parse_bars, scorer
+    snap = loader.snapshot()  # one snapshot, so the model version matches the history
+    version, history = snap.version, snap.ticker_data(ticker)
+    if history.empty:
+        return jsonify({'error': f'No data for {ticker}'}), 404
+    try:
+        bars = parse_bars(request.get_data(), request.mimetype)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    scores = scorer.score(ticker, version, history, bars)
+    return jsonify({
+        'ticker': ticker,
+        'data_version': version,
+        'count': len(bars),
+        'dates': np.datetime_as_string(bars['date'].values, unit='D').tolist(),
+        'anomaly_score': scores.tolist(),
+        'anomaly': (scores > 0).astype(int).tolist(),
+    })
+
+@app.route('/assets/plotly-<version>.min.js')
+def plotly_js(version):
+    """plotly.js served once as a long-lived cacheable asset instead of inlined per chart."""
+    global _plotly_js
+    if version != PLOTLY_VERSION:
+        # Only the installed version's URL is immutable; anything else would cache the wrong body
+        return jsonify({'error': f'No plotly.js {version}'}), 404
+    if _plotly_js is None:
+        from plotly.offline import get_plotlyjs
+        _plotly_js = get_plotlyjs()
+    response = app.response_class(_plotly_js, mimetype='application/javascript')
+    # The URL carries the plotly version, so the body never changes for a given URL
+    response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+    response.set_etag(version)
+    return response.make_conditional(request)
+
+@app.context_processor
+def inject_plotly_version():
+    return {'plotly_version': PLOTLY_VERSION}
+
+@app.route('/api/cache/stats')
+def cache_stats():
+    """Hit/miss counters for the rendered-chart and scoring-model caches."""
+    from scoring import scorer
+    runner = app.extensions.get('job_runner')  # None until the first trigger
+    return jsonify({'chart': chart_cache.stats(), 'score_models': scorer.models.stats(),
+                    'score_batching': scorer.batcher.stats(), 'jobs': runner.stats() if runner else None,
+                    'data_version': loader.version if loader.ready else None})
+
+def anomaly_page(snap):
+    """One page of the anomalies listing for the request's filters and cursor.
+
+    Query args: ticker, from, to, min_score, cursor (from the previous page)
+    and limit. Returns (rows, next cursor or None); ValueError on bad input.
+    """
+    args = request.args
+    min_score = args.get('min_score') or None
+    cursor = args.get('cursor') or None
+    limit = args.get('limit', app.config['ANOMALIES_PAGE_SIZE'], type=int)
+    return snap.listing.page(
+        ticker=args.get('ticker') or None,
+        start=args.get('from') or None,
+        end=args.get('to') or None,
+        min_score=float(min_score) if min_score is not None else None,
+        cursor=parse_cursor(cursor) if cursor is not None else None,
+        limit=min(max(limit, 1), app.config['ANOMALIES_MAX_PAGE_SIZE']),
+    )
+
 @app.route('/anomalies')
+@requires_data
 def anomalies():
-    """Anomalies table with filters (search by ticker/date)."""
-    df = loader.anomalies.copy()
-    ticker_filter = request.args.get('ticker', '')
-    if ticker_filter:
-        df = df[df['ticker'] == ticker_filter]
-    
-    return render_template('anomalies.html', anomalies=df.to_dict('records'), tickers=TOP_TICKERS)
+    """Anomalies table, newest first, with server-side filters and keyset (date, ticker) pages."""
+    import numpy as np
+    try:
+        rows, next_cursor = anomaly_page(loader.snapshot())
+    except ValueError as e:
+        return render_template('anomalies.html', anomalies=[], error=str(e), next_url=None, first_url=None,
+                               tickers=TOP_TICKERS), 400
+    scores = rows['anomaly_score'].tolist() if 'anomaly_score' in rows else [None] * len(rows)
+    records = [{'ticker': t, 'date': d, 'close': c, 'anomaly_score': a} for t, d, c, a in
+               zip(rows['ticker'].astype(str), np.datetime_as_string(rows.index.values, unit='D'),
+                   rows['close'].tolist(), scores)]
+    args = request.args.to_dict()
+    cursor = args.pop('cursor', None)
+    next_url = url_for('anomalies', **args, cursor=format_cursor(next_cursor)) if next_cursor is not None else None
+    first_url = url_for('anomalies', **args) if cursor else None
+    return render_template('anomalies.html', anomalies=records, next_url=next_url, first_url=first_url,
+                           tickers=TOP_TICKERS)
+
+@app.route('/api/anomalies')
+@requires_data
+def api_anomaly_page():
+    """JSON variant of /anomalies: one column-oriented page plus the cursor for the next."""
+    snap = loader.snapshot()
+    # The query string is part of the URL, so one tag per data version is enough
+    etag = data_etag('anomalies', snap)
+    cached = not_modified(etag, snap.loaded_at)
+    if cached is not None:
+        return cached
+    try:
+        rows, next_cursor = anomaly_page(snap)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return json_response({
+        'data_version': snap.version,
+        'count': len(rows),
+        'next_cursor': format_cursor(next_cursor) if next_cursor is not None else None,
+        'columns': frame_columns(rows, exclude=()),
+    }, etag, snap.loaded_at)
 
 @app.route('/reports')
 def reports():
-    """Anomaly detection metrics summary (from .py results)."""
-    # Hardcoded sample metrics from .py (in prod, load from saved CSV/JSON)
-    # Add metrics for all tickers in TOP_TICKERS (dummy values for illustration)
-    metrics = [
-        {'ticker': ticker, 'precision': round(0.8 + i*0.01, 2), 'recall': round(0.75 + i*0.01, 2), 'f1': round(0.77 + i*0.01, 2)}
-        for i, ticker in enumerate(TOP_TICKERS)
-    ]
+    """Anomaly detection metrics summary (written by tuning.py)."""
+    from tuning import load_summary
+    metrics = load_summary()
+    if metrics is None:
+        # Sample metrics until `python tuning.py` has written the summary (dummy values for illustration)
+        metrics = [
+            {'ticker': ticker, 'precision': round(0.8 + i*0.01, 2), 'recall': round(0.75 + i*0.01, 2), 'f1': round(0.77 + i*0.01, 2)}
+            for i, ticker in enumerate(TOP_TICKERS)
+        ]
     return render_template('reports.html', metrics=metrics)
 
 @app.route('/api/anomalies/<ticker>')
+@requires_data
 def api_anomalies(ticker):
-    """JSON API for anomalies (for dynamic charts)."""
-    df = loader.anomalies[loader.anomalies['ticker'] == ticker]
-    return jsonify(df.to_dict('records'))
+    """JSON API for anomalies (for dynamic charts), column-oriented.
+
+    Tagged with the data version: a client revalidating with If-None-Match or
+    If-Modified-Since gets a 304 until the data is refreshed.
+    """
+    snap = loader.snapshot()
+    etag = data_etag(f'anomalies-{ticker}', snap)
+    cached = not_modified(etag, snap.loaded_at)
+    if cached is not None:
+        return cached
+    df = snap.ticker_anomalies(ticker)
+    return json_response({
+        'ticker': ticker,
+        'data_version': snap.version,
+        'count': len(df),
+        'columns': frame_columns(df),
+    }, etag, snap.loaded_at)
+
+@app.route('/download/anomalies.<fmt>')
+@requires_data
+def download_anomalies(fmt):
+    """Stream the anomalies (ticker, from, to filters) as CSV or Parquet, chunk by chunk."""
+    from datetime import datetime, timezone
+    from werkzeug.utils import secure_filename
+    from export import stream_anomalies
+    if fmt not in ('csv', 'parquet'):
+        return jsonify({'error': f'Unknown format {fmt!r}'}), 404
+    symbol = request.args.get('ticker') or None
+    try:
+        body = stream_anomalies(loader.snapshot(), fmt, symbol,
+                                request.args.get('from') or None, request.args.get('to') or None)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except RuntimeError as e:
+        return jsonify({'error': str(e)}), 501
+    filename = secure_filename(f"anomalies_{symbol or 'all'}_{datetime.now(timezone.utc):%Y%m%d}.{fmt}")
+    mimetype = 'text/csv' if fmt == 'csv' else 'application/vnd.apache.parquet'
+    return app.response_class(body, mimetype=mimetype,
+                              headers={'Content-Disposition': f'attachment; filename={filename}'})
+
+@app.route('/trigger/<symbol>', methods=['POST'])
+def trigger_pipeline(symbol):
+    """Queue a pipeline run for the ticker and answer 202 at once; poll the job's status_url."""
+    known = symbol in TOP_TICKERS or (loader.ready and symbol in loader.snapshot().ticker_index)
+    if not known:
+        return jsonify({'error': f'Unknown ticker {symbol}'}), 404
+    job_id, coalesced = job_runner().submit(symbol)
+    status_url = url_for('api_job', job_id=job_id)
+    return jsonify({'job_id': job_id, 'ticker': symbol, 'coalesced': coalesced,
+                    'status_url': status_url}), 202, {'Location': status_url}
+
+@app.route('/api/jobs/<int:job_id>')
+def api_job(job_id):
+    """Status of a pipeline job: queued, running, succeeded or failed (with its message)."""
+    job = get_job(app, job_id)
+    if job is None:
+        return jsonify({'error': f'No job {job_id}'}), 404
+    return jsonify(job)
 
 # In app.py
-def create_app():
+def create_app(config_overrides=None):
     app = Flask(__name__)
     app.config.from_pyfile('config.py')
+    if config_overrides:
+        app.config.update(config_overrides)  # e.g. a scratch SQLALCHEMY_DATABASE_URI
     from models import db
     db.init_app(app)  # Move here
+    storage.init_app(app)
     with app.app_context():
         db.create_all()
+        check_schema()
     return app
 
 if __name__ == '__main__':
+    loader.warm_up()  # start loading in the background while the server boots
+    job_runner()  # fail the jobs the last server left unfinished before taking new ones
     app.run(debug=True)
\ No newline at end of file
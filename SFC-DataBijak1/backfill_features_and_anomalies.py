@@ -1,152 +1,269 @@
 # backfill_features_and_anomalies.py
+import argparse
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
 import pandas as pd
 import numpy as np
+from sqlalchemy import select
 from app import create_app
-from models import db, Ticker, Anomaly
-from sklearn.ensemble import IsolationForest
-from sklearn.preprocessing import StandardScaler
-from datetime import datetime
-import math
+from models import db, Ticker, Anomaly, FeatureState
+from model_cache import model_cache
+from features import FEATURE_COLUMNS, compute_features
+from scoring import ISOLATION_PARAMS, feature_matrix
 
 # Toggle whether to compute anomaly_score via IsolationForest
 RUN_ANOMALY_MODEL = True
-ISOLATION_CONTAMINATION = 0.01  # tune
-
-# RSI helper
-def compute_rsi(series, window=14):
-    # series: pd.Series of prices (float)
-    delta = series.diff()
-    gain = delta.clip(lower=0)
-    loss = -delta.clip(upper=0)
-    avg_gain = gain.rolling(window=window, min_periods=window).mean()
-    avg_loss = loss.rolling(window=window, min_periods=window).mean()
-    rs = avg_gain / avg_loss
-    rsi = 100 - (100 / (1 + rs))
-    return rsi
-
-def backfill_for_ticker(ticker_symbol):
-    app = create_app()
+# Rows per UPDATE executemany/commit during writeback
+BACKFILL_CHUNK_SIZE = 5000
+
+# OHLCV-style columns; Mongo imports may only carry these inside `meta`
+PRICE_COLUMNS = ['open', 'high', 'low', 'adj_close', 'volume', 'dividends', 'stock_splits']
+# Tail kept in FeatureState: enough rows for the longest window over each input.
+# RSI (14 diffs) and vol_20 (20 returns) are recomputed from the same 200 closes.
+STATE_CLOSES = 200
+STATE_VOLUMES = 20
+
+def load_ticker_frame(ticker_id, since=None):
+    """Read the rows to backfill as plain column tuples (no ORM objects), ordered by date.
+
+    ``since`` restricts the read to rows dated after that high-water mark.
+    """
+    columns = ['id', 'date', 'close', 'anomaly', 'meta'] + PRICE_COLUMNS
+    stmt = select(*[getattr(Anomaly, c) for c in columns]).where(Anomaly.ticker_id == ticker_id)
+    if since is not None:
+        stmt = stmt.where(Anomaly.date > since)
+    stmt = stmt.order_by(Anomaly.date.asc())
+    df = pd.DataFrame(db.session.execute(stmt).all(), columns=columns)
+    if df.empty:
+        return df
+
+    # Fall back to values kept in meta when the real column is still empty
+    meta = pd.DataFrame.from_records([m if isinstance(m, dict) else {} for m in df.pop('meta')])
+    for c in PRICE_COLUMNS:
+        if c in meta.columns:
+            df[c] = df[c].fillna(pd.to_numeric(meta[c], errors='coerce'))
+    return df
+
+def load_feature_history(ticker_id, through):
+    """Stored feature columns up to ``through``, used to fit the model in incremental runs."""
+    stmt = (select(*[getattr(Anomaly, c) for c in FEATURE_COLUMNS])
+            .where(Anomaly.ticker_id == ticker_id, Anomaly.date <= through))
+    return pd.DataFrame(db.session.execute(stmt).all(), columns=FEATURE_COLUMNS, dtype='float64')
+
+def score_anomalies(df, history=None, ticker=None):
+    """Fill anomaly_score/anomaly from an IsolationForest fit on the feature columns.
+
+    With ``history`` (earlier rows' features) the model is fit on history + df,
+    but only df's rows are scored. The fitted model comes from model_cache, so
+    rescoring unchanged data does not refit.
+    """
+    # Prepare model features (select numeric features, fillna)
+    X = df[FEATURE_COLUMNS]
+    if history is not None:
+        X = pd.concat([history[FEATURE_COLUMNS], X], ignore_index=True)
+    X, _ = feature_matrix(X)
+    scaler, model = model_cache.get(ticker, X, FEATURE_COLUMNS, ISOLATION_PARAMS)
+    Xs = scaler.transform(X[len(X) - len(df):])
+    # decision_function: higher --> more normal, lower --> more anomalous
+    # For readability invert so large = more anomalous
+    df['anomaly_score'] = -model.decision_function(Xs)
+    # predict: -1 anomaly, 1 normal  ->  1=anomaly, 0=normal
+    df['anomaly'] = (model.predict(Xs) == -1).astype(int)
+    return df
+
+def tail_frame(state):
+    """Rebuild the persisted rolling-window tail as rows to prepend to new data."""
+    closes = [np.nan if v is None else v for v in state.closes or []]
+    volumes = [np.nan if v is None else v for v in state.volumes or []][:len(closes)]
+    return pd.DataFrame({
+        'close': np.asarray(closes, dtype='float64'),
+        'volume': np.r_[np.full(len(closes) - len(volumes), np.nan), np.asarray(volumes, dtype='float64')],
+    })
+
+def save_feature_state(ticker_id, state, result):
+    """Advance the ticker's FeatureState past the rows just written."""
+    closes = list(state.closes or []) if state else []
+    volumes = list(state.volumes or []) if state else []
+    closes = (closes + result['close'].tolist())[-STATE_CLOSES:]
+    volumes = (volumes + result['volume'].tolist())[-STATE_VOLUMES:]
+    # NaN is not valid JSON
+    closes = [None if pd.isna(v) else float(v) for v in closes]
+    volumes = [None if pd.isna(v) else float(v) for v in volumes]
+    db.session.merge(FeatureState(ticker_id=ticker_id, last_date=max(result['date']),
+                                  closes=closes, volumes=volumes))
+    db.session.commit()
+
+def write_back(df, columns, chunk_size=BACKFILL_CHUNK_SIZE):
+    """Apply the given columns keyed by primary key, one UPDATE executemany per chunk."""
+    out = df[['id'] + columns]
+    # NaN -> NULL
+    out = out.astype(object).where(out.notna(), None)
+    mappings = out.to_dict('records')
+    for start in range(0, len(mappings), chunk_size):
+        db.session.bulk_update_mappings(Anomaly, mappings[start:start + chunk_size])
+        db.session.commit()
+    return len(mappings)
+
+def process_frame(symbol, df, run_model=RUN_ANOMALY_MODEL, n_tail=0, history=None):
+    """CPU-heavy part of a backfill: features + model fit/score, no database access.
+
+    The first ``n_tail`` rows are persisted context (see tail_frame) and are not
+    returned. Safe to run in a worker process; returns
+    (symbol, result frame, columns to write, seconds).
+    """
+    started = time.perf_counter()
+    df = compute_features(df).iloc[n_tail:].copy()
+    columns = FEATURE_COLUMNS + PRICE_COLUMNS
+    # compute anomaly scores with IsolationForest if requested (else keep existing flags)
+    if run_model:
+        df = score_anomalies(df, history=history, ticker=symbol)
+        columns = columns + ['anomaly_score', 'anomaly']
+    return symbol, df[['id', 'date', 'close'] + columns], columns, time.perf_counter() - started
+
+def _load_for_backfill(ticker_symbol, incremental=False):
+    """Read one ticker's work in the current app context, or None if there is nothing to do.
+
+    Returns (ticker_id, previous FeatureState, process_frame kwargs).
+    """
+    t = Ticker.query.filter_by(symbol=ticker_symbol).first()
+    if not t:
+        print("Ticker not found:", ticker_symbol)
+        return None
+    state = db.session.get(FeatureState, t.id) if incremental else None
+    df = load_ticker_frame(t.id, since=state.last_date if state else None)
+    if df.empty:
+        print("No rows to process for", ticker_symbol)
+        return None
+
+    if state is not None:
+        # Only rows past the high-water mark, with the stored tail in front of them
+        tail = tail_frame(state)
+        history = load_feature_history(t.id, state.last_date) if RUN_ANOMALY_MODEL else None
+        df = pd.concat([tail, df], ignore_index=True)
+        return t.id, state, {'df': df, 'n_tail': len(tail), 'history': history}
+
+    # if 'close' is None for every row, abort
+    if df['close'].isna().all():
+        print(f"Ticker {ticker_symbol}: no close prices available — cannot compute features.")
+        return None
+    return t.id, None, {'df': df}
+
+def backfill_for_ticker(ticker_symbol, chunk_size=BACKFILL_CHUNK_SIZE, incremental=False, app=None):
+    """Backfill one ticker in-process; ``app`` can be injected (e.g. a temp DB)."""
+    app = app or create_app()
     with app.app_context():
-        t = Ticker.query.filter_by(symbol=ticker_symbol).first()
-        if not t:
-            print("Ticker not found:", ticker_symbol)
+        started = time.perf_counter()
+        work = _load_for_backfill(ticker_symbol, incremental)
+        if work is None:
             return
+        ticker_id, state, kwargs = work
+        _, result, columns, _ = process_frame(ticker_symbol, **kwargs)
+        updated = write_back(result, columns, chunk_size=chunk_size)
+        save_feature_state(ticker_id, state, result)
+        elapsed = time.perf_counter() - started
+        print(f"[{ticker_symbol}] Updated {updated} rows with derived features and anomaly scores "
+              f"in {elapsed:.2f}s ({updated / elapsed:,.0f} rows/s).")
 
-        # Read anomaly rows for this ticker into DataFrame
-        rows = Anomaly.query.filter_by(ticker_id=t.id).order_by(Anomaly.date.asc()).all()
-        if not rows:
-            print("No rows to process for", ticker_symbol)
-            return
+_process_apps = {}  # database URI -> app, one per process (pool workers build their own)
 
-        df = pd.DataFrame([r.as_dict() for r in rows])
-        # Parse date
-        df['date'] = pd.to_datetime(df['date']).dt.date
-        df = df.sort_values('date').reset_index(drop=True)
+def _process_app(db_uri):
+    if db_uri not in _process_apps:
+        _process_apps[db_uri] = create_app({'SQLALCHEMY_DATABASE_URI': db_uri})
+    return _process_apps[db_uri]
 
-        # if 'close' is None for some rows, try to find non-null closes (otherwise abort)
-        if df['close'].isna().all():
-            print(f"Ticker {ticker_symbol}: no close prices available — cannot compute features.")
-            return
+def compute_ticker(symbol, db_uri, incremental=False, app=None):
+    """Read and compute one ticker in this process; the caller writes the result back.
 
-        # We'll compute on float series
-        df['close_f'] = pd.to_numeric(df['close'], errors='coerce')
+    Returns (symbol, ticker_id, result frame, columns to write, seconds), or
+    None when there is nothing to do. Only reads the database, so pool
+    workers can run it while the parent is the single writer; ``app`` is the
+    caller's own when it runs in-process.
+    """
+    started = time.perf_counter()
+    with (app or _process_app(db_uri)).app_context():
+        work = _load_for_backfill(symbol, incremental)
+    if work is None:
+        return None
+    ticker_id, _, kwargs = work
+    _, result, columns, _ = process_frame(symbol, **kwargs)
+    return symbol, ticker_id, result, columns, time.perf_counter() - started
 
-        # Returns
-        df['returns'] = df['close_f'].pct_change()
+def run_backfill(symbols, workers=1, chunk_size=BACKFILL_CHUNK_SIZE, incremental=False, app=None):
+    """Backfill many tickers, fanning the reads and CPU-heavy work out to ``workers`` processes.
 
-        # Moving averages on close
-        df['ma_50'] = df['close_f'].rolling(window=50, min_periods=1).mean()
-        df['ma_200'] = df['close_f'].rolling(window=200, min_periods=1).mean()
+    Each ticker is loaded where it is computed, so only the tickers in flight
+    are in memory. Writes stay in this process, so SQLite only ever sees one
+    writer; results are written back as soon as each ticker finishes. A
+    ticker that fails is reported and skipped, the others carry on. With
+    ``incremental`` only rows past each ticker's FeatureState are computed.
+    Returns ({symbol: (compute s, write s)}, {symbol: exception}).
+    """
+    app = app or create_app()
+    db_uri = app.config['SQLALCHEMY_DATABASE_URI']
+    timings, failures = {}, {}
+    total_rows = 0
+    n_tickers = len(symbols)
+    wall_start = time.perf_counter()
+    with app.app_context():
 
-        # Volatility (rolling std of returns) - Vol_20
-        df['vol_20'] = df['returns'].rolling(window=20, min_periods=1).std()
+        def write(done, symbol, ticker_id, result, columns, compute_s):
+            nonlocal total_rows
+            write_start = time.perf_counter()
+            updated = write_back(result, columns, chunk_size=chunk_size)
+            # Read here, not in the worker: this process is the only one that advances it
+            state = db.session.get(FeatureState, ticker_id) if incremental else None
+            save_feature_state(ticker_id, state, result)
+            write_s = time.perf_counter() - write_start
+            total_rows += updated
+            timings[symbol] = (compute_s, write_s)
+            print(f"[{done}/{n_tickers}] {symbol}: {updated} rows | compute {compute_s:.2f}s | write {write_s:.2f}s")
 
-        # Volume-based features: try to use 'volume' if present in df; otherwise set NaN
-        if 'volume' in df.columns:
-            df['volume_f'] = pd.to_numeric(df['volume'], errors='coerce')
-            df['volume_ma_20'] = df['volume_f'].rolling(window=20, min_periods=1).mean()
-        else:
-            df['volume_f'] = np.nan
-            df['volume_ma_20'] = np.nan
-
-        # RSI_14
-        df['rsi_14'] = compute_rsi(df['close_f'], window=14)
-
-        # Prepare model features (select numeric features, fillna)
-        feature_cols = ['returns', 'ma_50', 'ma_200', 'vol_20', 'volume_ma_20', 'rsi_14']
-        X = df[feature_cols].copy()
-        # Replace infinities and NaNs with column median
-        X = X.replace([np.inf, -np.inf], np.nan)
-        for c in X.columns:
-            median = X[c].median(skipna=True)
-            if math.isnan(median):
-                median = 0.0
-            X[c] = X[c].fillna(median)
-
-        # compute anomaly scores with IsolationForest if requested
-        if RUN_ANOMALY_MODEL:
-            scaler = StandardScaler()
-            Xs = scaler.fit_transform(X)
-            model = IsolationForest(contamination=ISOLATION_CONTAMINATION, random_state=42)
-            model.fit(Xs)
-            # decision_function: higher --> more normal, lower --> more anomalous
-            scores = model.decision_function(Xs)  # larger = less anomalous
-            # For readability invert so large = more anomalous (optional)
-            anomaly_scores = -scores
-            preds = model.predict(Xs)  # -1 anomaly, 1 normal
-            df['anomaly_score_new'] = anomaly_scores
-            df['anomaly_pred'] = preds
-            # Convert preds to 1=anomaly, 0=normal
-            df['anomaly_new'] = df['anomaly_pred'].apply(lambda v: 1 if int(v) == -1 else 0)
+        def finish(done, symbol, compute):
+            try:
+                item = compute()
+                if item is not None:
+                    write(done, *item)
+            except Exception as e:
+                db.session.rollback()
+                failures[symbol] = e
+                print(f"[{done}/{n_tickers}] {symbol}: FAILED, skipped ({type(e).__name__}: {e})")
+
+        if workers > 1:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = {pool.submit(compute_ticker, sym, db_uri, incremental): sym for sym in symbols}
+                for done, fut in enumerate(as_completed(futures), 1):
+                    finish(done, futures[fut], fut.result)
         else:
-            df['anomaly_score_new'] = np.nan
-            df['anomaly_new'] = df['anomaly'].apply(lambda v: int(v) if v is not None else None)
-
-        # Now update the SQL rows (one-by-one) — safe and clear
-        updated = 0
-        for _, row in df.iterrows():
-            date_val = pd.to_datetime(row['date']).date()
-            a = Anomaly.query.filter_by(ticker_id=t.id, date=date_val).first()
-            if not a:
-                continue
-            # map and update fields
-            a.returns = float(row['returns']) if pd.notna(row['returns']) else None
-            a.ma_50 = float(row['ma_50']) if pd.notna(row['ma_50']) else None
-            a.ma_200 = float(row['ma_200']) if pd.notna(row['ma_200']) else None
-            a.vol_20 = float(row['vol_20']) if pd.notna(row['vol_20']) else None
-            a.volume_ma_20 = float(row['volume_ma_20']) if pd.notna(row['volume_ma_20']) else None
-            a.rsi_14 = float(row['rsi_14']) if pd.notna(row['rsi_14']) else None
-            # Optionally update open/high/low/adj_close/volume if present in df
-            for col_map in [('open','open'), ('high','high'), ('low','low'),
-                            ('adj_close','adj_close'), ('volume','volume'),
-                            ('dividends','dividends'), ('stock_splits','stock_splits')]:
-                field = col_map[0]
-                if field in row and pd.notna(row[field]):
-                    try:
-                        setattr(a, field, float(row[field]))
-                    except:
-                        pass
-            # anomaly fields from model
-            if pd.notna(row.get('anomaly_score_new')):
-                a.anomaly_score = float(row['anomaly_score_new'])
-            # set anomaly flag if model computed, else keep existing
-            if not pd.isna(row.get('anomaly_new')):
-                a.anomaly = int(row['anomaly_new'])
-            # save meta optionally
-            # a.meta = a.meta or {}
-            db.session.add(a)
-            updated += 1
+            for done, sym in enumerate(symbols, 1):
+                finish(done, sym, lambda: compute_ticker(sym, db_uri, incremental, app))
 
-        db.session.commit()
-        print(f"[{ticker_symbol}] Updated {updated} rows with derived features and anomaly scores.")
+    wall = time.perf_counter() - wall_start
+    compute_total = sum(c for c, _ in timings.values())
+    print(f"Backfilled {len(timings)} tickers, {total_rows} rows in {wall:.2f}s "
+          f"({total_rows / wall if wall else 0:,.0f} rows/s, workers={workers}, "
+          f"compute {compute_total:.2f}s summed across tickers).")
+    if failures:
+        print(f"{len(failures)} ticker(s) failed: " + ', '.join(sorted(failures)))
+    return timings, failures
 
 def main():
+    parser = argparse.ArgumentParser(description='Backfill derived features and anomaly scores.')
+    parser.add_argument('--chunk-size', type=int, default=BACKFILL_CHUNK_SIZE,
+                        help='rows per UPDATE executemany/commit')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='processes for feature engineering and model fitting (1 = in-process)')
+    parser.add_argument('--incremental', action='store_true',
+                        help="only compute rows dated after each ticker's stored high-water mark")
+    args = parser.parse_args()
+
     app = create_app()
     with app.app_context():
         symbols = [t.symbol for t in Ticker.query.all()]
     print("Tickers to process:", symbols)
-    for sym in symbols:
-        backfill_for_ticker(sym)
+    _, failures = run_backfill(symbols, workers=args.workers, chunk_size=args.chunk_size,
+                               incremental=args.incremental)
+    sys.exit(1 if failures else 0)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,2 @@
+# Benchmarks for the data and model hot paths.
+# Run from the SFC-DataBijak1 directory, e.g. `python -m benchmarks.bench_ticker_index`.
@@ -0,0 +1,95 @@
+# bench_anomalies_api.py
+# /api/anomalies/<ticker>: the previous jsonify(df.to_dict('records')) body vs the
+# column-oriented one (orjson and stdlib encoders), bytes on the wire with and
+# without gzip, and a 304 revalidation. Checks both bodies carry the same values.
+import argparse
+import gzip
+import json
+import math
+import time
+import numpy as np
+from flask import jsonify
+import app as app_module
+import responses
+from data_loader import DataLoader
+from benchmarks.synthetic import make_frame
+
+
+def records_body(df):
+    # What the route returned before
+    with app_module.app.app_context():
+        return jsonify(df.to_dict('records')).get_data()
+
+
+def check_same_values(df, columns):
+    """Every record field of the old body appears, in order, in the column body."""
+    old = df.to_dict('records')
+    for name in df.columns.drop('ticker'):
+        new = columns[name]
+        assert len(new) == len(old), name
+        for record, value in zip(old, new):
+            expected = record[name]
+            if isinstance(expected, float) and math.isnan(expected):
+                assert value is None, (name, value)
+            elif hasattr(expected, 'isoformat'):
+                assert value == expected.strftime('%Y-%m-%dT%H:%M:%S'), (name, value)
+            else:
+                assert value == expected, (name, value, expected)
+    assert columns['date'] == [d.strftime('%Y-%m-%d') for d in df.index]
+
+
+def timed(fn, repeat):
+    fn()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def run(label, frame, ticker, repeat):
+    app_module.loader.set(DataLoader.from_frame(frame))
+    client = app_module.app.test_client()
+    df = app_module.loader.get_ticker_anomalies(ticker)
+    url = f'/api/anomalies/{ticker}'
+
+    body = client.get(url).get_data()
+    check_same_values(df, json.loads(body)['columns'])
+    old = records_body(df)
+    zipped = client.get(url, headers={'Accept-Encoding': 'gzip'})
+    assert gzip.decompress(zipped.get_data()) == body or len(body) < app_module.app.config['JSON_GZIP_MIN_BYTES']
+    etag = zipped.headers['ETag']
+
+    old_ms = timed(lambda: records_body(df), repeat)
+    encoder = responses.orjson
+    new_ms = timed(lambda: responses.dumps(responses.frame_columns(df)), repeat)
+    responses.orjson = None
+    stdlib_ms = timed(lambda: responses.dumps(responses.frame_columns(df)), repeat)
+    responses.orjson = encoder
+    get_ms = timed(lambda: client.get(url, headers={'Accept-Encoding': 'gzip'}), repeat)
+    revalidate = client.get(url, headers={'Accept-Encoding': 'gzip', 'If-None-Match': etag})
+    assert revalidate.status_code == 304 and not revalidate.get_data()
+    not_modified_ms = timed(lambda: client.get(url, headers={'Accept-Encoding': 'gzip', 'If-None-Match': etag}),
+                            repeat)
+
+    print(f"{label}: {len(df)} anomaly rows for {ticker}")
+    print(f"  bytes: records {len(old):>10,} | columns {len(body):>10,} | columns+gzip "
+          f"{len(zipped.get_data()):>10,} | 304 {len(revalidate.get_data())}")
+    print(f"  serialize: records {old_ms:8.2f} ms | columns orjson {new_ms:7.2f} ms | "
+          f"columns stdlib {stdlib_ms:7.2f} ms")
+    print(f"  full GET (gzip) {get_ms:7.2f} ms | revalidation 304 {not_modified_ms:6.2f} ms")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--days', type=int, default=30 * 252)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    frame = make_frame(8, args.days)
+    frame['timestamp'] = frame.index + np.timedelta64(16, 'h')
+    frame.iloc[:50, frame.columns.get_loc('anomaly_score')] = np.nan
+    run('1% flagged', frame, 'NVDA', args.repeat)
+    # Every bar flagged: the largest body a ticker can produce
+    dense = frame.copy()
+    dense['anomaly'] = 1
+    run('all flagged', dense, 'NVDA', args.repeat)
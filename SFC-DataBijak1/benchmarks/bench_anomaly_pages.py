@@ -0,0 +1,91 @@
+# bench_anomaly_pages.py
+# /anomalies listing at 2,000 tickers x 12y: the previous route (copy every
+# anomaly, mask, render them all) vs keyset pages at page 1 and page 1,000,
+# for the template and JSON variants, with and without a min_score filter.
+# SQLite OFFSET paging over the same rows is timed for comparison.
+import argparse
+import sqlite3
+import time
+import numpy as np
+from flask import render_template
+import app as app_module
+from data_loader import DataLoader, TOP_TICKERS
+from listing import format_cursor
+from benchmarks.synthetic import make_frame
+
+
+def timed(fn, repeat):
+    fn()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def old_route(anomalies):
+    # What '/anomalies' did per request (no ticker filter)
+    df = anomalies.copy()
+    with app_module.app.test_request_context('/anomalies'):
+        return render_template('anomalies.html', anomalies=df.to_dict('records'), tickers=TOP_TICKERS,
+                               next_url=None, first_url=None)
+
+
+def cursor_at(listing, page, limit, **filters):
+    """Cursor that opens ``page`` (1-based), found by walking the pages before it."""
+    cursor = None
+    for _ in range(page - 1):
+        _, cursor = listing.page(cursor=cursor, limit=limit, **filters)
+        if cursor is None:
+            raise ValueError(f'fewer than {page} pages for {filters}')
+    return cursor
+
+
+def offset_db(anomalies):
+    db = sqlite3.connect(':memory:')
+    db.execute('CREATE TABLE anomaly (date TEXT, ticker TEXT, close REAL, anomaly_score REAL)')
+    db.execute('CREATE INDEX ix_date_ticker ON anomaly (date, ticker)')
+    db.executemany('INSERT INTO anomaly VALUES (?, ?, ?, ?)', zip(
+        np.datetime_as_string(anomalies.index.values, unit='D').tolist(), anomalies['ticker'].astype(str),
+        anomalies['close'].tolist(), anomalies['anomaly_score'].tolist()))
+    return db
+
+
+def offset_page(db, page, limit):
+    return db.execute('SELECT * FROM anomaly ORDER BY date DESC, ticker DESC LIMIT ? OFFSET ?',
+                      (limit, (page - 1) * limit)).fetchall()
+
+
+def run(n_tickers, n_days, limit, repeat):
+    app_module.loader.set(DataLoader.from_frame(make_frame(n_tickers, n_days)))
+    snap = app_module.loader.snapshot()
+    client = app_module.app.test_client()
+    print(f"{n_tickers} tickers x {n_days} days: {len(snap.anomalies):,} anomalies, {limit} per page")
+    print(f"  previous route (all rows rendered): {timed(lambda: old_route(snap.anomalies), 3):9.2f} ms")
+
+    db = offset_db(snap.anomalies)
+    # Scores are N(0, 0.1): the filter keeps ~84% of rows
+    for filters in ({}, {'min_score': -0.1}):
+        query = {k: str(v) for k, v in filters.items()}
+        for page in (1, 1000):
+            cursor = cursor_at(snap.listing, page, limit, **filters)
+            args = dict(query, limit=limit, **({'cursor': format_cursor(cursor)} if cursor else {}))
+            rows, _ = snap.listing.page(cursor=cursor, limit=limit, **filters)
+            assert len(rows) == limit
+            listing_ms = timed(lambda: snap.listing.page(cursor=cursor, limit=limit, **filters), repeat)
+            html_ms = timed(lambda: client.get('/anomalies', query_string=args), repeat)
+            json_ms = timed(lambda: client.get('/api/anomalies', query_string=args), repeat)
+            line = (f"  {str(filters or 'no filter'):<20} page {page:>4}: listing.page {listing_ms:6.3f} ms | "
+                    f"HTML {html_ms:6.2f} ms | JSON {json_ms:6.2f} ms")
+            if not filters:
+                line += f" | SQLite OFFSET {timed(lambda: offset_page(db, page, limit), repeat):6.2f} ms"
+            print(line)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--tickers', type=int, default=2000)
+    parser.add_argument('--days', type=int, default=3024)
+    parser.add_argument('--limit', type=int, default=50)
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+    run(args.tickers, args.days, args.limit, args.repeat)
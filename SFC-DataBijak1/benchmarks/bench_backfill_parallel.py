@@ -0,0 +1,44 @@
+# bench_backfill_parallel.py
+# Wall-clock speedup of the CPU-bound part of the backfill (features + IsolationForest)
+# with a process pool, at 8 and 500 synthetic tickers. No database involved.
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from backfill_features_and_anomalies import process_frame, PRICE_COLUMNS
+from benchmarks.synthetic import make_frame
+
+
+def ticker_frames(n_tickers, n_days, seed=42):
+    frame = make_frame(n_tickers, n_days, seed)
+    frame['date'] = frame.index.date
+    frame['id'] = np.arange(len(frame))
+    for c in PRICE_COLUMNS:
+        if c not in frame.columns:
+            frame[c] = 0.0
+    return {sym: part.reset_index(drop=True) for sym, part in frame.groupby('ticker', sort=False)}
+
+
+def run(n_tickers, n_days, workers):
+    frames = ticker_frames(n_tickers, n_days)
+    start = time.perf_counter()
+    for sym, df in frames.items():
+        process_frame(sym, df)
+    serial = time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        list(pool.map(process_frame, frames.keys(), frames.values(), chunksize=max(1, n_tickers // (workers * 4))))
+    parallel = time.perf_counter() - start
+    print(f"{n_tickers:>4} tickers x {n_days} days: serial {serial:7.2f}s | "
+          f"{workers} workers {parallel:7.2f}s | speedup {serial / parallel:5.2f}x")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--days', type=int, default=2520)
+    args = parser.parse_args()
+    run(8, args.days, args.workers)
+    run(500, args.days, args.workers)
@@ -0,0 +1,101 @@
+# bench_export.py
+# Full-history, all-ticker anomaly export: the old download path (every row as a
+# dict -> csv.writer into StringIO -> copied into BytesIO) vs the streaming
+# CSV/Parquet generators. Reports time to first byte, total time and peak
+# traced memory; every bar is flagged so the export is the whole history.
+import argparse
+import csv
+import io
+import time
+import tracemalloc
+import app as app_module
+from data_loader import DataLoader
+from export import EXPORT_COLUMNS, export_columns
+from benchmarks.synthetic import make_frame
+
+
+def legacy_csv(anomalies):
+    # The commented download_anomalies_csv(), with loader rows standing in for ORM rows
+    rows = anomalies.reset_index().to_dict('records')
+    si = io.StringIO()
+    cw = csv.writer(si)
+    cw.writerow(EXPORT_COLUMNS)
+    for d in rows:
+        cw.writerow([d.get(c) for c in EXPORT_COLUMNS])
+    output = io.BytesIO()
+    output.write(si.getvalue().encode('utf-8'))
+    output.seek(0)
+    yield output.getvalue()
+
+
+def check_round_trip(client, anomalies):
+    """Both formats read back to the exported values exactly."""
+    import numpy as np
+    import pandas as pd
+    csv_frame = pd.read_csv(io.BytesIO(client.get('/download/anomalies.csv').get_data()),
+                            float_precision='round_trip')
+    parquet_frame = pd.read_parquet(io.BytesIO(client.get('/download/anomalies.parquet').get_data()))
+    for out in (csv_frame, parquet_frame):
+        assert len(out) == len(anomalies)
+        assert (out['ticker'].to_numpy() == anomalies['ticker'].astype(str).to_numpy()).all()
+        for c in ('open', 'close', 'volume', 'anomaly_score'):
+            assert np.array_equal(out[c].to_numpy(dtype='float64'), anomalies[c].to_numpy(dtype='float64'),
+                                  equal_nan=True), c
+
+
+def streamed(client, url):
+    response = client.get(url, buffered=False)
+    assert response.status_code == 200, response.status_code
+    return iter(response.response)
+
+
+def measure(make_chunks, trace):
+    if trace:
+        tracemalloc.start()
+    start = time.perf_counter()
+    chunks = make_chunks()
+    first = None
+    total = 0
+    for chunk in chunks:
+        # Header-only chunks don't count as the first byte of data
+        if first is None and len(chunk) > 512:
+            first = time.perf_counter() - start
+        total += len(chunk)
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1] if trace else 0
+    if trace:
+        tracemalloc.stop()
+    return first, elapsed, total, peak
+
+
+def run(n_tickers, n_days, check=False):
+    frame = make_frame(n_tickers, n_days)
+    frame['anomaly'] = 1
+    frame.iloc[::97, frame.columns.get_loc('anomaly_score')] = float('nan')
+    app_module.loader.set(DataLoader.from_frame(frame))
+    anomalies = app_module.loader.anomalies
+    client = app_module.app.test_client()
+    if check:
+        check_round_trip(client, anomalies)
+        print("CSV and Parquet exports read back to the exported values exactly.")
+    print(f"{n_tickers} tickers x {n_days} days: exporting {len(anomalies):,} rows, "
+          f"{len(export_columns(anomalies))} columns")
+    cases = [
+        ('old StringIO/BytesIO', lambda: legacy_csv(anomalies)),
+        ('stream CSV', lambda: streamed(client, '/download/anomalies.csv')),
+        ('stream Parquet', lambda: streamed(client, '/download/anomalies.parquet')),
+    ]
+    for label, make_chunks in cases:
+        first, elapsed, total, _ = measure(make_chunks, trace=False)
+        _, _, _, peak = measure(make_chunks, trace=True)
+        print(f"  {label:<22} first byte {first * 1000:9.1f} ms | total {elapsed:6.2f}s | "
+              f"{total / 2**20:7.1f} MiB out | peak {peak / 2**20:7.1f} MiB")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--tickers', type=int, default=100)
+    parser.add_argument('--days', type=int, default=30 * 252)
+    args = parser.parse_args()
+    run(10, args.days, check=True)
+    run(args.tickers, args.days)
@@ -0,0 +1,152 @@
+# bench_jobs.py
+# POST /trigger/<symbol>: the old inline run (RunLog row + run_pipeline in the
+# request thread) vs queueing on jobs.JobRunner, with a pipeline that sleeps
+# for --seconds. Checks duplicate triggers coalesce, the worker cap holds,
+# failures are recorded and a restart fails the jobs left unfinished.
+import argparse
+import os
+import statistics
+import tempfile
+import threading
+import time
+import app as app_module
+import storage
+from app import create_app
+from data_loader import TOP_TICKERS
+from jobs import JobRunner, QUEUED, SUCCEEDED, FAILED
+from models import db, RunLog
+
+
+class SlowPipeline:
+    """Stands in for run_pipeline: sleeps, and counts how many runs overlap."""
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.active = 0
+        self.peak = 0
+        self.runs = []
+        self._lock = threading.Lock()
+
+    def __call__(self, symbol):
+        with self._lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+            self.runs.append(symbol)
+        try:
+            time.sleep(self.seconds)
+            if symbol == 'FAIL':
+                raise RuntimeError('fetch failed')
+            return f'Pipeline run completed for {symbol}'
+        finally:
+            with self._lock:
+                self.active -= 1
+
+
+def legacy_trigger(app, fn, symbol):
+    # The commented trigger_pipeline(), minus the redirect
+    with app.app_context():
+        log = RunLog(symbol=symbol, action='pipeline_run', status='started')
+        db.session.add(log)
+        db.session.commit()
+        log.message = fn(symbol)
+        log.status = 'success'
+        db.session.commit()
+
+
+def wait_for(client, job_ids, timeout=60):
+    deadline = time.monotonic() + timeout
+    pending = set(job_ids)
+    jobs = {}
+    while pending and time.monotonic() < deadline:
+        for job_id in list(pending):
+            job = client.get(f'/api/jobs/{job_id}').get_json()
+            if job['status'] in (SUCCEEDED, FAILED):
+                jobs[job_id] = job
+                pending.discard(job_id)
+        time.sleep(0.01)
+    assert not pending, f'jobs {sorted(pending)} did not finish'
+    return jobs
+
+
+def ms(samples):
+    samples = sorted(samples)
+    return (f"p50 {statistics.median(samples) * 1000:8.2f} ms | "
+            f"p95 {samples[int(len(samples) * 0.95) - 1] * 1000:8.2f} ms")
+
+
+def run(seconds, workers, n_triggers):
+    path = os.path.join(tempfile.mkdtemp(), 'jobs.db')
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{path}'})
+    pipeline = SlowPipeline(seconds)
+    runner = app_module.app.extensions['job_runner'] = JobRunner(app, pipeline, workers)
+    # GET /api/jobs/<id> reads through the served app's read engine, not the runner
+    app_module.app.extensions['sqlite_read_engine'] = storage.read_engine(app)
+    client = app_module.app.test_client()
+    tickers = list(TOP_TICKERS)
+    print(f"pipeline {seconds}s per run, {workers} workers")
+
+    legacy = []
+    for symbol in tickers[:3]:
+        start = time.perf_counter()
+        legacy_trigger(app, pipeline, symbol)
+        legacy.append(time.perf_counter() - start)
+    print(f"  inline trigger  {ms(legacy)}")
+
+    # Every ticker once, then each again while its first run is queued or running
+    latency, job_ids = [], []
+    for _ in range(n_triggers):
+        for symbol in tickers:
+            start = time.perf_counter()
+            response = client.post(f'/trigger/{symbol}')
+            latency.append(time.perf_counter() - start)
+            assert response.status_code == 202, response.status_code
+            assert response.headers['Location'] == response.get_json()['status_url']
+            job_ids.append(response.get_json()['job_id'])
+    print(f"  queued trigger  {ms(latency)}  ({len(latency)} triggers)")
+    start = time.perf_counter()
+    jobs = wait_for(client, set(job_ids))
+    print(f"  {len(jobs)} jobs for {len(job_ids)} triggers finished in {time.perf_counter() - start:.2f}s; "
+          f"peak concurrent runs {pipeline.peak}; {runner.stats()}")
+    assert pipeline.peak <= workers
+    # Up to one running and one queued follow-up per ticker
+    assert len(tickers) <= len(jobs) <= 2 * len(tickers)
+    assert all(job['status'] == SUCCEEDED and job['message'].endswith(job['symbol']) for job in jobs.values())
+
+    # Not a known ticker, so straight to the runner
+    job = next(iter(wait_for(client, [runner.submit('FAIL')[0]]).values()))
+    assert job['status'] == FAILED and 'fetch failed' in job['message']
+    assert client.get('/api/jobs/999999').status_code == 404
+    assert client.post('/trigger/NOPE').status_code == 404
+
+    # Importing the app (scripts, backfill, benchmarks) leaves unfinished jobs alone
+    assert 'job_runner' not in create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{path}'}).extensions
+
+    # Triggers for one ticker from many threads: one RunLog row each time, no lock held over the commit
+    before = runner.stats()['submitted']
+    ids = []
+    threads = [threading.Thread(target=lambda: ids.append(runner.submit('NVDA')[0])) for _ in range(20)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert runner.stats()['submitted'] - before == 20 and len(set(ids)) <= 2
+    wait_for(client, set(ids))
+
+    # A job queued when the process dies is failed by the next runner
+    with app.app_context():
+        db.session.add(RunLog(symbol='NVDA', status=QUEUED))
+        db.session.commit()
+    assert JobRunner(app, pipeline, workers).recover() == 0  # the constructor already did it
+    with app.app_context():
+        assert RunLog.query.filter_by(status=QUEUED).count() == 0
+    print("  coalescing, worker cap, failure status and restart recovery check out.")
+    runner.shutdown()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--seconds', type=float, default=0.5)
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--triggers', type=int, default=5, help='triggers per ticker')
+    args = parser.parse_args()
+    run(args.seconds, args.workers, args.triggers)
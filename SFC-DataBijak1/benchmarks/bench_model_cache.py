@@ -0,0 +1,39 @@
+# bench_model_cache.py
+# score_anomalies per ticker with a cold model cache (fit + dump), then with the
+# fitted models in memory, then loaded back from disk by a fresh cache.
+import argparse
+import tempfile
+import time
+import numpy as np
+import backfill_features_and_anomalies as backfill
+from backfill_features_and_anomalies import compute_features, score_anomalies
+from model_cache import ModelCache
+from benchmarks.bench_backfill_parallel import ticker_frames
+
+
+def score_all(frames):
+    start = time.perf_counter()
+    scores = {sym: score_anomalies(df.copy(), ticker=sym)['anomaly_score'].to_numpy() for sym, df in frames.items()}
+    return time.perf_counter() - start, scores
+
+
+def run(n_tickers, n_days):
+    frames = {sym: compute_features(df) for sym, df in ticker_frames(n_tickers, n_days).items()}
+    with tempfile.TemporaryDirectory() as tmp:
+        backfill.model_cache = ModelCache(tmp)
+        cold, reference = score_all(frames)
+        memory, scores = score_all(frames)
+        assert all(np.array_equal(reference[s], scores[s]) for s in frames)
+        backfill.model_cache = ModelCache(tmp)
+        disk, scores = score_all(frames)
+        assert all(np.array_equal(reference[s], scores[s]) for s in frames)
+    print(f"{n_tickers:>4} tickers x {n_days} days: fit {cold:6.2f}s | memory hit {memory:6.2f}s "
+          f"({cold / memory:5.1f}x) | disk load {disk:6.2f}s ({cold / disk:5.1f}x)")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--days', type=int, default=2520)
+    args = parser.parse_args()
+    run(8, args.days)
+    run(32, args.days)
@@ -0,0 +1,100 @@
+# bench_query_plans.py
+# The app's hot Anomaly queries on a scratch SQLite file, before and after
+# upgrade_schema() adds the (ticker_id, date) / (anomaly, ticker_id, date)
+# indexes. Exits non-zero if any query still scans the table afterwards.
+import argparse
+import os
+import sys
+import tempfile
+import time
+from sqlalchemy import func, select, text
+from app import create_app
+from models import db, Ticker, Anomaly, upgrade_schema, query_plan
+from benchmarks.synthetic import make_frame
+
+
+def hot_queries(ticker_id, start, end):
+    """The shapes used by migrate_mongo_to_sql, the backfill and anomaly listings."""
+    return {
+        'dedupe dates (import)': select(Anomaly.date).where(Anomaly.ticker_id == ticker_id),
+        'ticker rows by date (backfill)': select(Anomaly.id, Anomaly.date, Anomaly.close)
+            .where(Anomaly.ticker_id == ticker_id).order_by(Anomaly.date.asc()),
+        'rows past high-water mark': select(Anomaly.id, Anomaly.close)
+            .where(Anomaly.ticker_id == ticker_id, Anomaly.date > end).order_by(Anomaly.date.asc()),
+        'ticker date range': select(Anomaly.date, Anomaly.close)
+            .where(Anomaly.ticker_id == ticker_id, Anomaly.date.between(start, end)),
+        'anomalies for ticker': select(Anomaly.date, Anomaly.anomaly_score)
+            .where(Anomaly.anomaly == 1, Anomaly.ticker_id == ticker_id).order_by(Anomaly.date),
+        'anomalies in date range': select(Anomaly.ticker_id, Anomaly.date)
+            .where(Anomaly.anomaly == 1, Anomaly.date.between(start, end)),
+    }
+
+
+def seed(n_tickers, n_days):
+    frame = make_frame(n_tickers, n_days)
+    ids = {}
+    for sym in frame['ticker'].unique():
+        t = Ticker(symbol=sym)
+        db.session.add(t)
+        db.session.flush()
+        ids[sym] = t.id
+    rows = [{'ticker_id': ids[sym], 'date': d, 'close': c, 'anomaly': int(a), 'anomaly_score': s}
+            for sym, d, c, a, s in zip(frame['ticker'], frame.index.date, frame['close'],
+                                       frame['anomaly'], frame['anomaly_score'])]
+    # A few duplicate (ticker, date) rows, as older imports could leave behind
+    rows += rows[:10]
+    db.session.execute(Anomaly.__table__.insert(), rows)
+    db.session.commit()
+    return ids, frame.index.date
+
+
+def time_queries(queries, repeat):
+    out = {}
+    with db.engine.connect() as conn:
+        for name, stmt in queries.items():
+            start = time.perf_counter()
+            for _ in range(repeat):
+                conn.execute(stmt).fetchall()
+            out[name] = (time.perf_counter() - start) / repeat
+    return out
+
+
+def run(n_tickers, n_days, repeat):
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + os.path.join(tmp, 'plans.db')})
+        with app.app_context():
+            # Start from a pre-index file, as existing databases are
+            for index in Anomaly.__table__.indexes:
+                db.session.execute(text(f'DROP INDEX IF EXISTS {index.name}'))
+            db.session.commit()
+            ids, dates = seed(n_tickers, n_days)
+            ticker_id = ids[max(ids)]
+            start, end = dates[len(dates) // 2], dates[len(dates) // 2 + 60]
+            queries = hot_queries(ticker_id, start, end)
+
+            before = time_queries(queries, repeat)
+            started = time.perf_counter()
+            upgrade_schema()
+            migrate = time.perf_counter() - started
+            after = time_queries(queries, repeat)
+
+            n_rows = db.session.scalar(select(func.count()).select_from(Anomaly))
+            print(f"{n_tickers} tickers x {n_days} days ({n_rows} rows after dedupe), "
+                  f"upgrade_schema {migrate:.2f}s")
+            failures = 0
+            for name, stmt in queries.items():
+                plan = '; '.join(query_plan(stmt))
+                uses_index = 'USING INDEX' in plan or 'USING COVERING INDEX' in plan
+                failures += not uses_index
+                print(f"  {name:<32} {before[name] * 1000:8.2f} ms -> {after[name] * 1000:6.2f} ms  "
+                      f"{'ok  ' if uses_index else 'SCAN'} {plan}")
+            return failures
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--tickers', type=int, default=50)
+    parser.add_argument('--days', type=int, default=2520)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+    sys.exit(1 if run(args.tickers, args.days, args.repeat) else 0)
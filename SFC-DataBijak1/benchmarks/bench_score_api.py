@@ -0,0 +1,84 @@
+# bench_score_api.py
+# p50/p99 latency of POST /api/score/<ticker> for batches of 1, 100 and 10,000
+# bars (warm model), and how many concurrent 1-bar requests share a batch.
+import json
+import tempfile
+import threading
+import time
+import numpy as np
+import pandas as pd
+import scoring
+from data_loader import DataLoader, loader
+from model_cache import ModelCache
+from benchmarks.synthetic import make_frame
+
+
+def new_bars(history, n, seed=0):
+    """n business-day bars continuing after the ticker's last loaded date."""
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range(history.index[-1] + pd.Timedelta(days=1), periods=n)
+    close = history['close'].iloc[-1] * np.exp(np.cumsum(rng.normal(0, 0.02, n)))
+    return [{'date': d.strftime('%Y-%m-%d'), 'close': float(c), 'volume': float(v)}
+            for d, c, v in zip(dates, close, rng.integers(100_000, 10_000_000, n))]
+
+
+def latency(client, url, payload, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        resp = client.post(url, json=payload)
+        times.append(time.perf_counter() - start)
+        assert resp.status_code == 200, resp.data
+    ms = np.asarray(times) * 1000
+    return np.percentile(ms, 50), np.percentile(ms, 99)
+
+
+def run():
+    from app import app
+    loader.set(DataLoader.from_frame(make_frame(8, 2520)))
+    sym = loader.data['ticker'].iloc[0]
+    history = loader.get_ticker_data(sym)
+    client = app.test_client()
+    url = f'/api/score/{sym}'
+    with tempfile.TemporaryDirectory() as tmp:
+        scoring.model_cache = ModelCache(tmp)
+        start = time.perf_counter()
+        client.post(url, json=new_bars(history, 1))
+        print(f"first request (features + fit over {len(history)} rows): {(time.perf_counter() - start) * 1000:.0f} ms")
+
+        for n, repeat in ((1, 200), (100, 200), (10_000, 20)):
+            p50, p99 = latency(client, url, new_bars(history, n), repeat)
+            print(f"{n:>6} bars: p50 {p50:7.2f} ms | p99 {p99:7.2f} ms")
+
+        # 16 clients posting single bars at once
+        scoring.scorer.batcher.calls = scoring.scorer.batcher.batches = 0
+        payload = new_bars(history, 1)
+        def post():
+            for _ in range(20):
+                app.test_client().post(url, json=payload)
+        threads = [threading.Thread(target=post) for _ in range(16)]
+        start = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - start
+        stats = scoring.scorer.batcher.stats()
+        print(f"16 concurrent clients: {stats['calls']} requests in {elapsed:.2f}s "
+              f"({stats['calls'] / elapsed:,.0f} req/s), {stats['batches']} model calls "
+              f"({stats['calls_per_batch']} requests per call)")
+
+        # The model is evicted from the LRU while its batch waits out the window
+        scorer = scoring.scorer
+        bars = scoring.parse_bars(json.dumps(new_bars(history, 5)).encode(), 'application/json')
+        expected = scorer.score(sym, loader.version, history, bars)
+        evict = threading.Timer(scorer.batcher.window / 2, scorer.models.clear)
+        evict.start()
+        got = scorer.score(sym, loader.version, history, bars)
+        evict.join()
+        assert np.allclose(got, expected)
+        print("a model evicted mid-batch still scores its batch")
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,48 @@
+# bench_sequences.py
+# Building 30-row windows for 8 tickers: the notebook's create_sequences() loop
+# vs sequences.sliding_windows(), and scoring every window in float32 batches.
+import time
+import tracemalloc
+import numpy as np
+from sequences import SEQUENCE_LENGTH, sliding_windows, reconstruction_errors
+
+
+def create_sequences(data, sequence_length):
+    # As in the notebook
+    sequences = []
+    for i in range(len(data) - sequence_length + 1):
+        sequences.append(data[i:(i + sequence_length)])
+    return np.array(sequences)
+
+
+def measure(fn):
+    tracemalloc.start()
+    start = time.perf_counter()
+    out = fn()
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return out, elapsed, peak
+
+
+def run(n_tickers=8, years=30, n_features=7):
+    rng = np.random.default_rng(0)
+    matrices = [rng.normal(size=(years * 252, n_features)) for _ in range(n_tickers)]
+
+    loop, loop_s, loop_peak = measure(lambda: [create_sequences(m, SEQUENCE_LENGTH) for m in matrices])
+    view, view_s, view_peak = measure(lambda: [sliding_windows(m) for m in matrices])
+    assert all(np.array_equal(a, b) for a, b in zip(loop, view))
+    print(f"{n_tickers} tickers x {years}y x {n_features} features:")
+    print(f"  create_sequences  {loop_s * 1000:8.1f} ms | peak {loop_peak / 2**20:7.1f} MiB")
+    print(f"  sliding_windows   {view_s * 1000:8.1f} ms | peak {view_peak / 2**20:7.1f} MiB")
+
+    # Stand-in reconstruction (a real run passes model.predict)
+    predict = lambda batch: batch * 0.9
+    _, full_s, full_peak = measure(lambda: [np.mean(np.mean(np.square(s - predict(s)), axis=1), axis=1) for s in loop])
+    _, batch_s, batch_peak = measure(lambda: [reconstruction_errors(predict, m) for m in matrices])
+    print(f"  errors on full tensor   {full_s * 1000:8.1f} ms | peak {full_peak / 2**20:7.1f} MiB")
+    print(f"  batched float32 errors  {batch_s * 1000:8.1f} ms | peak {batch_peak / 2**20:7.1f} MiB")
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,56 @@
+# bench_series.py
+# Payload size and latency of /api/series/<ticker>: full history (max_points=<bars>)
+# versus LTTB / min-max decimation, for growing history lengths. First checks
+# the table-driven LTTB picks the same points as the bucket-by-bucket walk.
+import time
+import numpy as np
+import downsample
+from data_loader import DataLoader, loader
+from benchmarks.synthetic import make_frame
+
+
+def _request(client, url, repeat=5):
+    best, body = float('inf'), b''
+    for _ in range(repeat):
+        start = time.perf_counter()
+        body = client.get(url).data
+        best = min(best, time.perf_counter() - start)
+    return best, len(body)
+
+
+def check_lttb(seed=0):
+    """lttb_indices with and without the predecessor table must keep identical points."""
+    rng = np.random.default_rng(seed)
+    saved = downsample.LTTB_TABLE_MAX_WIDTH
+    try:
+        for n, n_out in ((2520, 1200), (7560, 1200), (15120, 1200), (15120, 2000), (5000, 333)):
+            x = np.arange(n, dtype='float64')
+            y = np.cumsum(rng.standard_normal(n))
+            y[rng.random(n) < 0.005] = np.nan
+            downsample.LTTB_TABLE_MAX_WIDTH = saved
+            fast = downsample.lttb_indices(x, y, n_out)
+            downsample.LTTB_TABLE_MAX_WIDTH = 0
+            assert np.array_equal(fast, downsample.lttb_indices(x, y, n_out)), (n, n_out)
+    finally:
+        downsample.LTTB_TABLE_MAX_WIDTH = saved
+    print("LTTB: the predecessor table keeps the same points as the per-bucket walk.")
+
+
+def run(years_options=(10, 30, 60), max_points=1200):
+    from app import app
+    client = app.test_client()
+    for years in years_options:
+        n_days = years * 252
+        loader.set(DataLoader.from_frame(make_frame(1, n_days)))
+        sym = loader.data['ticker'].iloc[0]
+        full_t, full_b = _request(client, f'/api/series/{sym}?max_points={n_days}')
+        lttb_t, lttb_b = _request(client, f'/api/series/{sym}?max_points={max_points}')
+        mm_t, mm_b = _request(client, f'/api/series/{sym}?max_points={max_points}&method=minmax')
+        print(f"{years:>3}y ({n_days:>6} bars): full {full_b / 1024:8.1f} KB {full_t * 1e3:7.1f} ms | "
+              f"lttb {lttb_b / 1024:6.1f} KB {lttb_t * 1e3:6.1f} ms | "
+              f"minmax {mm_b / 1024:6.1f} KB {mm_t * 1e3:6.1f} ms")
+
+
+if __name__ == '__main__':
+    check_lttb()
+    run()
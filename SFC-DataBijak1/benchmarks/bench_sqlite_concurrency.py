@@ -0,0 +1,143 @@
+# bench_sqlite_concurrency.py
+# Dashboard-style read latency on the SQLite file while a backfill-style
+# writer (write_back in chunks, separate process) is running, with the
+# default rollback journal vs the WAL profile from config.SQLITE_PRAGMAS. Exits
+# non-zero if WAL reads during the write grow past MAX_P99_GROWTH_MS over idle.
+import argparse
+import multiprocessing as mp
+import os
+import tempfile
+import threading
+import time
+import numpy as np
+import pandas as pd
+from sqlalchemy import select
+import storage
+from app import create_app
+from models import db, Ticker, Anomaly
+from backfill_features_and_anomalies import write_back, BACKFILL_CHUNK_SIZE
+from benchmarks.synthetic import make_frame
+
+ROLLBACK_PRAGMAS = {'journal_mode': 'DELETE'}
+# Allowed p99 read latency growth (ms) while the writer runs, WAL profile
+MAX_P99_GROWTH_MS = 50
+
+
+def make_app(path, profile):
+    """An app on ``path`` whose engines use ``profile``; the module's profile is left as it was."""
+    saved = storage.SQLITE_PRAGMAS
+    if profile == 'rollback':
+        # Baseline: sqlite3 defaults (rollback journal, 5 s driver timeout)
+        storage.SQLITE_PRAGMAS = ROLLBACK_PRAGMAS
+    try:
+        app = create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + path})
+        storage.read_engine(app)  # attaches its pragmas now, under the same profile
+        return app
+    finally:
+        storage.SQLITE_PRAGMAS = saved
+
+
+def seed(app, n_tickers, n_days):
+    frame = make_frame(n_tickers, n_days)
+    with app.app_context():
+        ids = {}
+        for sym in frame['ticker'].unique():
+            t = Ticker(symbol=sym)
+            db.session.add(t)
+            db.session.flush()
+            ids[sym] = t.id
+        db.session.execute(Anomaly.__table__.insert(), [
+            {'ticker_id': ids[sym], 'date': d, 'close': c, 'anomaly': int(a)}
+            for sym, d, c, a in zip(frame['ticker'], frame.index.date, frame['close'], frame['anomaly'])])
+        db.session.commit()
+        return list(ids.values()), sorted(set(frame.index.date))
+
+
+def writer(path, profile, chunk_size, ready, stop):
+    """Rewrite anomaly_score for every row, over and over, like a backfill."""
+    app = make_app(path, profile)
+    rng = np.random.default_rng(0)
+    with app.app_context():
+        ids = db.session.execute(select(Anomaly.id)).scalars().all()
+        rows = 0
+        ready.set()
+        while not stop.is_set():
+            df = pd.DataFrame({'id': ids, 'anomaly_score': rng.random(len(ids))})
+            rows += write_back(df, ['anomaly_score'], chunk_size=chunk_size)
+    print(f"    writer: {rows:,} rows updated")
+
+
+def reader(engine, ticker_ids, dates, stop_at, latencies, errors, seed):
+    rng = np.random.default_rng(seed)
+    while time.time() < stop_at:
+        i = int(rng.integers(0, len(dates) - 60))
+        stmt = (select(Anomaly.date, Anomaly.close, Anomaly.anomaly_score)
+                .where(Anomaly.ticker_id == int(rng.choice(ticker_ids)),
+                       Anomaly.date.between(dates[i], dates[i + 60])))
+        start = time.perf_counter()
+        try:
+            with engine.connect() as conn:
+                conn.execute(stmt).fetchall()
+            latencies.append(time.perf_counter() - start)
+        except Exception:
+            errors.append(time.perf_counter() - start)
+
+
+def read_for(engine, ticker_ids, dates, seconds, n_readers):
+    latencies, errors = [], []
+    stop_at = time.time() + seconds
+    threads = [threading.Thread(target=reader, args=(engine, ticker_ids, dates, stop_at, latencies, errors, i))
+               for i in range(n_readers)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    ms = np.asarray(latencies) * 1000
+    stats = {'reads': len(ms), 'p50': np.percentile(ms, 50), 'p99': np.percentile(ms, 99),
+             'max': ms.max(), 'errors': len(errors)}
+    print(f"{stats['reads']:6d} reads | p50 {stats['p50']:7.2f} ms | p99 {stats['p99']:8.2f} ms | "
+          f"max {stats['max']:8.2f} ms | errors {stats['errors']}")
+    return stats
+
+
+def run(profile, n_tickers, n_days, seconds, n_readers, chunk_size):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'concurrency.db')
+        app = make_app(path, profile)
+        ticker_ids, dates = seed(app, n_tickers, n_days)
+        engine = storage.read_engine(app)
+        with engine.connect() as conn:
+            mode = conn.exec_driver_sql('PRAGMA journal_mode').scalar()
+        print(f"{profile} (chunk {chunk_size}, journal_mode={mode}):")
+        print("  idle         ", end=' ')
+        idle = read_for(engine, ticker_ids, dates, seconds, n_readers)
+        ctx = mp.get_context('spawn')
+        ready, stop = ctx.Event(), ctx.Event()
+        proc = ctx.Process(target=writer, args=(path, profile, chunk_size, ready, stop))
+        proc.start()
+        ready.wait()
+        print("  during write ", end=' ')
+        busy = read_for(engine, ticker_ids, dates, seconds, n_readers)
+        stop.set()
+        proc.join()
+        engine.dispose()
+        with app.app_context():
+            db.engine.dispose()
+    return idle, busy
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--tickers', type=int, default=40)
+    parser.add_argument('--days', type=int, default=7560)
+    parser.add_argument('--seconds', type=float, default=20)
+    parser.add_argument('--readers', type=int, default=2)
+    parser.add_argument('--chunk-size', type=int, default=BACKFILL_CHUNK_SIZE)
+    args = parser.parse_args()
+    results = {profile: run(profile, args.tickers, args.days, args.seconds, args.readers, args.chunk_size)
+               for profile in ('rollback', 'wal')}
+    idle, busy = results['wal']
+    growth = busy['p99'] - idle['p99']
+    print(f"WAL p99 growth during the write: {growth:.2f} ms (limit {MAX_P99_GROWTH_MS} ms)")
+    if busy['errors'] or growth > MAX_P99_GROWTH_MS:
+        raise SystemExit(1)
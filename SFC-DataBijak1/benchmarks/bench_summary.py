@@ -0,0 +1,66 @@
+# bench_summary.py
+# Dashboard figures: the old per-request groupby vs the summary built with each
+# snapshot. Checks the summary against pandas, then times building it once and
+# serving it per request, at 8 and 2,000 tickers.
+import argparse
+import time
+import pandas as pd
+from data_loader import DataLoader, _build_summary
+from benchmarks.synthetic import make_frame
+
+
+def per_request(snap):
+    # What the '/' route computed on every page view
+    return {
+        'total_rows': len(snap.data),
+        'total_anomalies': len(snap.anomalies),
+        'top_tickers': snap.data.groupby('ticker', observed=True)['close'].last().to_dict(),
+    }
+
+
+def check(loader):
+    snap = loader.snapshot()
+    summary = snap.summary
+    last = per_request(snap)['top_tickers']
+    assert summary.total_rows == len(snap.data) and summary.total_anomalies == len(snap.anomalies)
+    for sym, t in summary.tickers.items():
+        assert t.last_close == last[sym], sym
+        rows = snap.data[snap.data['ticker'] == sym]
+        flagged = rows[rows['anomaly'] == 1].index
+        end = rows.index.max()
+        assert t.anomalies_all == len(flagged), sym
+        assert t.anomalies_30d == (flagged >= end.normalize() - pd.Timedelta(days=29)).sum(), sym
+        assert t.anomalies_1d == (flagged >= end.normalize()).sum(), sym
+        assert t.day_change == rows['close'].iloc[-1] - rows['close'].iloc[-2], sym
+
+
+def timed(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat
+
+
+def run(n_tickers, n_days, repeat):
+    loader = DataLoader.from_frame(make_frame(n_tickers, n_days))
+    snap = loader.snapshot()
+    groupby_s = timed(lambda: per_request(snap), repeat)
+    serve_s = timed(lambda: loader.summary, repeat * 100)
+    build_s = timed(lambda: _build_summary(snap.data, snap.anomalies, snap.ticker_index, snap.anomaly_index,
+                                           snap.version, snap.loaded_at), 3)
+    print(f"{n_tickers:>5} tickers x {n_days} days: groupby per request {groupby_s * 1000:8.2f} ms | "
+          f"summary per request {serve_s * 1e6:6.2f} us | built once per snapshot {build_s * 1000:7.2f} ms")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--days', type=int, default=2520)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+    frame = make_frame(8, args.days)
+    # Flag a ticker's last bars so the 1d/30d windows are non-trivial
+    frame.iloc[args.days - 5:args.days, frame.columns.get_loc('anomaly')] = 1
+    check(DataLoader.from_frame(frame))
+    print("Summary matches pandas (last close, day change, 1d/30d/all anomaly counts).")
+    run(8, args.days, args.repeat)
+    run(2000, args.days, args.repeat)
@@ -0,0 +1,41 @@
+# bench_ticker_index.py
+# Per-ticker lookup cost: full-frame boolean scan + copy (old get_ticker_data)
+# versus the (ticker, date) slice index built at load time.
+import time
+import numpy as np
+from data_loader import DataLoader
+from benchmarks.synthetic import make_frame, ticker_symbols
+
+
+def _timeit(fn, symbols, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for sym in symbols:
+            fn(sym)
+        best = min(best, time.perf_counter() - start)
+    return best / len(symbols)
+
+
+def run(n_tickers, n_days, lookups=50, seed=42):
+    frame = make_frame(n_tickers, n_days, seed)
+    start = time.perf_counter()
+    loader = DataLoader.from_frame(frame)
+    build = time.perf_counter() - start
+
+    rng = np.random.default_rng(seed)
+    symbols = list(rng.choice(ticker_symbols(n_tickers), size=lookups))
+    data = loader.data
+
+    scan = _timeit(lambda s: data[data['ticker'] == s].copy(), symbols)
+    indexed = _timeit(loader.get_ticker_data, symbols)
+    ranged = _timeit(lambda s: loader.get_ticker_range(s, '2000-01-01', '2000-12-31'), symbols)
+    print(f"{n_tickers:>6} tickers x {n_days} days ({len(data):>9} rows): "
+          f"index build {build * 1e3:8.1f} ms | scan+copy {scan * 1e6:10.1f} us | "
+          f"slice {indexed * 1e6:7.1f} us | date range {ranged * 1e6:7.1f} us | "
+          f"speedup {scan / indexed:8.1f}x")
+
+
+if __name__ == '__main__':
+    run(8, 7560)
+    run(5000, 2520, lookups=20)
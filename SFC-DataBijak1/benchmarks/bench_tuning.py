@@ -0,0 +1,57 @@
+# bench_tuning.py
+# Full 8-ticker IsolationForest grid: the notebook's serial loop (one fit per
+# contamination x max_samples x n_estimators x fold) vs tuning.tune().
+import argparse
+import os
+import time
+from itertools import product
+import numpy as np
+from sklearn.ensemble import IsolationForest
+from sklearn.metrics import f1_score
+from sklearn.model_selection import TimeSeriesSplit
+import tuning
+from benchmarks.synthetic import make_frame
+
+
+def notebook_grid(frames):
+    """detect_anomalies' search as in the notebook, returning each ticker's best params."""
+    best = {}
+    for ticker, df in frames.items():
+        data = tuning.prepare_ticker(df)
+        X_train, y = data['X_train'], data['y_train']
+        best_score, best_params = -1.0, None
+        for contamination, max_samples, n_estimators in product(
+                tuning.contamination_grid(y.mean()), tuning.MAX_SAMPLES_OPTIONS, tuning.N_ESTIMATORS_OPTIONS):
+            clf = IsolationForest(contamination=contamination, max_samples=max_samples,
+                                  n_estimators=n_estimators, random_state=42)
+            f1s = []
+            for train_idx, val_idx in TimeSeriesSplit(n_splits=tuning.CV_SPLITS).split(X_train):
+                clf.fit(X_train[train_idx])
+                f1s.append(f1_score(y[val_idx], (clf.predict(X_train[val_idx]) == -1).astype(int), zero_division=0))
+            if np.mean(f1s) > best_score:
+                best_score = np.mean(f1s)
+                best_params = {'contamination': contamination, 'max_samples': max_samples, 'n_estimators': n_estimators}
+        best[ticker] = (best_score, best_params)
+    return best
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--days', type=int, default=2520)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    args = parser.parse_args()
+    frame = make_frame(8, args.days)
+    frames = {t: df for t, df in frame.groupby('ticker', sort=False)}
+
+    start = time.perf_counter()
+    reference = notebook_grid(frames)
+    serial = time.perf_counter() - start
+    start = time.perf_counter()
+    summary = tuning.tune(frames, workers=args.workers).set_index('ticker')
+    tuned = time.perf_counter() - start
+
+    same = all(np.isclose(summary.loc[t, 'cv_f1'], score) and
+               all(summary.loc[t, k] == v for k, v in params.items())
+               for t, (score, params) in reference.items())
+    print(f"8 tickers x {args.days} days: notebook grid {serial:6.1f}s | tune() {tuned:5.1f}s "
+          f"({serial / tuned:4.1f}x, {args.workers} workers) | same best params and CV F1: {same}")
@@ -0,0 +1,110 @@
+# check_incremental_features.py
+# Randomized check of the incremental backfill (--incremental, FeatureState):
+# random histories with missing closes/volumes are written in random chunks,
+# one full backfill then an incremental run per chunk, and every stored
+# feature must equal compute_features over the whole history.
+#   python -m benchmarks.check_incremental_features --trials 40 --seed 0
+import argparse
+import os
+import tempfile
+import numpy as np
+import pandas as pd
+import backfill_features_and_anomalies as backfill
+from app import create_app
+from features import FEATURE_COLUMNS, compute_features
+from model_cache import ModelCache
+from models import db, Ticker, Anomaly, FeatureState
+
+RTOL = 1e-7
+ATOL = 1e-9
+
+
+def random_history(rng):
+    """A random-length price/volume history with random NaN runs, on business days."""
+    n = int(rng.choice([rng.integers(2, 40), rng.integers(40, 260), rng.integers(260, 700)]))
+    close = 100 * np.exp(np.cumsum(rng.normal(0, rng.uniform(0.001, 0.05), n)))
+    volume = rng.integers(1, 10_000_000, n).astype('float64')
+    for values, p in ((close, rng.uniform(0, 0.2)), (volume, rng.uniform(0, 0.2))):
+        values[rng.random(n) < p] = np.nan
+    if rng.random() < 0.3:
+        # A longer gap, e.g. a feed outage
+        start = rng.integers(0, n)
+        close[start:start + rng.integers(1, 30)] = np.nan
+    if rng.random() < 0.1:
+        close[:] = close[0]  # flat: zero losses in RSI
+    dates = pd.bdate_range('2015-01-01', periods=n).date
+    return pd.DataFrame({'date': dates, 'close': close, 'volume': volume})
+
+
+def split_points(rng, n):
+    """Sorted cut positions: the first chunk is the full backfill, the rest incremental runs."""
+    k = int(rng.integers(1, 5))
+    return sorted(set(int(c) for c in rng.integers(1, n, size=k))) if n > 1 else []
+
+
+def insert_rows(ticker_id, rows):
+    db.session.bulk_insert_mappings(Anomaly, [
+        {'ticker_id': ticker_id, 'date': d, 'close': None if np.isnan(c) else float(c),
+         'volume': None if np.isnan(v) else float(v)}
+        for d, c, v in zip(rows['date'], rows['close'], rows['volume'])])
+    db.session.commit()
+
+
+def stored_features(ticker_id):
+    rows = (db.session.query(*[getattr(Anomaly, c) for c in FEATURE_COLUMNS])
+            .filter(Anomaly.ticker_id == ticker_id).order_by(Anomaly.date).all())
+    return pd.DataFrame(rows, columns=FEATURE_COLUMNS, dtype='float64')
+
+
+def trial(app, rng, symbol):
+    history = random_history(rng)
+    cuts = split_points(rng, len(history))
+    with app.app_context():
+        ticker = Ticker(symbol=symbol)
+        db.session.add(ticker)
+        db.session.commit()
+        ticker_id = ticker.id
+    for i, (lo, hi) in enumerate(zip([0] + cuts, cuts + [len(history)])):
+        with app.app_context():
+            insert_rows(ticker_id, history.iloc[lo:hi])
+        backfill.backfill_for_ticker(symbol, incremental=i > 0, app=app)
+
+    expected = compute_features(history[['close', 'volume']].copy())
+    with app.app_context():
+        actual = stored_features(ticker_id)
+        has_state = db.session.get(FeatureState, ticker_id) is not None
+    bad = []
+    if has_state or not history['close'].isna().all():
+        for col in FEATURE_COLUMNS:
+            e, a = expected[col].to_numpy(dtype='float64'), actual[col].to_numpy(dtype='float64')
+            if not (np.array_equal(np.isnan(e), np.isnan(a)) and np.allclose(e, a, rtol=RTOL, atol=ATOL, equal_nan=True)):
+                first = int(np.flatnonzero(~np.isclose(e, a, rtol=RTOL, atol=ATOL, equal_nan=True))[0])
+                bad.append(f"{col} from row {first}: expected {e[first]!r}, got {a[first]!r}")
+    return len(history), cuts, bad
+
+
+def run(trials, seed):
+    rng = np.random.default_rng(seed)
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_app({'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(tmp, 'incremental.db')}"})
+        backfill.model_cache = ModelCache(os.path.join(tmp, 'models'))  # keep models out of instance/
+        failures = 0
+        for i in range(trials):
+            n, cuts, bad = trial(app, rng, f'T{i}')
+            if bad:
+                failures += 1
+                print(f"trial {i}: {n} rows split at {cuts}:\n    " + "\n    ".join(bad))
+        with app.app_context():
+            db.session.remove()
+            db.engine.dispose()
+    print(f"{trials - failures}/{trials} random histories match a full recompute "
+          f"(seed {seed}, rtol={RTOL}, atol={ATOL}, identical NaN masks).")
+    return failures == 0
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--trials', type=int, default=40)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    raise SystemExit(0 if run(args.trials, args.seed) else 1)
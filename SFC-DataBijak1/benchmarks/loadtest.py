@@ -0,0 +1,326 @@
+# loadtest.py
+# End-to-end load test: boots the app in a subprocess on synthetic GBM data
+# (threaded Werkzeug server, as `app.run` serves it) and drives a weighted mix
+# of routes from N concurrent users over a small asyncio HTTP/1.1 client, all
+# on localhost. Reports requests/s, p50/p95/p99 latency and error rate per
+# route, saved as JSON and optionally diffed against a baseline.
+#
+#   python -m benchmarks.loadtest run -o after.json [--concurrency 16] [--duration 20] [--baseline before.json]
+#   python -m benchmarks.loadtest compare before.json after.json [--threshold 0.15]
+#   python -m benchmarks.loadtest run --url http://127.0.0.1:8000   # an app that is already running
+#
+# Users are closed-loop: each sends its next request when the previous one
+# returns. The client keeps connections alive when the server allows it;
+# Werkzeug closes every one, so spawned runs include a localhost connect per
+# request. On a one-CPU box client and server share the core; the client's
+# CPU time is reported next to the results for that reason.
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+from urllib.parse import urlsplit
+import numpy as np
+from data_loader import TOP_TICKERS
+
+# route template -> weight; {ticker} is a random dashboard ticker per request
+DEFAULT_MIX = {'/': 1, '/ticker/{ticker}': 1, '/anomalies': 2, '/api/anomalies/{ticker}': 4}
+LATENCY_PERCENTILES = (50, 95, 99)
+
+
+def parse_mix(text):
+    """'/=1,/anomalies=2' -> {'/': 1.0, '/anomalies': 2.0}."""
+    mix = {}
+    for part in text.split(','):
+        route, sep, weight = part.rpartition('=')
+        if not sep or not route.startswith('/'):
+            raise argparse.ArgumentTypeError(f'Bad mix entry {part!r}; expected /route=weight')
+        mix[route] = float(weight)
+    return mix
+
+
+class Connection:
+    """One keep-alive HTTP/1.1 connection; reconnects when the server closes it."""
+
+    def __init__(self, host, port, headers):
+        self.host, self.port = host, port
+        self.headers = ''.join(f'{k}: {v}\r\n' for k, v in headers.items())
+        self.reader = self.writer = None
+
+    async def get(self, path):
+        """GET ``path``; returns (status, body bytes)."""
+        fresh = self.writer is None
+        if fresh:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        self.writer.write(f'GET {path} HTTP/1.1\r\nHost: {self.host}:{self.port}\r\n{self.headers}\r\n'.encode())
+        await self.writer.drain()
+        status_line = await self.reader.readline()
+        if not status_line:
+            # The server dropped an idle keep-alive connection: retry once on a new one
+            self.close()
+            if fresh:
+                raise ConnectionError('connection closed before a response')
+            return await self.get(path)
+        version, status = status_line.split()[:2]
+        headers = {}
+        while True:
+            line = await self.reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+        if 'content-length' in headers:
+            size = len(await self.reader.readexactly(int(headers['content-length'])))
+        elif headers.get('transfer-encoding', '').lower() == 'chunked':
+            size = 0
+            while True:
+                chunk = int((await self.reader.readline()).split(b';')[0], 16)
+                await self.reader.readexactly(chunk + 2)  # data + CRLF
+                size += chunk
+                if chunk == 0:
+                    break
+        else:
+            size = len(await self.reader.read())
+            headers['connection'] = 'close'
+        if headers.get('connection', '').lower() == 'close' or version == b'HTTP/1.0':
+            self.close()
+        return int(status), size
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+        self.reader = self.writer = None
+
+
+async def user(conn, mix, tickers, rng, start_at, deadline, timeout, samples):
+    """Send requests back to back until ``deadline``; keep samples of those started after ``start_at``."""
+    routes = list(mix)
+    weights = np.array(list(mix.values())) / sum(mix.values())
+    while time.monotonic() < deadline:
+        route = routes[rng.choice(len(routes), p=weights)]
+        path = route.replace('{ticker}', tickers[rng.integers(len(tickers))])
+        started = time.monotonic()
+        try:
+            status, size = await asyncio.wait_for(conn.get(path), timeout)
+        except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError):
+            conn.close()
+            status, size = None, 0
+        if started >= start_at:
+            samples.append((route, time.monotonic() - started, status, size))
+
+
+async def drive(url, mix, tickers, concurrency, duration, warmup, timeout, seed, gzip):
+    parts = urlsplit(url)
+    headers = {'Accept-Encoding': 'gzip'} if gzip else {}
+    samples = []
+    start_at = time.monotonic() + warmup
+    deadline = start_at + duration
+    conns = [Connection(parts.hostname, parts.port or 80, headers) for _ in range(concurrency)]
+    try:
+        await asyncio.gather(*[
+            user(conn, mix, tickers, np.random.default_rng([seed, i]), start_at, deadline, timeout, samples)
+            for i, conn in enumerate(conns)])
+    finally:
+        for conn in conns:
+            conn.close()
+    return samples
+
+
+def summarize(samples, duration):
+    """Per-route (and total) request rate, latency percentiles in ms and error rate."""
+    def stats(rows):
+        latency = np.array([r[1] for r in rows]) * 1000
+        errors = sum(r[2] is None or r[2] >= 400 for r in rows)
+        out = {'requests': len(rows), 'errors': int(errors), 'error_rate': errors / len(rows),
+               'rps': len(rows) / duration, 'mean_ms': float(latency.mean()),
+               'bytes_per_request': sum(r[3] for r in rows) / len(rows)}
+        for p, value in zip(LATENCY_PERCENTILES, np.percentile(latency, LATENCY_PERCENTILES)):
+            out[f'p{p}_ms'] = float(value)
+        return out
+    routes = {}
+    for row in samples:
+        routes.setdefault(row[0], []).append(row)
+    result = {route: stats(rows) for route, rows in sorted(routes.items())}
+    if samples:
+        result['total'] = stats(samples)
+    return result
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def wait_until_up(url, timeout):
+    """Poll /api/summary until the app answers 200 (data loaded)."""
+    parts = urlsplit(url)
+
+    async def probe():
+        conn = Connection(parts.hostname, parts.port or 80, {})
+        try:
+            return (await conn.get('/api/summary'))[0]
+        finally:
+            conn.close()
+
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if asyncio.run(probe()) == 200:
+                return
+        except (OSError, asyncio.IncompleteReadError):
+            pass
+        time.sleep(0.25)
+    raise RuntimeError(f'server at {url} did not come up within {timeout}s')
+
+
+def serve(args):
+    """Load the synthetic data into the app's loader and serve it (threaded Werkzeug)."""
+    from werkzeug.serving import WSGIRequestHandler, make_server
+    import app as app_module
+    from data_loader import DataLoader
+    from benchmarks.synthetic import gbm_frame
+    frame = gbm_frame(args.tickers, args.years, args.seed)
+    # The dashboard and /ticker/<symbol> serve TOP_TICKERS, so the first tickers take their names
+    symbols = list(frame['ticker'].cat.categories)
+    n = min(len(TOP_TICKERS), len(symbols))
+    frame['ticker'] = frame['ticker'].cat.rename_categories(TOP_TICKERS[:n] + symbols[n:])
+    app_module.loader.set(DataLoader.from_frame(frame))
+
+    class Handler(WSGIRequestHandler):
+        def log_request(self, *args, **kwargs):
+            pass  # one access-log line per request would cost more than some routes
+
+    server = make_server(args.host, args.port, app_module.app, threaded=True, request_handler=Handler)
+    print(f'serving {len(frame):,} rows on http://{args.host}:{args.port}', flush=True)
+    server.serve_forever()
+
+
+def run(args):
+    from benchmarks.suite import machine
+    server = None
+    url = args.url
+    if url is None:
+        port = free_port()
+        url = f'http://127.0.0.1:{port}'
+        cwd = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        server = subprocess.Popen([sys.executable, '-m', 'benchmarks.loadtest', 'serve', '--port', str(port),
+                                   '--tickers', str(args.tickers), '--years', str(args.years),
+                                   '--seed', str(args.seed)], cwd=cwd)
+    try:
+        wait_until_up(url, args.boot_timeout)
+        tickers = TOP_TICKERS[:min(len(TOP_TICKERS), args.tickers)]
+        print(f"{url}: {args.concurrency} users for {args.duration}s (after {args.warmup}s warm-up), mix {args.mix}")
+        cpu = time.process_time()
+        samples = asyncio.run(drive(url, args.mix, tickers, args.concurrency, args.duration, args.warmup,
+                                    args.timeout, args.seed, args.gzip))
+        cpu = time.process_time() - cpu
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+    routes = summarize(samples, args.duration)
+    for route, s in routes.items():
+        print(format_route(route, s))
+    print(f"client CPU {cpu:.1f}s over {args.warmup + args.duration:.0f}s")
+    payload = {
+        'machine': machine(),
+        'config': {'url': args.url or 'spawned', 'tickers': args.tickers, 'years': args.years, 'seed': args.seed,
+                   'concurrency': args.concurrency, 'duration': args.duration, 'warmup': args.warmup,
+                   'mix': args.mix, 'gzip': args.gzip, 'client_cpu_seconds': cpu},
+        'routes': routes,
+    }
+    with open(args.output, 'w') as f:
+        json.dump(payload, f, indent=2)
+    print(f"wrote {args.output}")
+    if args.baseline:
+        with open(args.baseline) as f:
+            return diff(json.load(f), payload, args.threshold)
+    return 0
+
+
+def format_route(route, s):
+    return (f"  {route:<26} {s['rps']:8.1f} req/s | " +
+            ' | '.join(f"p{p} {s[f'p{p}_ms']:8.1f} ms" for p in LATENCY_PERCENTILES) +
+            f" | errors {s['error_rate']:6.2%} ({s['requests']} requests)")
+
+
+def diff(base, new, threshold):
+    """Print per-route changes; returns 1 if any route regressed past ``threshold``.
+
+    A regression is throughput down, or p95/p99 up, by more than the threshold,
+    or the error rate up by more than 0.1 percentage point.
+    """
+    for key in ('concurrency', 'duration', 'mix', 'tickers', 'years'):
+        if base['config'].get(key) != new['config'].get(key):
+            print(f"warning: {key} differs ({base['config'].get(key)} vs {new['config'].get(key)})")
+    print(f"baseline {base['machine'].get('commit')} -> {new['machine'].get('commit')}, threshold {threshold:.0%}")
+    regressions = 0
+    for route in sorted(base['routes'].keys() | new['routes'].keys()):
+        b, a = base['routes'].get(route), new['routes'].get(route)
+        if b is None or a is None:
+            print(f"  {route:<26} only in {'new' if b is None else 'baseline'}")
+            continue
+        flags = []
+        if a['rps'] < b['rps'] * (1 - threshold):
+            flags.append('LOWER THROUGHPUT')
+        if any(a[f'p{p}_ms'] > b[f'p{p}_ms'] * (1 + threshold) for p in (95, 99)):
+            flags.append('SLOWER TAIL')
+        if a['error_rate'] > b['error_rate'] + 0.001:
+            flags.append('MORE ERRORS')
+        regressions += bool(flags)
+        print(f"  {route:<26} {b['rps']:8.1f} -> {a['rps']:8.1f} req/s ({a['rps'] / b['rps']:5.2f}x) | "
+              f"p95 {b['p95_ms']:7.1f} -> {a['p95_ms']:7.1f} ms | p99 {b['p99_ms']:7.1f} -> {a['p99_ms']:7.1f} ms"
+              f" | errors {b['error_rate']:.2%} -> {a['error_rate']:.2%}  {' '.join(flags)}")
+    print(f"{regressions} regressed route(s)")
+    return 1 if regressions else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Offline load test for the Flask routes.')
+    commands = parser.add_subparsers(dest='command', required=True)
+    run_cmd = commands.add_parser('run', help='boot the app (unless --url) and load it')
+    run_cmd.add_argument('-o', '--output', default='loadtest_results.json')
+    run_cmd.add_argument('--url', help='load an already running app instead of spawning one')
+    run_cmd.add_argument('--tickers', type=int, default=8)
+    run_cmd.add_argument('--years', type=int, default=30)
+    run_cmd.add_argument('--seed', type=int, default=42)
+    run_cmd.add_argument('--concurrency', type=int, default=16, help='simultaneous users (one connection each)')
+    run_cmd.add_argument('--duration', type=float, default=20.0, help='measured seconds')
+    run_cmd.add_argument('--warmup', type=float, default=3.0, help='seconds of load before measuring')
+    run_cmd.add_argument('--mix', type=parse_mix, default=DEFAULT_MIX,
+                         help="weighted routes, e.g. '/=1,/ticker/{ticker}=1,/api/anomalies/{ticker}=4'")
+    run_cmd.add_argument('--timeout', type=float, default=30.0, help='per-request timeout (counted as an error)')
+    run_cmd.add_argument('--no-gzip', dest='gzip', action='store_false', help="don't send Accept-Encoding: gzip")
+    run_cmd.add_argument('--boot-timeout', type=float, default=300.0)
+    run_cmd.add_argument('--baseline', help='result file to diff against (exit status 1 on regression)')
+    run_cmd.add_argument('--threshold', type=float, default=0.15)
+    cmp = commands.add_parser('compare', help='diff two result files')
+    cmp.add_argument('base')
+    cmp.add_argument('new')
+    cmp.add_argument('--threshold', type=float, default=0.15)
+    srv = commands.add_parser('serve', help='serve the app on synthetic data (what run spawns)')
+    srv.add_argument('--host', default='127.0.0.1')
+    srv.add_argument('--port', type=int, default=8000)
+    srv.add_argument('--tickers', type=int, default=8)
+    srv.add_argument('--years', type=int, default=30)
+    srv.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+    if args.command == 'serve':
+        serve(args)
+    elif args.command == 'run':
+        sys.exit(run(args))
+    else:
+        with open(args.base) as f:
+            base = json.load(f)
+        with open(args.new) as f:
+            new = json.load(f)
+        sys.exit(diff(base, new, args.threshold))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,338 @@
+# suite.py
+# Time and peak memory of the data and model hot paths over seeded GBM data
+# (synthetic.gbm_frames) at 8 / 500 / 5,000 tickers x 30 years, saved as JSON,
+# plus a compare command that flags regressions between two result files.
+#
+#   python -m benchmarks.suite run -o before.json [--sizes 8,500,5000] [--only load_data,compute_rsi]
+#   python -m benchmarks.suite compare before.json after.json [--threshold 0.10]
+#
+# Each case splits into an untimed setup returning the callable to measure.
+# That callable runs once under tracemalloc for the peak traced bytes (numpy
+# allocations count, pyarrow's do not), then --repeat times without tracing
+# for the timings; compare uses the fastest run. Cases whose data would not
+# fit a small box are recorded as skipped with the reason; --max-rows lifts it.
+import argparse
+import contextlib
+import gc
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import namedtuple
+from datetime import datetime, timezone
+import numpy as np
+from data_loader import TOP_TICKERS
+from benchmarks.synthetic import TRADING_DAYS, gbm_frame, gbm_frames, write_gbm_csv, write_gbm_store
+
+DEFAULT_SIZES = (8, 500, 5000)
+
+Case = namedtuple('Case', 'name setup max_rows max_tickers doc')
+CASES = {}
+
+
+def case(max_rows=None, max_tickers=None):
+    """Register ``setup(env) -> callable`` as a benchmark case.
+
+    ``max_rows`` keeps its setup within a small machine's memory and time
+    (--max-rows lifts it); ``max_tickers`` is a limit of the code path itself.
+    """
+    def register(setup):
+        CASES[setup.__name__] = Case(setup.__name__, setup, max_rows, max_tickers, setup.__doc__.strip())
+        return setup
+    return register
+
+
+class Env:
+    """One size's synthetic data, generated on first use and shared by the cases."""
+
+    def __init__(self, n_tickers, n_years, seed, workdir):
+        self.n_tickers = n_tickers
+        self.n_years = n_years
+        self.seed = seed
+        self.dir = os.path.join(workdir, f'{n_tickers}x{n_years}y-{seed}')
+        os.makedirs(self.dir, exist_ok=True)
+
+    @property
+    def rows(self):
+        return self.n_tickers * self.n_years * TRADING_DAYS
+
+    def path(self, name):
+        return os.path.join(self.dir, name)
+
+    def store(self):
+        path = self.path('store')
+        if not os.path.exists(os.path.join(path, 'manifest.json')):
+            write_gbm_store(path, self.n_tickers, self.n_years, self.seed)
+        return path
+
+    def csv(self):
+        path = self.path('prices.csv')
+        if not os.path.exists(path):
+            write_gbm_csv(path + '.tmp', self.n_tickers, self.n_years, self.seed)
+            os.replace(path + '.tmp', path)
+        return path
+
+    def frame(self, columns=None):
+        return gbm_frame(self.n_tickers, self.n_years, self.seed, columns=columns)
+
+
+def scratch_app(path):
+    from app import create_app
+    if os.path.exists(path):
+        os.remove(path)
+    return create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + path})
+
+
+@case(max_rows=5_000_000)
+def load_data(env):
+    """DataLoader.load_data from the columnar store, all columns."""
+    from data_loader import DataLoader
+    store = env.store()
+    return lambda: DataLoader(csv_file=None, store_path=store)
+
+
+@case(max_rows=4_000_000)
+def load_data_csv(env):
+    """DataLoader.load_data parsing the raw CSV (no store), all columns."""
+    from data_loader import DataLoader
+    csv_file = env.csv()
+    return lambda: DataLoader(csv_file=csv_file, store_path=None)
+
+
+@case()
+def get_ticker_data(env):
+    """1,000 DataLoader.get_ticker_data lookups on random tickers (close/anomaly loaded)."""
+    from data_loader import DataLoader
+    loader = DataLoader.from_frame(env.frame(columns=['close', 'anomaly']))
+    symbols = np.random.default_rng(env.seed).choice(loader.data['ticker'].cat.categories, size=1000)
+
+    def lookups():
+        for sym in symbols:
+            loader.get_ticker_data(sym)
+    return lookups
+
+
+@case()
+def compute_rsi(env):
+    """features.compute_rsi over every ticker's close series."""
+    import pandas as pd
+    from features import compute_rsi as rsi
+    series = [pd.Series(part['close'].to_numpy(), index=part.index)
+              for frame in gbm_frames(env.n_tickers, env.n_years, env.seed, columns=['close'])
+              for _, part in frame.groupby('ticker', observed=True, sort=False)]
+
+    def run():
+        for s in series:
+            rsi(s)
+    return run
+
+
+@case(max_rows=100_000)
+def backfill_for_ticker(env):
+    """backfill_for_ticker on one ticker: SQL read, features, IsolationForest fit, writeback."""
+    import backfill_features_and_anomalies as backfill
+    from model_cache import ModelCache
+    from models import db, Ticker, Anomaly
+    app = scratch_app(env.path('backfill.db'))
+    frame = env.frame()
+    with app.app_context():
+        ids = {}
+        for sym in frame['ticker'].cat.categories:
+            t = Ticker(symbol=sym)
+            db.session.add(t)
+            db.session.flush()
+            ids[sym] = t.id
+        columns = ['open', 'high', 'low', 'close', 'adj_close', 'volume', 'anomaly']
+        records = frame[columns].astype(object).to_dict('records')
+        for record, sym, d in zip(records, frame['ticker'], frame.index.date):
+            record.update(ticker_id=ids[sym], date=d)
+        db.session.execute(Anomaly.__table__.insert(), records)
+        db.session.commit()
+    symbol = str(frame['ticker'].iloc[0])
+    models_dir = tempfile.mkdtemp(dir=env.dir)
+
+    def run():
+        # A cold model cache each time, so every run fits
+        backfill.model_cache = ModelCache(path=tempfile.mkdtemp(dir=models_dir))
+        backfill.backfill_for_ticker(symbol, app=app)
+    return run
+
+
+@case(max_rows=100_000, max_tickers=len(TOP_TICKERS))
+def import_from_mongo(env):
+    """import_from_mongo from an in-memory mongomock collection into an empty SQLite file."""
+    import mongomock
+    from config import MONGO_DB_NAME, MONGO_COLLECTION
+    from migrate_mongo_to_sql import import_from_mongo as run_import
+    client = mongomock.MongoClient()
+    frame = env.frame()
+    frame['ticker'] = frame['ticker'].astype(str)
+    frame['date'] = frame.index.strftime('%Y-%m-%d')
+    frame['timestamp'] = frame['date'] + ' 00:00:00'
+    client[MONGO_DB_NAME][MONGO_COLLECTION].insert_many(frame.to_dict('records'))
+    path = env.path('import.db')
+    return lambda: run_import(client=client, app=scratch_app(path))
+
+
+def skip_reason(c, env, max_rows):
+    if c.max_tickers is not None and env.n_tickers > c.max_tickers:
+        return f'the code path only covers {c.max_tickers} tickers'
+    limit = max_rows or c.max_rows
+    if limit is not None and env.rows > limit:
+        return f'{env.rows:,} rows is over its {limit:,}-row budget (raise with --max-rows)'
+    return None
+
+
+def measure(c, env, repeat, max_rows):
+    result = {'case': c.name, 'tickers': env.n_tickers, 'years': env.n_years, 'rows': env.rows}
+    reason = skip_reason(c, env, max_rows)
+    if reason:
+        return dict(result, status='skipped', reason=reason)
+    quiet = io.StringIO()  # the hot paths print progress lines
+    try:
+        with contextlib.redirect_stdout(quiet):
+            started = time.perf_counter()
+            fn = c.setup(env)
+            setup_s = time.perf_counter() - started
+            gc.collect()
+            tracemalloc.start()
+            try:
+                fn()
+                peak = tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+            seconds = []
+            for _ in range(repeat):
+                gc.collect()
+                started = time.perf_counter()
+                fn()
+                seconds.append(time.perf_counter() - started)
+    except Exception as e:
+        return dict(result, status='error', reason=f'{type(e).__name__}: {e}')
+    finally:
+        fn = None
+        gc.collect()
+    return dict(result, status='ok', setup_seconds=round(setup_s, 3), seconds=seconds, min=min(seconds),
+                median=statistics.median(seconds), peak_bytes=peak)
+
+
+def machine():
+    import pandas as pd
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(__file__), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {'commit': commit, 'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'python': platform.python_version(), 'numpy': np.__version__, 'pandas': pd.__version__,
+            'platform': platform.platform(), 'cpus': os.cpu_count()}
+
+
+def run_suite(args):
+    names = args.only.split(',') if args.only else list(CASES)
+    unknown = [n for n in names if n not in CASES]
+    if unknown:
+        sys.exit(f"Unknown case(s) {', '.join(unknown)}; choose from {', '.join(CASES)}")
+    sizes = [int(s) for s in args.sizes.split(',')]
+    workdir = args.data_dir or tempfile.mkdtemp(prefix='sfc-bench-')
+    results = []
+    print(f"data in {workdir}")
+    for n_tickers in sizes:
+        env = Env(n_tickers, args.years, args.seed, workdir)
+        for name in names:
+            result = measure(CASES[name], env, args.repeat, args.max_rows)
+            results.append(result)
+            print(format_result(result), flush=True)
+    payload = {'machine': machine(), 'config': {'years': args.years, 'seed': args.seed, 'repeat': args.repeat},
+               'results': results}
+    with open(args.output, 'w') as f:
+        json.dump(payload, f, indent=2)
+    print(f"wrote {args.output}")
+
+
+def format_result(r):
+    label = f"{r['case']:<20} {r['tickers']:>5} x {r['years']}y"
+    if r['status'] != 'ok':
+        return f"{label}  {r['status']}: {r['reason']}"
+    return (f"{label}  min {r['min']:9.4f}s | median {r['median']:9.4f}s | "
+            f"peak {r['peak_bytes'] / 2**20:8.1f} MiB | setup {r['setup_seconds']:.1f}s")
+
+
+def compare(args):
+    """Print new/base ratios per case; exit status 1 if anything regressed past the thresholds."""
+    with open(args.base) as f:
+        base = json.load(f)
+    with open(args.new) as f:
+        new = json.load(f)
+    mem_threshold = args.threshold if args.memory_threshold is None else args.memory_threshold
+    for key in ('platform', 'cpus', 'python'):
+        if base['machine'].get(key) != new['machine'].get(key):
+            print(f"warning: {key} differs ({base['machine'].get(key)} vs {new['machine'].get(key)})")
+    print(f"base {base['machine'].get('commit')} -> new {new['machine'].get('commit')}, "
+          f"threshold time +{args.threshold:.0%}, memory +{mem_threshold:.0%}")
+
+    def keyed(results):
+        return {(r['case'], r['tickers'], r['years']): r for r in results}
+    before, after = keyed(base['results']), keyed(new['results'])
+    regressions = 0
+    for key in sorted(before.keys() | after.keys(), key=lambda k: (k[1], k[0])):
+        label = f"{key[0]:<20} {key[1]:>5} x {key[2]}y"
+        b, a = before.get(key), after.get(key)
+        if b is None or a is None:
+            print(f"  {label}  only in {'new' if b is None else 'base'}")
+            continue
+        if b['status'] != 'ok' or a['status'] != 'ok':
+            print(f"  {label}  base {b['status']}, new {a['status']}")
+            regressions += a['status'] == 'error' and b['status'] == 'ok'
+            continue
+        time_ratio = a['min'] / b['min'] if b['min'] else float('inf')
+        mem_ratio = a['peak_bytes'] / b['peak_bytes'] if b['peak_bytes'] else 1.0
+        flags = []
+        if time_ratio > 1 + args.threshold:
+            flags.append('SLOWER')
+        if mem_ratio > 1 + mem_threshold:
+            flags.append('MORE MEMORY')
+        if time_ratio < 1 / (1 + args.threshold):
+            flags.append('faster')
+        regressions += any(f.isupper() for f in flags)
+        print(f"  {label}  time {b['min']:9.4f}s -> {a['min']:9.4f}s ({time_ratio:5.2f}x) | "
+              f"peak {b['peak_bytes'] / 2**20:8.1f} -> {a['peak_bytes'] / 2**20:8.1f} MiB ({mem_ratio:5.2f}x)"
+              f"  {' '.join(flags)}")
+    print(f"{regressions} regression(s)")
+    return 1 if regressions else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Hot-path benchmark suite.')
+    commands = parser.add_subparsers(dest='command', required=True)
+    run = commands.add_parser('run', help='run the cases and save the results as JSON')
+    run.add_argument('-o', '--output', default='benchmark_results.json')
+    run.add_argument('--sizes', default=','.join(map(str, DEFAULT_SIZES)), help='ticker counts, comma-separated')
+    run.add_argument('--years', type=int, default=30)
+    run.add_argument('--seed', type=int, default=42)
+    run.add_argument('--repeat', type=int, default=3, help='timed runs per case (the fastest is compared)')
+    run.add_argument('--only', help=f"comma-separated subset of: {', '.join(CASES)}")
+    run.add_argument('--max-rows', type=int, help="override every case's row budget")
+    run.add_argument('--data-dir', help='keep (and reuse) the generated data here instead of a temp dir')
+    cmp = commands.add_parser('compare', help='compare two result files')
+    cmp.add_argument('base')
+    cmp.add_argument('new')
+    cmp.add_argument('--threshold', type=float, default=0.10, help='allowed slowdown, e.g. 0.10 = 10%%')
+    cmp.add_argument('--memory-threshold', type=float, help='allowed peak-memory growth (default: --threshold)')
+    args = parser.parse_args()
+    import logging
+    logging.getLogger('migrate_mongo_to_sql').setLevel(logging.WARNING)
+    if args.command == 'run':
+        run_suite(args)
+    else:
+        sys.exit(compare(args))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,135 @@
+# synthetic.py
+# Seeded synthetic OHLCV data shaped like Stock_pulse.stock_db1.csv, for benchmarks.
+# make_frame is the quick i.i.d.-returns fixture; gbm_frames generates geometric
+# Brownian motion with injected price spikes, block by block, for the suite.
+import numpy as np
+import pandas as pd
+from data_loader import TOP_TICKERS
+
+
+def ticker_symbols(n_tickers):
+    """The app's real tickers when they suffice, otherwise T0000, T0001, ..."""
+    if n_tickers <= len(TOP_TICKERS):
+        return TOP_TICKERS[:n_tickers]
+    return [f'T{i:04d}' for i in range(n_tickers)]
+
+
+def make_frame(n_tickers=8, n_days=2520, seed=42, start='1995-01-02'):
+    """Return a frame in the loader's shape: date index, 'ticker' column, OHLCV + anomaly."""
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range(start, periods=n_days)
+    n = n_tickers * n_days
+
+    returns = rng.normal(0.0003, 0.02, size=(n_tickers, n_days))
+    close = 100.0 * np.exp(np.cumsum(returns, axis=1))
+    spread = np.abs(rng.normal(0, 0.01, size=close.shape))
+    frame = pd.DataFrame({
+        'ticker': np.repeat(ticker_symbols(n_tickers), n_days),
+        'open': (close * (1 + rng.normal(0, 0.005, size=close.shape))).ravel(),
+        'high': (close * (1 + spread)).ravel(),
+        'low': (close * (1 - spread)).ravel(),
+        'close': close.ravel(),
+        'adj_close': close.ravel(),
+        'volume': rng.integers(100_000, 10_000_000, size=n).astype('float64'),
+        'anomaly': (rng.random(n) < 0.01).astype('int8'),
+        'anomaly_score': rng.normal(0, 0.1, size=n),
+    }, index=pd.DatetimeIndex(np.tile(dates.values, n_tickers), name='date'))
+    return frame
+
+
+def write_csv(path, n_tickers=8, n_days=2520, seed=42):
+    """Write a synthetic CSV with the same columns as the Mongo export."""
+    frame = make_frame(n_tickers, n_days, seed)
+    frame.insert(1, 'timestamp', frame.index.strftime('%Y-%m-%d 00:00:00'))
+    frame.to_csv(path, index_label='date')
+    return path
+
+
+TRADING_DAYS = 252
+GBM_COLUMNS = ['open', 'high', 'low', 'close', 'adj_close', 'volume', 'anomaly', 'anomaly_score']
+
+
+def gbm_closes(rng, n_tickers, n_days, spike_rate=0.002, spike_size=8.0):
+    """(n_tickers, n_days) GBM closes and the boolean mask of injected spikes.
+
+    Annual drift and volatility are drawn per ticker. On a spike bar the log
+    return jumps by ``spike_size`` daily sigmas (either sign) and reverts the
+    next bar, so a spike is a one-day outlier rather than a level shift.
+    """
+    dt = 1 / TRADING_DAYS
+    mu = rng.uniform(0.02, 0.15, size=(n_tickers, 1))
+    sigma = rng.uniform(0.15, 0.6, size=(n_tickers, 1))
+    log_returns = (mu - sigma ** 2 / 2) * dt + sigma * np.sqrt(dt) * rng.standard_normal((n_tickers, n_days))
+    spikes = rng.random((n_tickers, n_days)) < spike_rate
+    spikes[:, [0, -1]] = False
+    jumps = np.where(spikes, rng.choice([-1.0, 1.0], size=spikes.shape) * spike_size * sigma * np.sqrt(dt), 0.0)
+    log_returns += jumps
+    log_returns[:, 1:] -= jumps[:, :-1]
+    log_returns[:, 0] = 0.0
+    start = rng.uniform(5.0, 500.0, size=(n_tickers, 1))
+    return start * np.exp(np.cumsum(log_returns, axis=1)), spikes
+
+
+def gbm_frames(n_tickers=8, n_years=30, seed=42, columns=None, block=250, start='1995-01-02', **spikes):
+    """Yield loader-shaped frames (date index, categorical 'ticker', GBM_COLUMNS) per block of tickers.
+
+    Spike bars carry ``anomaly`` = 1, a positive anomaly_score and a volume
+    burst. ``columns`` keeps a subset (every column is still drawn, so the
+    values match the full frame); blocks bound memory at 5,000 tickers x 30 years.
+    """
+    rng = np.random.default_rng(seed)
+    n_days = n_years * TRADING_DAYS
+    dates = pd.bdate_range(start, periods=n_days).values
+    symbols = list(ticker_symbols(n_tickers))
+    keep = GBM_COLUMNS if columns is None else [c for c in GBM_COLUMNS if c in columns]
+    for lo in range(0, n_tickers, block):
+        n = min(block, n_tickers - lo)
+        close, spiked = gbm_closes(rng, n, n_days, **spikes)
+        spread = np.abs(rng.normal(0, 0.01, size=close.shape))
+        open_ = close * (1 + rng.normal(0, 0.005, size=close.shape))
+        volume = np.round(rng.lognormal(13.0, 1.0, size=(n, 1)) * rng.lognormal(0.0, 0.3, size=close.shape))
+        volume[spiked] *= np.round(rng.uniform(3.0, 8.0, size=int(spiked.sum())))
+        score = rng.normal(-0.1, 0.04, size=close.shape) + 0.25 * spiked
+        values = {
+            'open': open_,
+            'high': np.maximum(open_, close) * (1 + spread),
+            'low': np.minimum(open_, close) * (1 - spread),
+            'close': close,
+            'adj_close': close,
+            'volume': volume,
+            'anomaly': spiked.astype('int8'),
+            'anomaly_score': score,
+        }
+        codes = np.repeat(np.arange(lo, lo + n, dtype=np.int16 if n_tickers < 2 ** 15 else np.int32), n_days)
+        frame = pd.DataFrame({'ticker': pd.Categorical.from_codes(codes, categories=symbols)},
+                             index=pd.DatetimeIndex(np.tile(dates, n), name='date'))
+        for c in keep:
+            frame[c] = values[c].ravel()
+        yield frame
+
+
+def gbm_frame(n_tickers=8, n_years=30, seed=42, columns=None, **spikes):
+    """All of gbm_frames in one frame."""
+    return pd.concat(gbm_frames(n_tickers, n_years, seed, columns, **spikes))
+
+
+def write_gbm_store(path, n_tickers=8, n_years=30, seed=42):
+    """Write gbm_frames straight into a columnar store (no CSV), one block in memory at a time."""
+    from columnar_store import write_store
+
+    def partitions():
+        for frame in gbm_frames(n_tickers, n_years, seed):
+            for sym, part in frame.groupby('ticker', observed=True, sort=False):
+                arrays = {'date': part.index.values}
+                arrays.update({c: part[c].to_numpy() for c in GBM_COLUMNS})
+                yield str(sym), arrays
+
+    return write_store(path, partitions(), {'path': None, 'size': 0, 'mtime': 0})
+
+
+def write_gbm_csv(path, n_tickers=8, n_years=30, seed=42):
+    """Write gbm_frames as a CSV with the Mongo export's columns, block by block."""
+    for i, frame in enumerate(gbm_frames(n_tickers, n_years, seed)):
+        frame.insert(1, 'timestamp', frame.index.strftime('%Y-%m-%d 00:00:00'))
+        frame.to_csv(path, index_label='date', mode='w' if i == 0 else 'a', header=i == 0)
+    return path
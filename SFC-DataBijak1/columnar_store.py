@@ -0,0 +1,167 @@
+# columnar_store.py
+# Ticker-partitioned columnar store: one directory per ticker holding one typed
+# .npy file per column, plus a manifest.json describing columns and row counts.
+# Columns are opened with np.load(mmap_mode='r') so a reader only pages in the
+# tickers/columns it actually asks for. The loader's frame is a copy in RAM (see
+# load_frame): the store saves the CSV parse, not the resident memory.
+import json
+import os
+import numpy as np
+
+MANIFEST_NAME = 'manifest.json'
+STORE_FORMAT_VERSION = 1
+
+# Typed schema for the known CSV columns; anything else is kept as fixed-width text
+FLOAT_COLUMNS = ['open', 'high', 'low', 'close', 'adj_close', 'volume', 'dividends', 'stock_splits',
+                 'returns', 'ma_50', 'ma_200', 'vol_20', 'volume_ma_20', 'rsi_14', 'anomaly_score']
+INT_COLUMNS = ['anomaly']
+DATETIME_COLUMNS = ['date', 'timestamp']
+
+
+def manifest_path(store_path):
+    return os.path.join(store_path, MANIFEST_NAME)
+
+
+def store_exists(store_path):
+    return bool(store_path) and os.path.exists(manifest_path(store_path))
+
+
+def read_manifest(store_path):
+    with open(manifest_path(store_path)) as f:
+        manifest = json.load(f)
+    if manifest.get('format') != STORE_FORMAT_VERSION:
+        raise ValueError(f"Unsupported store format {manifest.get('format')!r} in {store_path}")
+    return manifest
+
+
+def typed_column(name, values):
+    """Convert a raw CSV column (pandas Series of str) to its on-disk numpy dtype.
+
+    DataLoader's CSV path types columns through here too, so both paths agree.
+    """
+    import pandas as pd
+    if name in FLOAT_COLUMNS:
+        return pd.to_numeric(values, errors='coerce').to_numpy(dtype='float64')
+    if name in INT_COLUMNS:
+        return pd.to_numeric(values, errors='coerce').fillna(0).to_numpy(dtype='int8')
+    if name in DATETIME_COLUMNS:
+        parsed = pd.to_datetime(values, errors='coerce', utc=True).dt.tz_localize(None)
+        return parsed.to_numpy(dtype='datetime64[ns]')
+    return values.fillna('').astype(str).to_numpy(dtype='U')
+
+
+def convert_csv(csv_file, store_path, chunksize=500_000):
+    """One-shot conversion of the raw CSV into the partitioned store.
+
+    The CSV is read in chunks, so peak memory is bounded by the typed arrays
+    rather than by pandas' object-dtype parse of the whole file.
+    """
+    import pandas as pd
+    source_size = os.path.getsize(csv_file)
+    source_mtime = os.path.getmtime(csv_file)
+
+    parts = {}  # ticker -> column -> list of arrays
+    columns = None
+    for chunk in pd.read_csv(csv_file, chunksize=chunksize, dtype=str, keep_default_na=True):
+        chunk = chunk.dropna(subset=['ticker', 'date'])
+        if columns is None:
+            columns = [c for c in chunk.columns if c != 'ticker']
+        typed = {c: typed_column(c, chunk[c]) for c in columns}
+        keep = ~np.isnan(typed['close']) & ~np.isnat(typed['date'])
+        typed = {c: arr[keep] for c, arr in typed.items()}
+        tickers = chunk['ticker'].to_numpy(dtype=str)[keep]
+        for sym in np.unique(tickers):
+            mask = tickers == sym
+            cols = parts.setdefault(sym, {c: [] for c in columns})
+            for c in columns:
+                cols[c].append(typed[c][mask])
+
+    if columns is None:
+        raise ValueError(f"No rows found in {csv_file}")
+
+    source = {'path': os.path.abspath(csv_file), 'size': source_size, 'mtime': source_mtime}
+    return write_store(store_path, ((sym, {c: np.concatenate(v) for c, v in cols.items()})
+                                    for sym, cols in sorted(parts.items())), source)
+
+
+def write_store(store_path, partitions, source):
+    """Write (ticker, {column: array}) pairs, each sorted by date on the way, then the manifest.
+
+    ``partitions`` may be a generator, so only one ticker's arrays need to be
+    in memory; ``source`` records the CSV (path, size, mtime) the store holds.
+    """
+    os.makedirs(store_path, exist_ok=True)
+    manifest = {
+        'format': STORE_FORMAT_VERSION,
+        'columns': {},
+        'tickers': {},
+        # Remember how much of the CSV is already in the store
+        'source': source,
+    }
+    for sym, arrays in partitions:
+        order = np.argsort(arrays['date'], kind='stable')
+        ticker_dir = os.path.join(store_path, sym)
+        os.makedirs(ticker_dir, exist_ok=True)
+        for c, arr in arrays.items():
+            arr = arr[order]
+            np.save(os.path.join(ticker_dir, f'{c}.npy'), arr)
+            manifest['columns'][c] = str(arr.dtype)
+        manifest['tickers'][sym] = {'rows': int(len(order)), 'path': sym}
+
+    # Write the manifest last so a half-written store is never picked up
+    tmp = manifest_path(store_path) + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp, manifest_path(store_path))
+    return manifest
+
+
+def load_columns(store_path, ticker, columns=None, manifest=None):
+    """Return {column: memory-mapped read-only array} for one ticker."""
+    manifest = manifest or read_manifest(store_path)
+    entry = manifest['tickers'][ticker]
+    names = list(manifest['columns']) if columns is None else [c for c in columns if c in manifest['columns']]
+    if 'date' not in names:
+        names = ['date'] + names
+    ticker_dir = os.path.join(store_path, entry['path'])
+    return {c: np.load(os.path.join(ticker_dir, f'{c}.npy'), mmap_mode='r') for c in names}
+
+
+def load_frame(store_path, columns=None, tickers=None):
+    """Build the loader's DataFrame (date index + 'ticker' column) from the store.
+
+    Only the requested tickers and columns are touched on disk. They are read
+    through memory maps but copied by the concat (and again by the loader's
+    sort), so the returned frame lives in RAM and holds no open store files.
+    """
+    import pandas as pd
+    manifest = read_manifest(store_path)
+    available = list(manifest['tickers'])
+    selected = available if tickers is None else [t for t in tickers if t in manifest['tickers']]
+
+    frames = []
+    for sym in selected:
+        cols = load_columns(store_path, sym, columns, manifest)
+        dates = cols.pop('date')
+        frame = pd.DataFrame(cols, index=pd.DatetimeIndex(dates, name='date'))
+        frame.insert(0, 'ticker', sym)
+        frames.append(frame)
+    if not frames:
+        names = [c for c in (columns or manifest['columns']) if c != 'date']
+        return pd.DataFrame(columns=['ticker'] + names, index=pd.DatetimeIndex([], name='date'))
+    return pd.concat(frames)
+
+
+if __name__ == '__main__':
+    import argparse
+    from config import CSV_FILE, STORE_PATH
+
+    parser = argparse.ArgumentParser(description='Convert the stock CSV into the partitioned columnar store.')
+    parser.add_argument('--csv', default=CSV_FILE)
+    parser.add_argument('--out', default=STORE_PATH)
+    parser.add_argument('--chunksize', type=int, default=500_000)
+    args = parser.parse_args()
+
+    result = convert_csv(args.csv, args.out, chunksize=args.chunksize)
+    total = sum(t['rows'] for t in result['tickers'].values())
+    print(f"Wrote {total} rows for {len(result['tickers'])} tickers to {args.out}")
@@ -23,4 +23,67 @@ SECRET_KEY = os.environ.get('FLASK_SECRET') or 'your-updated-secret-key-change-i
 
 # App paths
 DATA_PATH = os.path.join(os.path.dirname(__file__), 'static', 'data')
-CSV_FILE = os.path.join(DATA_PATH, 'Stock_pulse.stock_db1.csv')
\ No newline at end of file
+CSV_FILE = os.path.join(DATA_PATH, 'Stock_pulse.stock_db1.csv')
+# Ticker-partitioned columnar store built from CSV_FILE (python columnar_store.py)
+STORE_PATH = os.path.join(DATA_PATH, 'store')
+
+# Seconds a request waits for the data loader before answering 'warming up'
+LOADER_WAIT_TIMEOUT = 5
+# Seconds after a failed data load before the next request retries it
+LOADER_RETRY_INTERVAL = 30
+
+# Seconds between checks for rows appended to CSV_FILE (0 disables hot-reload)
+DATA_REFRESH_INTERVAL = 60
+
+# Rendered /ticker chart fragments kept in memory (LRU)
+CHART_CACHE_SIZE = 64
+
+# Default point budget for decimated chart series
+CHART_MAX_POINTS = 1200
+# Range a ?max_points= request is clamped to (LTTB needs 3; ~80 years of daily bars)
+CHART_MAX_POINTS_RANGE = (3, 20000)
+# SQLite settings applied to every new connection (storage.py; read-only ones skip the
+# journal settings). WAL lets the dashboard keep reading while a backfill or import is writing.
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',   # fsync at checkpoints only; safe with WAL
+    'cache_size': -64000,      # negative = KiB, i.e. 64 MB page cache
+    'mmap_size': 268435456,    # 256 MB of the file read via mmap
+    'busy_timeout': 10000,     # ms to wait on a lock before 'database is locked'
+    'temp_store': 'MEMORY',
+}
+
+# Connections in the read-only pool used by SQL-backed request handlers (storage.read_engine)
+SQLITE_READ_POOL_SIZE = 8
+
+# Fitted scaler + IsolationForest per (ticker, features, params, training data), via joblib.
+# Kept under instance/ (not static/) so the pickles are never served over HTTP.
+MODEL_CACHE_PATH = os.path.join(os.path.dirname(__file__), 'instance', 'models')
+
+# Fitted models kept in memory in front of MODEL_CACHE_PATH (LRU)
+MODEL_CACHE_SIZE = 32
+
+# POST /api/score: concurrent requests for one ticker arriving within this many
+# milliseconds share a single decision_function call (0 disables the wait)
+SCORE_BATCH_WINDOW_MS = 2
+# Largest batch of bars accepted per request
+SCORE_MAX_BARS = 50_000
+
+# Per-ticker IsolationForest tuning results (python tuning.py), shown on /reports
+SUMMARY_CSV = os.path.join(DATA_PATH, 'anomaly_detection_summary.csv')
+
+# JSON API bodies at least this large are gzipped for clients that accept it
+JSON_GZIP_MIN_BYTES = 1024
+# zlib level for those bodies (1 = fastest, 9 = smallest). Numeric JSON gains
+# little past 1: ~6% smaller at 6 for ~4.5x the CPU (bench_anomalies_api).
+JSON_GZIP_LEVEL = 1
+
+# /anomalies and /api/anomalies: rows per page by default, and the most a request may ask for
+ANOMALIES_PAGE_SIZE = 50
+ANOMALIES_MAX_PAGE_SIZE = 500
+
+# /download/anomalies.<csv|parquet>: rows per streamed chunk (and per Parquet row group)
+EXPORT_CHUNK_ROWS = 20_000
+
+# POST /trigger/<symbol>: pipeline runs executed at once (jobs.JobRunner threads)
+PIPELINE_WORKERS = 2
@@ -1,54 +1,513 @@
-import pandas as pd
-import numpy as np
 import os
-from config import CSV_FILE
-from sklearn.ensemble import IsolationForest
-from sklearn.preprocessing import StandardScaler
-from pathlib import Path
+import threading
+import time
+from collections import namedtuple
+from config import CSV_FILE, STORE_PATH, DATA_REFRESH_INTERVAL, LOADER_RETRY_INTERVAL
+from listing import AnomalyListing
+
+# pandas/numpy/sklearn are imported inside the functions that use them, so that
+# `import app` (and the CLI scripts that import it) stays cheap until data is needed.
 
 TOP_TICKERS = ['NVDA', 'MSFT', 'AAPL', 'GOOGL', 'AMZN', 'META', 'AVGO', 'TSM']
 
+class Snapshot(namedtuple('Snapshot', 'data anomalies ticker_index anomaly_index version loaded_at summary listing')):
+    """Immutable view of the loaded data.
+
+    The loader publishes a new Snapshot by swapping a single reference, so a
+    request that grabs ``loader.snapshot()`` once never sees a half-updated frame.
+    """
+
+    def ticker_data(self, ticker, start=None, end=None):
+        """A ticker's rows in this snapshot, as a zero-copy, read-only slice."""
+        return _slice(self.data, self.ticker_index, ticker, start, end)
+
+    def ticker_anomalies(self, ticker, start=None, end=None):
+        """A ticker's anomaly rows in this snapshot, as a zero-copy, read-only slice."""
+        return _slice(self.anomalies, self.anomaly_index, ticker, start, end)
+
+
+# Dashboard figures, built once per snapshot (see _build_summary)
+Summary = namedtuple('Summary', 'total_rows total_anomalies version loaded_at tickers')
+TickerSummary = namedtuple('TickerSummary', 'ticker last_date last_close prev_close day_change day_change_pct '
+                                            'anomalies_1d anomalies_30d anomalies_all last_anomaly_date')
+
+
 class DataLoader:
-    def __init__(self):
-        self.data = None
-        self.anomalies = None
-        self.load_data()
+    def __init__(self, csv_file=CSV_FILE, store_path=STORE_PATH, columns=None, tickers=None):
+        self.csv_file = csv_file
+        self.store_path = store_path
+        self._snapshot = None
+        self._csv_state = None  # (offset, size, mtime, header) of the CSV bytes already loaded
+        self._refresh_lock = threading.Lock()
+        self._refresh_thread = None
+        self.load_data(columns=columns, tickers=tickers)
+
+    # Read-only accessors onto the current snapshot
+    @property
+    def data(self):
+        return self._snapshot.data
+
+    @property
+    def anomalies(self):
+        return self._snapshot.anomalies
+
+    @property
+    def version(self):
+        """Data-version counter; bumps whenever a new snapshot is published."""
+        return self._snapshot.version
+
+    def snapshot(self):
+        return self._snapshot
+
+    @property
+    def summary(self):
+        """Per-ticker dashboard summary of the current snapshot (see Summary)."""
+        return self._snapshot.summary
+
+    def load_data(self, columns=None, tickers=None):
+        """Load and preprocess stock data.
+
+        Reads the partitioned columnar store when it exists (see columnar_store.py),
+        otherwise falls back to parsing the raw CSV. ``columns``/``tickers`` restrict
+        what is read; ``None`` means everything.
+        """
+        import columnar_store
+        if columns is not None:
+            # The loader itself always needs these
+            columns = list(dict.fromkeys(list(columns) + ['close', 'anomaly']))
+        self._columns, self._tickers = columns, tickers
+
+        if columnar_store.store_exists(self.store_path):
+            data = columnar_store.load_frame(self.store_path, columns=columns, tickers=tickers)
+            source = columnar_store.read_manifest(self.store_path)['source']
+            # Rows appended to the CSV after conversion are picked up by refresh()
+            same_csv = self.csv_file and source['path'] == os.path.abspath(self.csv_file)
+            self._csv_state = self._csv_state_at(source['size'], source['mtime']) if same_csv else None
+        else:
+            # Stat before parsing, so rows appended while it runs count as new
+            stat = os.stat(self.csv_file) if os.path.exists(self.csv_file) else None
+            data = self._load_csv(columns=columns, tickers=tickers)
+            self._csv_state = self._csv_state_at(stat.st_size, stat.st_mtime) if stat else None
+        self._set_data(data)
 
-    def load_data(self):
-        """Load and preprocess CSV (from .py logic)."""
-        if not os.path.exists(CSV_FILE):
-            raise FileNotFoundError(f"CSV not found at {CSV_FILE}. Place Stock_pulse.stock_db1.csv in static/data/.")
-        
-        self.data = pd.read_csv(CSV_FILE, index_col='date', parse_dates=True)
-        self.data.index = pd.to_datetime(self.data.index)
-        
-        # Preprocess (simplified from .py)
-        price_cols = ['open', 'high', 'low', 'close', 'adj_close', 'volume']
-        for col in price_cols:
-            if col in self.data.columns:
-                self.data[col] = pd.to_numeric(self.data[col], errors='coerce')
-        self.data = self.data.dropna(subset=['close'])
-        self.data = self.data.sort_index()
-        
-        # Filter anomalies
-        self.anomalies = self.data[self.data['anomaly'] == 1].copy()
-        
         print(f"Loaded {len(self.data)} rows for {len(TOP_TICKERS)} tickers. Anomalies: {len(self.anomalies)}")
 
+    @classmethod
+    def from_frame(cls, data):
+        """Build a loader around an already-loaded frame (date index + 'ticker' column)."""
+        obj = cls.__new__(cls)
+        obj.csv_file = obj.store_path = None
+        obj._snapshot = obj._csv_state = obj._refresh_thread = None
+        obj._columns = obj._tickers = None
+        obj._refresh_lock = threading.Lock()
+        obj._set_data(data)
+        return obj
+
+    def _set_data(self, data, presorted=False):
+        """Sort by (ticker, date), build the per-ticker slice indexes and publish a snapshot."""
+        import numpy as np
+        data = data.copy()
+        data['ticker'] = data['ticker'].astype(str).astype('category')
+        if not presorted:
+            order = np.lexsort((data.index.values, data['ticker'].cat.codes.to_numpy()))
+            data = data.iloc[order]
+
+        # Filter anomalies (keeps the (ticker, date) order, so it gets its own index)
+        anomalies = _read_only(data[data['anomaly'] == 1])
+        data = _read_only(data)
+        version = self._snapshot.version + 1 if self._snapshot is not None else 1
+        loaded_at = time.time()
+        ticker_index, anomaly_index = _build_ticker_index(data), _build_ticker_index(anomalies)
+        summary = _build_summary(data, anomalies, ticker_index, anomaly_index, version, loaded_at)
+        listing = AnomalyListing(anomalies, anomaly_index)
+        self._snapshot = Snapshot(data, anomalies, ticker_index, anomaly_index, version, loaded_at, summary, listing)
+
+    def _load_csv(self, columns=None, tickers=None):
+        """Load and preprocess CSV (from .py logic)."""
+        if not os.path.exists(self.csv_file):
+            raise FileNotFoundError(f"CSV not found at {self.csv_file}. Place Stock_pulse.stock_db1.csv in static/data/.")
+        return self._parse_csv(self.csv_file, columns, tickers)
+
+    @staticmethod
+    def _parse_csv(source, columns=None, tickers=None):
+        """Parse CSV text into the loader's frame, typed and filtered as convert_csv stores it.
+
+        Every column goes through columnar_store.typed_column (int8 anomaly with
+        missing as 0, naive datetimes, ...) and rows without a date or close are
+        dropped, so the CSV and store paths publish the same frame.
+        """
+        import numpy as np
+        import pandas as pd
+        from columnar_store import typed_column
+        usecols = None
+        if columns is not None:
+            wanted = set(columns) | {'date', 'ticker'}
+            usecols = lambda c: c in wanted
+        raw = pd.read_csv(source, usecols=usecols)
+        if tickers is not None:
+            raw = raw[raw['ticker'].isin(tickers)]
+
+        ticker = raw.pop('ticker').to_numpy()
+        typed = {c: typed_column(c, raw.pop(c)) for c in list(raw.columns)}
+        keep = ~np.isnan(typed['close']) & ~np.isnat(typed['date']) & pd.notna(ticker)
+        if not keep.all():
+            ticker = ticker[keep]
+            typed = {c: arr[keep] for c, arr in typed.items()}
+        data = pd.DataFrame(typed, index=pd.DatetimeIndex(typed.pop('date'), name='date'))
+        data.insert(0, 'ticker', ticker)
+        return data
+
+    def _csv_state_at(self, offset, mtime):
+        """Remember that the CSV's first ``offset`` bytes (as of ``mtime``) are already loaded.
+
+        Records the size and mtime the loaded bytes came from, not the file's
+        current ones, so rows appended since then still look new to refresh().
+        """
+        if not self.csv_file or not os.path.exists(self.csv_file):
+            return None
+        with open(self.csv_file, 'rb') as f:
+            header = f.readline()
+        return (offset, offset, mtime, header)
+
+    def refresh(self):
+        """Pick up rows appended to the CSV since the last load.
+
+        Only the bytes past the stored offset are parsed, so the CSV is never
+        re-read; publishing them still rebuilds the snapshot (see _merge). A
+        shrunken or rewritten file triggers a full reload. Returns True when a
+        new snapshot was published.
+        """
+        import io
+        with self._refresh_lock:
+            if not self.csv_file or not os.path.exists(self.csv_file):
+                return False
+            stat = os.stat(self.csv_file)
+            if self._csv_state is None:
+                self.load_data(self._columns, self._tickers)
+                return True
+            offset, size, mtime, header = self._csv_state
+            if stat.st_size == size and stat.st_mtime == mtime:
+                return False
+            if stat.st_size < offset:
+                # Truncated or replaced: nothing to append to
+                self.load_data(self._columns, self._tickers)
+                return True
+
+            with open(self.csv_file, 'rb') as f:
+                if f.readline() != header:
+                    self.load_data(self._columns, self._tickers)
+                    return True
+                f.seek(offset)
+                tail = f.read(stat.st_size - offset)
+            # Only consume complete lines; a partially written row waits for the next refresh
+            complete = tail.rfind(b'\n') + 1
+            self._csv_state = (offset + complete, stat.st_size, stat.st_mtime, header)
+            if complete == 0:
+                return False
+
+            new_rows = self._parse_csv(io.BytesIO(header + tail[:complete]), self._columns, self._tickers)
+            if new_rows.empty:
+                return False
+            self._merge(new_rows)
+            print(f"Refreshed {len(new_rows)} new rows (data version {self.version}).")
+            return True
+
+    def _merge(self, new_rows):
+        """Merge parsed rows into the current data and publish it as a new snapshot.
+
+        Only the affected tickers are deduplicated and re-sorted, but the
+        snapshot is one contiguous frame: every ticker is concatenated, and
+        _set_data copies it and rebuilds the indexes, summary and listing, so
+        a refresh costs O(total rows) in memory and time.
+        """
+        import pandas as pd
+        snap = self._snapshot
+        new_rows = _conform(new_rows, snap.data)
+        new_by_ticker = {sym: part for sym, part in new_rows.groupby('ticker', sort=False)}
+
+        pieces = []
+        for sym in sorted(set(snap.ticker_index) | set(new_by_ticker)):
+            old_part = _slice(snap.data, snap.ticker_index, sym) if sym in snap.ticker_index else None
+            new_part = new_by_ticker.get(sym)
+            if new_part is None:
+                pieces.append(old_part)
+                continue
+            part = new_part if old_part is None else pd.concat([old_part, new_part])
+            # A re-sent bar replaces the one already loaded for that date
+            part = part[~part.index.duplicated(keep='last')].sort_index(kind='stable')
+            pieces.append(part)
+        self._set_data(pd.concat(pieces), presorted=True)
+
+    def start_auto_refresh(self, interval):
+        """Poll the CSV for appended rows every ``interval`` seconds in a daemon thread."""
+
+        def poll():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.refresh()
+                except Exception as e:
+                    print(f"Data refresh failed: {e}")
+
+        if interval and self._refresh_thread is None:
+            self._refresh_thread = threading.Thread(target=poll, name='data-loader-refresh', daemon=True)
+            self._refresh_thread.start()
+
     def get_ticker_data(self, ticker):
-        """Get data for a ticker (from .py fetch logic simulation)."""
-        return self.data[self.data['ticker'] == ticker].copy()
+        """Get data for a ticker as a zero-copy, read-only slice (see _read_only)."""
+        snap = self._snapshot
+        return _slice(snap.data, snap.ticker_index, ticker)
+
+    def get_ticker_range(self, ticker, start=None, end=None):
+        """Get a ticker's rows with start <= date <= end via binary search."""
+        snap = self._snapshot
+        return _slice(snap.data, snap.ticker_index, ticker, start, end)
+
+    def get_ticker_anomalies(self, ticker, start=None, end=None):
+        """Get a ticker's anomaly rows as a zero-copy, read-only slice (see _read_only)."""
+        return self._snapshot.ticker_anomalies(ticker, start, end)
 
-    def detect_anomalies_sample(self, df):
-        """Sample anomaly detection (from .py; for demo)."""
+    def features(self, tickers=None):
+        """Feature columns (features.FEATURE_COLUMNS) for the given tickers, or all of them.
+
+        Computed for every ticker in one panel pass over the snapshot; the result
+        is a new frame with the snapshot's index, ticker and date order.
+        """
+        import numpy as np
+        import pandas as pd
+        from features import compute_features_multi
+        snap = self._snapshot
+        if tickers is None:
+            data, bounds = snap.data, list(snap.ticker_index.values())
+        else:
+            bounds = [snap.ticker_index[t] for t in tickers if t in snap.ticker_index]
+            data = pd.concat([snap.data.iloc[a:b] for a, b in bounds]) if bounds else snap.data.iloc[0:0]
+            # Re-base the offsets onto the concatenated slices
+            stops = np.cumsum([b - a for a, b in bounds], dtype=np.int64)
+            bounds = list(zip(stops - [b - a for a, b in bounds], stops))
+        out = compute_features_multi(data, [a for a, _ in bounds], [b for _, b in bounds])
+        out.insert(0, 'ticker', data['ticker'].array)
+        return out
+
+    def detect_anomalies_sample(self, df, ticker=None):
+        """Sample anomaly detection (from .py; for demo). Reuses a cached model per ticker.
+
+        Returns a flagged copy; ``df`` is usually a read-only snapshot slice.
+        """
+        from model_cache import model_cache
         if len(df) < 100:
             return df  # Skip for small data
+        df = df.copy()
+        if ticker is None and 'ticker' in df.columns:
+            ticker = str(df['ticker'].iloc[0])
         features = ['close', 'volume']  # Simplified
-        scaler = StandardScaler()
-        X = scaler.fit_transform(df[features].fillna(0))
-        iso = IsolationForest(contamination=0.05, random_state=42)
-        df['anomaly'] = iso.fit_predict(X) == -1
+        X = df[features].fillna(0).to_numpy(dtype='float64')
+        scaler, iso = model_cache.get(ticker, X, features, {'contamination': 0.05, 'random_state': 42})
+        df['anomaly'] = iso.predict(scaler.transform(X)) == -1
         return df
 
-# Global loader
-loader = DataLoader()
\ No newline at end of file
+def _read_only(df):
+    """``df`` rebuilt on non-writeable views of its column arrays.
+
+    Snapshot frames are shared by every request; with these, writing into a
+    slice of one raises instead of silently changing the data for everyone.
+    Extension columns other than categoricals are left as they are.
+    """
+    import numpy as np
+    import pandas as pd
+    columns = {}
+    for name in df.columns:
+        col = df[name]
+        if isinstance(col.dtype, pd.CategoricalDtype):
+            codes = col.cat.codes.to_numpy().view()
+            codes.flags.writeable = False
+            columns[name] = pd.Categorical.from_codes(codes, dtype=col.dtype)
+        elif isinstance(col.dtype, np.dtype):
+            values = col.to_numpy().view()
+            values.flags.writeable = False
+            columns[name] = values
+        else:
+            columns[name] = col.array
+    return pd.DataFrame(columns, index=df.index, copy=False)
+
+
+def _build_ticker_index(df):
+    """Map ticker -> (start, stop) row offsets in a frame sorted by (ticker, date)."""
+    import numpy as np
+    codes = df['ticker'].cat.codes.to_numpy()
+    if len(codes) == 0:
+        return {}
+    starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+    stops = np.r_[starts[1:], len(codes)]
+    categories = df['ticker'].cat.categories
+    return {categories[codes[a]]: (int(a), int(b)) for a, b in zip(starts, stops)}
+
+
+def _build_summary(data, anomalies, ticker_index, anomaly_index, version, loaded_at):
+    """Last close, day change and anomaly counts per ticker, from the slice indexes.
+
+    Each ticker costs O(1) lookups plus two binary searches over its anomaly
+    dates. The 1d/30d windows end at that ticker's last bar: 1d counts
+    anomalies on that date, 30d those within the 30 calendar days up to it.
+    Closes skip NaN like groupby().last(): the last and previous non-NaN
+    closes, or None when there are none.
+    """
+    import types
+    import numpy as np
+    close = data['close'].to_numpy(dtype='float64')
+    # Row of each ticker's latest non-NaN close at or before each row (-1: none yet)
+    valid_rows = np.where(np.isnan(close), -1, np.arange(len(close)))
+    last_valid = np.maximum.accumulate(valid_rows) if len(close) else valid_rows
+    dates = data.index.values
+    anomaly_dates = anomalies.index.values
+    tickers = {}
+    for sym, (lo, hi) in ticker_index.items():
+        last_date = dates[hi - 1]
+        last_row = int(last_valid[hi - 1])
+        last_close = float(close[last_row]) if last_row >= lo else None
+        prev_row = int(last_valid[last_row - 1]) if last_row > lo else -1
+        prev_close = float(close[prev_row]) if prev_row >= lo else None
+        if last_close is None:
+            prev_close = None
+        day_change = last_close - prev_close if prev_close is not None else None
+        day_change_pct = day_change / prev_close * 100 if prev_close else None
+
+        a_lo, a_hi = anomaly_index.get(sym, (0, 0))
+        own = anomaly_dates[a_lo:a_hi]
+        day_start = last_date.astype('datetime64[D]')
+        window = [int(a_hi - a_lo - np.searchsorted(own, since, side='left'))
+                  for since in (day_start, day_start - np.timedelta64(29, 'D'))]
+        tickers[sym] = TickerSummary(
+            sym, _to_date(last_date), last_close, prev_close, day_change, day_change_pct,
+            window[0], window[1], int(a_hi - a_lo), _to_date(own[-1]) if len(own) else None)
+    return Summary(len(data), len(anomalies), version, loaded_at, types.MappingProxyType(tickers))
+
+
+def _to_date(value):
+    """numpy datetime64 -> datetime.date"""
+    return value.astype('datetime64[D]').item()
+
+
+def _conform(new, like):
+    """Cast freshly parsed CSV rows to the dtypes of the loaded frame."""
+    import pandas as pd
+    new = new.reindex(columns=like.columns)
+    for col in like.columns:
+        if col == 'ticker':
+            continue
+        dtype = like[col].dtype
+        if pd.api.types.is_datetime64_any_dtype(dtype):
+            new[col] = pd.to_datetime(new[col], errors='coerce')
+        elif pd.api.types.is_integer_dtype(dtype):
+            new[col] = pd.to_numeric(new[col], errors='coerce').fillna(0).astype(dtype)
+        elif pd.api.types.is_float_dtype(dtype):
+            new[col] = pd.to_numeric(new[col], errors='coerce').astype(dtype)
+    return new
+
+
+def _slice(df, index, ticker, start=None, end=None):
+    """O(1) lookup of a ticker's rows, narrowed to [start, end] by binary search."""
+    import numpy as np
+    import pandas as pd
+    bounds = index.get(ticker)
+    if bounds is None:
+        return df.iloc[0:0]
+    lo, hi = bounds
+    if start is not None or end is not None:
+        dates = df.index.values[lo:hi]
+        offset = lo
+        if start is not None:
+            lo = offset + int(np.searchsorted(dates, np.datetime64(pd.Timestamp(start)), side='left'))
+        if end is not None:
+            hi = offset + int(np.searchsorted(dates, np.datetime64(pd.Timestamp(end)), side='right'))
+    return df.iloc[lo:hi]
+
+
+class LazyLoader:
+    """Builds the DataLoader on first use (or in a background warm-up thread).
+
+    Attribute access blocks until the data is loaded; use ``wait(timeout)`` to
+    poll instead of blocking. A failed load is re-raised to callers for
+    ``retry_interval`` seconds, then the next caller starts a fresh attempt.
+    """
+
+    def __init__(self, factory=DataLoader, refresh_interval=DATA_REFRESH_INTERVAL,
+                 retry_interval=LOADER_RETRY_INTERVAL):
+        self._factory = factory
+        self._refresh_interval = refresh_interval
+        self._retry_interval = retry_interval
+        self._loader = None
+        self._error = None
+        self._failed_at = None
+        self._thread = None
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+
+    def warm_up(self):
+        """Start loading in a daemon thread; no-op if already started (and not due for a retry)."""
+        with self._lock:
+            if self._error is not None and time.monotonic() - self._failed_at >= self._retry_interval:
+                self._error = self._thread = None
+                self._ready.clear()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._load, name='data-loader-warm-up', daemon=True)
+                self._thread.start()
+        return self
+
+    def _load(self):
+        try:
+            data_loader = self._factory()
+            if self._refresh_interval:
+                data_loader.start_auto_refresh(self._refresh_interval)
+        except Exception as e:
+            print(f"Data load failed (retrying in {self._retry_interval}s): {e}")
+            with self._lock:
+                self._error, self._failed_at = e, time.monotonic()
+        else:
+            with self._lock:
+                self._loader = data_loader
+        finally:
+            self._ready.set()
+
+    @property
+    def ready(self):
+        return self._ready.is_set() and self._loader is not None
+
+    def wait(self, timeout=None):
+        """Start loading if needed and wait up to ``timeout`` seconds.
+
+        Returns True once data is ready, False on timeout; re-raises a load
+        failure until it is due for a retry.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            self.warm_up()
+            remaining = None if deadline is None else max(deadline - time.monotonic(), 0)
+            if not self._ready.wait(remaining):
+                return False
+            with self._lock:
+                data_loader, error = self._loader, self._error
+            if data_loader is not None:
+                return True
+            if error is not None:
+                raise error
+            # A retry started between the wait and the check; wait for that one
+
+    def set(self, data_loader):
+        """Install an already-built DataLoader (benchmarks and scripts)."""
+        with self._lock:
+            self._loader, self._error = data_loader, None
+            self._thread = self._thread or threading.current_thread()
+            self._ready.set()
+        return self
+
+    def get(self, timeout=None):
+        if not self.wait(timeout):
+            raise TimeoutError(f"Data still loading after {timeout}s")
+        return self._loader
+
+    def __getattr__(self, name):
+        return getattr(self.get(), name)
+
+# Global loader (loads lazily; see LazyLoader)
+loader = LazyLoader()
@@ -0,0 +1,114 @@
+# downsample.py
+# Visual decimation of long price series so chart payloads stay flat regardless
+# of history length. Both methods return sorted row positions into the input.
+import numpy as np
+
+
+# Widest bucket lttb_indices scores against every predecessor at once (cost ~ width**2
+# per bucket); wider buckets are walked one by one, where numpy's per-call cost amortises
+LTTB_TABLE_MAX_WIDTH = 16
+
+
+def lttb_indices(x, y, n_out):
+    """Largest-Triangle-Three-Buckets: keep the point of each bucket forming the
+    largest triangle with the previously kept point and the next bucket's mean.
+
+    The kept point of a bucket depends only on which point of the previous
+    bucket was kept, so the best pick is computed for every possible
+    predecessor at once (buckets x predecessors x candidates) and the walk
+    over the buckets is a chain of table lookups. Buckets wider than
+    LTTB_TABLE_MAX_WIDTH are scored one by one instead.
+    """
+    x = np.asarray(x, dtype='float64')
+    y = np.asarray(y, dtype='float64')
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    # n_out - 2 buckets between the fixed first and last points
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    starts, stops = edges[:-1], edges[1:]
+
+    # Mean of every bucket via prefix sums; the bucket after the last one is the final point
+    cx = np.r_[0.0, np.cumsum(x)]
+    cy = np.r_[0.0, np.cumsum(y)]
+    counts = stops - starts
+    mean_x = np.r_[(cx[stops] - cx[starts]) / counts, x[-1]]
+    mean_y = np.r_[(cy[stops] - cy[starts]) / counts, y[-1]]
+
+    out = np.empty(n_out, dtype=np.int64)
+    out[0], out[-1] = 0, n - 1
+    width = int(counts.max())
+    if width > LTTB_TABLE_MAX_WIDTH:
+        a = 0
+        for i in range(n_out - 2):
+            lo, hi = starts[i], stops[i]
+            bx, by = x[lo:hi], y[lo:hi]
+            area = np.abs((x[a] - mean_x[i + 1]) * (by - y[a]) - (x[a] - bx) * (mean_y[i + 1] - y[a]))
+            a = lo + int(np.argmax(area))
+            out[i + 1] = a
+        return out
+
+    # Buckets as rows of a (buckets x width) grid; short rows are padded and masked
+    cols = np.arange(width)
+    valid = cols < counts[:, None]
+    pos = np.minimum(starts[:, None] + cols, n - 1)
+    bx, by = x[pos], y[pos]
+    # Possible predecessors of bucket i: the points of bucket i - 1 (bucket 0: the first point)
+    ax = np.vstack([np.full(width, x[0]), bx[:-1]])[:, :, None]
+    ay = np.vstack([np.full(width, y[0]), by[:-1]])[:, :, None]
+    mx, my = mean_x[1:, None, None], mean_y[1:, None, None]
+    area = np.abs((ax - mx) * (by[:, None, :] - ay) - (ax - bx[:, None, :]) * (my - ay))
+    area[~np.broadcast_to(valid[:, None, :], area.shape)] = -np.inf
+    # best[i][p]: column kept in bucket i when column p of bucket i - 1 was kept
+    best = area.argmax(axis=2).tolist()
+
+    p = 0
+    picks = []
+    for row in best:
+        p = row[p]
+        picks.append(p)
+    out[1:-1] = starts + np.asarray(picks, dtype=np.int64)
+    return out
+
+
+def minmax_indices(y, n_out):
+    """Keep the min and max of each of n_out // 2 equal buckets (fully vectorised)."""
+    y = np.asarray(y, dtype='float64')
+    n = len(y)
+    n_buckets = max(n_out // 2, 1)
+    if n_out >= n:
+        return np.arange(n)
+
+    size = -(-n // n_buckets)
+    padded = np.full(n_buckets * size, np.nan)
+    padded[:n] = y
+    grid = padded.reshape(n_buckets, size)
+    valid = ~np.isnan(grid).all(axis=1)
+    grid = grid[valid]
+    base = np.flatnonzero(valid) * size
+    lo = base + np.nanargmin(grid, axis=1)
+    hi = base + np.nanargmax(grid, axis=1)
+    return np.unique(np.r_[0, lo, hi, n - 1])
+
+
+def downsample(dates, values, max_points, method='lttb', keep=None):
+    """Pick at most ~max_points positions to plot, always including ``keep``.
+
+    ``dates`` is a datetime64 array, ``values`` the series to decimate and
+    ``keep`` optional positions (e.g. anomalies) that must survive.
+    ``max_points`` of 0/None disables decimation.
+    """
+    n = len(values)
+    if not max_points or n <= max_points:
+        idx = np.arange(n)
+    elif method == 'minmax':
+        idx = minmax_indices(values, max_points)
+    elif method == 'lttb':
+        x = np.asarray(dates, dtype='datetime64[ns]').astype('int64') / 86_400e9
+        idx = lttb_indices(x, values, max_points)
+    else:
+        raise ValueError(f"Unknown downsampling method: {method!r}")
+    if keep is not None and len(keep):
+        idx = np.union1d(idx, keep)
+    return idx
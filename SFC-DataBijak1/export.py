@@ -0,0 +1,183 @@
+# export.py
+# Streaming anomaly exports for /download/anomalies.<csv|parquet>. Rows come
+# from the snapshot's per-ticker slices in fixed-size chunks, so the first bytes
+# go out immediately and memory stays bounded by one chunk however much history
+# is exported.
+from config import EXPORT_CHUNK_ROWS
+
+# Column order of the old SQL export; columns the loaded data lacks are skipped
+EXPORT_COLUMNS = ['ticker', 'date', 'timestamp', 'open', 'high', 'low', 'close', 'adj_close', 'volume',
+                  'dividends', 'stock_splits', 'returns', 'ma_50', 'ma_200', 'vol_20', 'volume_ma_20',
+                  'rsi_14', 'anomaly_score', 'anomaly']
+
+try:
+    import pyarrow
+    import pyarrow.csv
+    import pyarrow.parquet
+except ImportError:  # optional: Parquet needs it, CSV falls back to pandas
+    pyarrow = None
+
+# The first chunk is small so bytes go out at once; later ones double up to chunk_rows
+FIRST_CHUNK_ROWS = 1024
+
+
+def anomaly_ranges(snap, ticker=None, start=None, end=None):
+    """(lo, hi) row ranges of snap.anomalies to export, in (ticker, date) order.
+
+    One binary search per ticker; nothing is copied. Raises ValueError on a bad date.
+    """
+    import numpy as np
+    import pandas as pd
+    bounds = {ticker: snap.anomaly_index.get(ticker, (0, 0))} if ticker else snap.anomaly_index
+    lo_at = np.datetime64(pd.Timestamp(start)) if start else None
+    hi_at = np.datetime64(pd.Timestamp(end)) if end else None
+    if (start and pd.isna(lo_at)) or (end and pd.isna(hi_at)):
+        raise ValueError('Invalid from/to date')
+    dates = snap.anomalies.index.values
+    ranges = []
+    for lo, hi in bounds.values():
+        own = dates[lo:hi]
+        a = lo + int(np.searchsorted(own, lo_at, side='left')) if lo_at is not None else lo
+        b = lo + int(np.searchsorted(own, hi_at, side='right')) if hi_at is not None else hi
+        if b > a:
+            ranges.append((a, b))
+    return ranges
+
+
+def iter_chunks(snap, ranges, chunk_rows=EXPORT_CHUNK_ROWS):
+    """Frames of about ``chunk_rows`` rows covering ``ranges``, with EXPORT_COLUMNS.
+
+    Small ranges (one ticker's anomalies) are packed together and large ones
+    split, so only one chunk is materialized at a time.
+    """
+    import numpy as np
+    columns = export_columns(snap.anomalies)
+    pending, size = [], 0
+    limit = min(FIRST_CHUNK_ROWS, chunk_rows)
+    for lo, hi in ranges:
+        while lo < hi:
+            take = min(hi - lo, limit - size)
+            pending.append(np.arange(lo, lo + take))
+            size += take
+            lo += take
+            if size == limit:
+                yield _frame(snap.anomalies, np.concatenate(pending), columns)
+                pending, size = [], 0
+                limit = min(limit * 2, chunk_rows)
+    if pending:
+        yield _frame(snap.anomalies, np.concatenate(pending), columns)
+
+
+def export_columns(anomalies):
+    return [c for c in EXPORT_COLUMNS if c == 'date' or c in anomalies.columns]
+
+
+def _frame(anomalies, positions, columns):
+    chunk = anomalies.iloc[positions]
+    out = chunk[[c for c in columns if c != 'date']].copy()
+    out.insert(columns.index('date'), 'date', chunk.index.values.astype('datetime64[D]'))
+    out['ticker'] = out['ticker'].astype(str)
+    return out
+
+
+def arrow_schema(empty):
+    """Arrow schema for export frames (``empty``: a zero-row one).
+
+    Dates are date32 (bars are daily) and timestamps whole seconds, which also
+    keeps the CSV text the same as pandas writes it.
+    """
+    schema = pyarrow.Schema.from_pandas(empty, preserve_index=False)
+    for i, field in enumerate(schema):
+        if field.name == 'date':
+            schema = schema.set(i, pyarrow.field('date', pyarrow.date32()))
+        elif pyarrow.types.is_timestamp(field.type):
+            schema = schema.set(i, pyarrow.field(field.name, pyarrow.timestamp('s', tz=field.type.tz)))
+    return schema
+
+
+def iter_csv(chunks, columns, empty):
+    """CSV bytes: the header, then one block per chunk.
+
+    Blocks are written by pyarrow when available (about 10x faster than
+    DataFrame.to_csv on float columns), else by pandas.
+    """
+    import csv
+    import io
+    header = io.StringIO()
+    csv.writer(header, lineterminator='\n').writerow(columns)
+    yield header.getvalue().encode('utf-8')
+    if pyarrow is None:
+        for chunk in chunks:
+            yield chunk.to_csv(header=False, index=False).encode('utf-8')
+        return
+    schema = arrow_schema(empty)
+    options = pyarrow.csv.WriteOptions(include_header=False)
+    for chunk in chunks:
+        sink = pyarrow.BufferOutputStream()
+        pyarrow.csv.write_csv(pyarrow.Table.from_pandas(chunk, schema=schema, preserve_index=False), sink, options)
+        yield sink.getvalue().to_pybytes()
+
+
+class _Spool:
+    """Write-only sink that hands back whatever was written since the last drain."""
+
+    def __init__(self):
+        self.parts = []
+        self.closed = False
+        self.position = 0
+
+    def write(self, data):
+        self.parts.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data = b''.join(self.parts)
+        self.parts = []
+        return data
+
+
+def iter_parquet(chunks, empty):
+    """Parquet bytes, one row group per chunk, yielded as each group is written.
+
+    ``empty`` is a zero-row frame with the export's columns, used for the schema.
+    """
+    if pyarrow is None:
+        raise RuntimeError('Parquet export needs pyarrow')
+    schema = arrow_schema(empty)
+    spool = _Spool()
+    with pyarrow.parquet.ParquetWriter(spool, schema) as writer:
+        for chunk in chunks:
+            writer.write_table(pyarrow.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+            yield spool.drain()
+    yield spool.drain()  # footer
+
+
+def stream_anomalies(snap, fmt, ticker=None, start=None, end=None, chunk_rows=EXPORT_CHUNK_ROWS):
+    """Byte chunks of the filtered anomalies as 'csv' or 'parquet'.
+
+    Validates everything up front (ValueError, or RuntimeError when Parquet is
+    unavailable) so the caller can still answer with an error status; the
+    returned generator only produces bytes.
+    """
+    import numpy as np
+    if fmt not in ('csv', 'parquet'):
+        raise ValueError(f'Unknown export format {fmt!r}')
+    if fmt == 'parquet' and pyarrow is None:
+        raise RuntimeError('Parquet export needs pyarrow')
+    ranges = anomaly_ranges(snap, ticker, start, end)
+    chunks = iter_chunks(snap, ranges, chunk_rows)
+    columns = export_columns(snap.anomalies)
+    empty = _frame(snap.anomalies, np.empty(0, dtype=np.int64), columns)
+    if fmt == 'csv':
+        return iter_csv(chunks, columns, empty)
+    return iter_parquet(chunks, empty)
@@ -0,0 +1,165 @@
+# features.py
+# The one definition of the derived feature columns, shared by the backfill, the
+# data loader, tuning and the scoring API.
+#
+# Every indicator is computed on a row-aligned float64 panel (positions x tickers:
+# column j holds ticker j's rows in date order, NaN-padded at the end), so all
+# tickers go through the same handful of NumPy passes. Rolling means and
+# variances come from differences of cumulative sums; windows count non-NaN
+# values like pandas' rolling(min_periods=...).
+from collections import namedtuple
+import numpy as np
+import pandas as pd
+
+FEATURE_COLUMNS = ['returns', 'ma_50', 'ma_200', 'vol_20', 'volume_ma_20', 'rsi_14']
+# Rows of history needed before a new bar for its features to match a full recompute
+FEATURE_LOOKBACK = 200
+
+# name: (input, window, min_periods); 'returns' and 'rsi_14' are derived in feature_panel
+ROLLING_MEANS = {
+    'ma_50': ('close', 50, 1),
+    'ma_200': ('close', 200, 1),
+    'volume_ma_20': ('volume', 20, 1),
+}
+VOL_WINDOW = 20
+RSI_WINDOW = 14
+
+
+# Cumulative sums of one input: window sums are differences of two rows
+Prefix = namedtuple('Prefix', 'sums squares counts ref')
+
+
+def prefix_sums(x, squares=False, centre=True):
+    """Column-wise cumulative sums of a panel, ignoring NaN.
+
+    With ``centre`` values are shifted by their column mean first so the sums
+    stay small and differencing them keeps full precision. Non-negative inputs
+    can skip that: an all-zero window then differences to exactly 0.
+    """
+    valid = ~np.isnan(x)
+    counts = valid.sum(axis=0)
+    ref = np.where(valid, x, 0.0).sum(axis=0) / np.maximum(counts, 1) if centre else 0.0
+    values = np.where(valid, x - ref, 0.0)
+    return Prefix(np.cumsum(values, axis=0), np.cumsum(values * values, axis=0) if squares else None,
+                  np.cumsum(valid, axis=0, dtype=np.int32), ref)
+
+
+def _window_sum(total, window):
+    """Sum over the trailing ``window`` rows, from a cumulative sum."""
+    out = total.copy()
+    out[window:] -= total[:-window]
+    return out
+
+
+def window_mean(prefix, window, min_periods=None):
+    """Trailing mean from prefix sums, NaN until min_periods values are seen."""
+    min_periods = window if min_periods is None else min_periods
+    count = _window_sum(prefix.counts, window)
+    with np.errstate(all='ignore'):
+        mean = _window_sum(prefix.sums, window) / count + prefix.ref
+    return np.where(count >= max(min_periods, 1), mean, np.nan)
+
+
+def window_std(prefix, window, min_periods=None, ddof=1):
+    """Trailing standard deviation from prefix sums (sample std by default, as pandas)."""
+    min_periods = window if min_periods is None else min_periods
+    count = _window_sum(prefix.counts, window)
+    s1 = _window_sum(prefix.sums, window)
+    with np.errstate(all='ignore'):
+        var = (_window_sum(prefix.squares, window) - s1 * s1 / count) / (count - ddof)
+    np.maximum(var, 0.0, out=var)  # rounding can leave tiny negatives
+    return np.where((count >= max(min_periods, 1)) & (count > ddof), np.sqrt(var), np.nan)
+
+
+def rolling_mean(x, window, min_periods=None):
+    """Column-wise trailing mean of a 2-D panel, like pandas' rolling(...).mean()."""
+    return window_mean(prefix_sums(x), window, min_periods)
+
+
+def rolling_std(x, window, min_periods=None, ddof=1):
+    """Column-wise trailing standard deviation of a 2-D panel, like pandas' rolling(...).std()."""
+    return window_std(prefix_sums(x, squares=True), window, min_periods, ddof)
+
+
+def _shifted(x):
+    out = np.full_like(x, np.nan)
+    out[1:] = x[:-1]
+    return out
+
+
+def _rsi(delta, window):
+    """RSI on simple (not Wilder) rolling averages of gains and losses."""
+    nan = np.isnan(delta)
+    avg_gain = window_mean(prefix_sums(np.where(nan, np.nan, np.maximum(delta, 0)), centre=False), window)
+    avg_loss = window_mean(prefix_sums(np.where(nan, np.nan, np.maximum(-delta, 0)), centre=False), window)
+    with np.errstate(all='ignore'):
+        return 100 - (100 / (1 + avg_gain / avg_loss))
+
+
+def feature_panel(close, volume):
+    """All FEATURE_COLUMNS for (positions x tickers) close/volume panels."""
+    close = np.asarray(close, dtype='float64')
+    volume = np.asarray(volume, dtype='float64')
+    # One set of prefix sums per input serves every window over it
+    prefixes = {'close': prefix_sums(close), 'volume': prefix_sums(volume)}
+    out = {}
+    prev = _shifted(close)
+    with np.errstate(all='ignore'):
+        # NaN when either close is missing, i.e. pct_change(fill_method=None); the
+        # pinned pandas 2.1's bare pct_change() would pad over the gap instead
+        out['returns'] = close / prev - 1.0
+
+    for name, (column, window, min_periods) in ROLLING_MEANS.items():
+        out[name] = window_mean(prefixes[column], window, min_periods)
+    out['vol_20'] = window_std(prefix_sums(out['returns'], squares=True), VOL_WINDOW, min_periods=1)
+    out['rsi_14'] = _rsi(close - prev, RSI_WINDOW)
+    return {name: out[name] for name in FEATURE_COLUMNS}
+
+
+def to_panel(values, starts, stops):
+    """Long column of stacked tickers (rows starts[j]:stops[j] each) -> (panel, src, rows, cols).
+
+    ``panel[rows, cols]`` are the values taken from positions ``src`` of the long column.
+    """
+    starts = np.asarray(starts, dtype=np.int64)
+    lengths = np.asarray(stops, dtype=np.int64) - starts
+    cols = np.repeat(np.arange(len(starts)), lengths)
+    rows = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    src = np.repeat(starts, lengths) + rows
+    # Column-major: each ticker's rows are contiguous, as are the cumsums along them
+    panel = np.full((int(lengths.max()) if len(lengths) else 0, len(starts)), np.nan, order='F')
+    panel[rows, cols] = np.asarray(values, dtype='float64')[src]
+    return panel, src, rows, cols
+
+
+def compute_features_multi(df, starts, stops):
+    """Feature columns for a long frame holding many tickers, in one panel pass.
+
+    Ticker j occupies rows starts[j]:stops[j] of ``df`` in date order (e.g. the
+    loader's ticker index). Returns a frame of FEATURE_COLUMNS aligned to ``df``.
+    """
+    close, src, rows, cols = to_panel(pd.to_numeric(df['close'], errors='coerce').to_numpy(), starts, stops)
+    volume, _, _, _ = to_panel(pd.to_numeric(df['volume'], errors='coerce').to_numpy(), starts, stops)
+    panel = feature_panel(close, volume)
+    # Column-major panels flatten without copying; gather each row's cell with a 1-D take
+    flat = cols * close.shape[0] + rows
+    out = np.full((len(df), len(FEATURE_COLUMNS)), np.nan, order='F')
+    for k, name in enumerate(FEATURE_COLUMNS):
+        out[src, k] = np.ravel(panel[name], order='F').take(flat)
+    return pd.DataFrame(out, index=df.index, columns=FEATURE_COLUMNS)
+
+
+# RSI helper
+def compute_rsi(series, window=14):
+    # series: pd.Series of prices (float); simple rolling averages of gains/losses
+    close = pd.to_numeric(series, errors='coerce').to_numpy(dtype='float64')[:, None]
+    return pd.Series(_rsi(close - _shifted(close), window)[:, 0], index=series.index)
+
+
+def compute_features(df):
+    """Add FEATURE_COLUMNS to one ticker's rows (sorted by date)."""
+    close = pd.to_numeric(df['close'], errors='coerce').to_numpy(dtype='float64')[:, None]
+    volume = pd.to_numeric(df['volume'], errors='coerce').to_numpy(dtype='float64')[:, None]
+    for name, values in feature_panel(close, volume).items():
+        df[name] = values[:, 0]
+    return df
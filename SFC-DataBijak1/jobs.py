@@ -0,0 +1,166 @@
+# jobs.py
+# Background pipeline runs for POST /trigger/<symbol>. The request only records
+# a queued RunLog row and returns; a bounded thread pool does the work and moves
+# the row through running to succeeded/failed, which GET /api/jobs/<id> reports.
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from sqlalchemy import select
+from models import db, RunLog, Ticker
+from storage import read_engine
+
+QUEUED, RUNNING, SUCCEEDED, FAILED = 'queued', 'running', 'succeeded', 'failed'
+
+
+def get_job(app, job_id):
+    """The job's RunLog row as a dict, or None; read through the read-only pool.
+
+    Needs no JobRunner, so a status poll never creates one (and never runs recover()).
+    """
+    table = RunLog.__table__
+    with read_engine(app).connect() as conn:
+        row = conn.execute(select(table).where(table.c.id == job_id)).mappings().first()
+    if row is None:
+        return None
+    job = dict(row)
+    for k in ('created_at', 'started_at', 'finished_at'):
+        job[k] = job[k].isoformat() if job[k] else None
+    return job
+
+
+class _Slot:
+    """A queued job whose RunLog row may still be being written; ``wait`` returns its id."""
+
+    def __init__(self):
+        self.job_id = None
+        self.error = None
+        self._created = threading.Event()
+
+    def done(self, job_id=None, error=None):
+        self.job_id, self.error = job_id, error
+        self._created.set()
+
+    def wait(self):
+        self._created.wait()
+        if self.error is not None:
+            raise self.error
+        return self.job_id
+
+
+class JobRunner:
+    """Run ``fn(symbol)`` on up to ``workers`` threads, one RunLog row per job.
+
+    Per (action, symbol) there is at most one running and one queued job: a
+    trigger while a job is queued joins that job, and a trigger while one is
+    running queues a single follow-up that starts when it finishes, so a ticker
+    never runs twice at once and a run never misses a trigger that came in
+    after it started. State lives in this process, so the app must serve from
+    one process (the Flask server, or one gunicorn worker with threads), and
+    the runner is only created there (app.job_runner), since recover() fails
+    every unfinished job it finds.
+    """
+
+    def __init__(self, app, fn, workers, action='pipeline_run'):
+        self.app = app
+        self.fn = fn
+        self.action = action
+        self.submitted = 0
+        self.coalesced = 0
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='job')
+        self._keys = {}  # symbol -> {'running': _Slot or None, 'queued': _Slot or None}
+        self._lock = threading.Lock()
+        self.recover()
+
+    def recover(self):
+        """Fail the jobs a previous process left queued or running; nothing will finish them."""
+        with self.app.app_context():
+            stale = RunLog.query.filter(RunLog.status.in_((QUEUED, RUNNING))).all()
+            for job in stale:
+                job.status = FAILED
+                job.message = 'Interrupted: the server restarted before the job finished'
+                job.finished_at = datetime.utcnow()
+            db.session.commit()
+        return len(stale)
+
+    def submit(self, symbol):
+        """Queue a run for ``symbol``; returns (job id, whether it joined an already queued job).
+
+        The RunLog row is written outside the lock; a trigger for the same
+        ticker meanwhile waits for that row only, other tickers do not wait.
+        """
+        with self._lock:
+            self.submitted += 1
+            state = self._keys.setdefault(symbol, {'running': None, 'queued': None})
+            slot = state['queued']
+            joined = slot is not None
+            if joined:
+                self.coalesced += 1
+            else:
+                slot = state['queued'] = _Slot()
+        if joined:
+            return slot.wait(), True
+        try:
+            job_id = self._create(symbol)
+        except Exception as e:
+            with self._lock:
+                state['queued'] = None
+                if state['running'] is None:
+                    del self._keys[symbol]
+            slot.done(error=e)
+            raise
+        with self._lock:
+            slot.job_id = job_id
+            # Otherwise the running job starts this one when it finishes
+            if state['running'] is None:
+                self._pool.submit(self._run, symbol, slot)
+        slot.done(job_id)
+        return job_id, False
+
+    def get(self, job_id):
+        return get_job(self.app, job_id)
+
+    def _create(self, symbol):
+        with self.app.app_context():
+            ticker = Ticker.query.filter_by(symbol=symbol).first()
+            job = RunLog(ticker_id=ticker.id if ticker else None, symbol=symbol, action=self.action,
+                         status=QUEUED)
+            db.session.add(job)
+            db.session.commit()
+            return job.id
+
+    def _run(self, symbol, slot):
+        job_id = slot.job_id
+        with self._lock:
+            state = self._keys[symbol]
+            state['queued'], state['running'] = None, slot
+        try:
+            with self.app.app_context():
+                job = db.session.get(RunLog, job_id)
+                job.status, job.started_at = RUNNING, datetime.utcnow()
+                db.session.commit()
+                try:
+                    result = self.fn(symbol)
+                    job.status, job.message = SUCCEEDED, None if result is None else str(result)
+                except Exception:
+                    job.status, job.message = FAILED, traceback.format_exc(limit=5)
+                job.finished_at = datetime.utcnow()
+                db.session.commit()
+        finally:
+            with self._lock:
+                state['running'] = None
+                follow_up = state['queued']
+                if follow_up is None:
+                    del self._keys[symbol]
+                elif follow_up.job_id is not None:
+                    self._pool.submit(self._run, symbol, follow_up)
+                # else its trigger is still writing the row and starts it itself
+
+    def stats(self):
+        with self._lock:
+            return {'submitted': self.submitted, 'coalesced': self.coalesced,
+                    'running': sum(s['running'] is not None for s in self._keys.values()),
+                    'queued': sum(s['queued'] is not None for s in self._keys.values())}
+
+    def shutdown(self, wait=True):
+        self._pool.shutdown(wait=wait)
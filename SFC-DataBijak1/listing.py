@@ -0,0 +1,126 @@
+# listing.py
+# Keyset-paginated anomaly listing, newest first. Each snapshot carries an
+# AnomalyListing: anomalies keyed by (date, ticker) as one sortable int64, so a
+# page is a binary search for the cursor (and the date range) plus a slice, no
+# matter how deep into the listing it is.
+from config import ANOMALIES_PAGE_SIZE
+
+
+class AnomalyListing:
+    """Pre-sorted keys over a snapshot's anomalies (sorted by (ticker, date)).
+
+    A row's key is ``seconds since epoch * n_tickers + ticker code``; ticker
+    codes follow the (sorted) categories, so keys order rows by date, then
+    ticker. ``frame_keys`` follows the frame (ascending within each ticker's
+    slice); ``order`` lists frame positions by key across all tickers.
+    """
+
+    def __init__(self, anomalies, anomaly_index):
+        import numpy as np
+        self.anomalies = anomalies
+        self.anomaly_index = anomaly_index
+        self.categories = np.asarray(anomalies['ticker'].cat.categories, dtype=object)
+        self.n_codes = max(len(self.categories), 1)
+        seconds = anomalies.index.values.astype('datetime64[s]').astype(np.int64)
+        codes = anomalies['ticker'].cat.codes.to_numpy().astype(np.int64)
+        self.frame_keys = seconds * self.n_codes + codes
+        self.order = np.argsort(self.frame_keys, kind='stable')
+        self.sorted_keys = self.frame_keys[self.order]
+        self.scores = anomalies['anomaly_score'].to_numpy(dtype='float64') if 'anomaly_score' in anomalies \
+            else np.full(len(anomalies), np.nan)
+
+    def _date_key(self, value, after=False):
+        """Smallest key on ``value``'s timestamp (or just past it with ``after``)."""
+        import numpy as np
+        seconds = int(np.datetime64(_timestamp(value), 's').astype(np.int64))
+        return (seconds + after) * self.n_codes
+
+    def cursor_key(self, cursor):
+        """Key of a (date, ticker) cursor; unknown tickers sort where they would belong."""
+        import numpy as np
+        date, ticker = cursor
+        # Exclusive: rows strictly before the cursor in key order come next
+        code = int(np.searchsorted(self.categories, ticker, side='left'))
+        return self._date_key(date) + code
+
+    def page(self, ticker=None, start=None, end=None, min_score=None, cursor=None, limit=ANOMALIES_PAGE_SIZE):
+        """One page of anomalies, newest first, and the cursor for the next one (or None).
+
+        Filters: one ticker, start <= date <= end, anomaly_score >= min_score.
+        ``cursor`` is the (date, ticker) of the last row of the previous page.
+        Raises ValueError on an unparseable date.
+        """
+        import numpy as np
+        if ticker:
+            lo, hi = self.anomaly_index.get(ticker, (0, 0))
+            keys = self.frame_keys[lo:hi]
+            positions = np.arange(lo, hi)
+        else:
+            keys, positions = self.sorted_keys, self.order
+
+        lo, hi = 0, len(keys)
+        if start:
+            lo = int(np.searchsorted(keys, self._date_key(start), side='left'))
+        if end:
+            hi = int(np.searchsorted(keys, self._date_key(end, after=True), side='left'))
+        if cursor is not None:
+            hi = min(hi, int(np.searchsorted(keys, self.cursor_key(cursor), side='left')))
+
+        # One row past the page tells whether there is a next page
+        picked = self._take_last(positions, max(lo, 0), hi, limit + 1, min_score)
+        more = len(picked) > limit
+        picked = picked[::-1][:limit]
+        rows = self.anomalies.iloc[picked]
+        next_cursor = None
+        if more and len(rows):
+            next_cursor = (rows.index[-1], str(rows['ticker'].iloc[-1]))
+        return rows, next_cursor
+
+    def _take_last(self, positions, lo, hi, n, min_score):
+        """The last ``n`` positions in positions[lo:hi] passing the score filter, in key order.
+
+        Without a score filter this is a slice. With one, the range is scanned
+        backwards in growing blocks, so the cost depends on how selective the
+        threshold is, not on how deep the page is.
+        """
+        import numpy as np
+        if min_score is None:
+            return positions[max(lo, hi - n):hi]
+        found = []
+        count = 0
+        block = max(4 * n, 256)
+        while hi > lo and count < n:
+            chunk = positions[max(lo, hi - block):hi]
+            keep = chunk[self.scores[chunk] >= min_score]
+            found.append(keep)
+            count += len(keep)
+            hi -= len(chunk)
+            block *= 2
+        if not found:
+            return positions[0:0]
+        return np.concatenate(found[::-1])[-n:]
+
+
+def _timestamp(value):
+    import pandas as pd
+    stamp = pd.Timestamp(value)
+    if stamp is pd.NaT:
+        raise ValueError(f'Invalid date {value!r}')
+    return stamp
+
+
+def format_cursor(cursor):
+    """(date, ticker) -> 'YYYY-MM-DD,TICKER' for query strings."""
+    import pandas as pd
+    date, ticker = cursor
+    stamp = pd.Timestamp(date)
+    text = stamp.strftime('%Y-%m-%d') if stamp == stamp.normalize() else stamp.isoformat()
+    return f'{text},{ticker}'
+
+
+def parse_cursor(text):
+    """Inverse of format_cursor; raises ValueError on a malformed cursor."""
+    date, sep, ticker = text.partition(',')
+    if not sep or not ticker:
+        raise ValueError(f'Invalid cursor {text!r}')
+    return _timestamp(date), ticker
@@ -1,117 +1,203 @@
 from pymongo import MongoClient
+from bson import ObjectId
 import pandas as pd
+import argparse
 import logging
+import time
+from datetime import date, datetime
 from config import MONGO_URI, MONGO_DB_NAME, MONGO_COLLECTION
-from models import db, Ticker, Anomaly
+from models import db, Ticker, Anomaly, SyncWatermark
 from app import create_app
+from data_loader import TOP_TICKERS
+from sqlalchemy import insert, select
 from sqlalchemy.exc import IntegrityError
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-def import_from_mongo(mongo_uri=None):
+# Documents fetched per cursor round-trip and rows per INSERT executemany/commit
+IMPORT_BATCH_SIZE = 1000
+
+# Fields copied into real Anomaly columns; the projection fetches only these
+FLOAT_FIELDS = ['open', 'high', 'low', 'close', 'adj_close', 'volume', 'dividends', 'stock_splits',
+                'returns', 'ma_50', 'ma_200', 'vol_20', 'volume_ma_20', 'rsi_14', 'anomaly_score']
+PROJECTION = {f: 1 for f in ['ticker', 'date', 'timestamp', 'anomaly'] + FLOAT_FIELDS}
+
+
+def _to_float(value):
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _to_datetime(value):
+    """Parse a Mongo date/timestamp field; ISO strings take the fast path,
+    anything else falls back to pandas (which is ~100x slower per call)."""
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, date):
+        return datetime(value.year, value.month, value.day)
+    if isinstance(value, str):
+        try:
+            return datetime.fromisoformat(value)
+        except ValueError:
+            pass
+    return pd.to_datetime(value).to_pydatetime()
+
+
+def doc_to_row(d, ticker_id, date_dt):
+    """Map a Mongo document onto Anomaly column values."""
+    row = {f: _to_float(d.get(f)) for f in FLOAT_FIELDS}
+    row.update(
+        ticker_id=ticker_id,
+        date=date_dt,
+        timestamp=_to_datetime(d.get('timestamp')) if d.get('timestamp') else None,
+        anomaly=int(d.get('anomaly')) if d.get('anomaly') is not None else None,
+    )
+    return row
+
+
+def _mongo_id(value):
+    """Stored watermark back to the type Mongo compares on (ObjectId for 24-hex ids)."""
+    return ObjectId(value) if ObjectId.is_valid(value) else value
+
+
+def load_existing_dates(ticker_id):
+    """Date ordinals already in SQL for one ticker, read once for dedupe."""
+    stmt = select(Anomaly.date).where(Anomaly.ticker_id == ticker_id)
+    return {d.toordinal() for d in db.session.execute(stmt).scalars()}
+
+
+def _new_row(d, ticker_id, existing):
+    """Row for a document, or None if its date is invalid or already imported."""
+    date_str = d.get('date')
+    try:
+        date_dt = _to_datetime(date_str).date()
+    except (ValueError, TypeError):
+        logger.error(f"Invalid date for ticker {d.get('ticker')}: {date_str}")
+        return None
+
+    # Skip dates already in SQL (or earlier in this run)
+    if date_dt.toordinal() in existing:
+        return None
+    existing.add(date_dt.toordinal())
+    return doc_to_row(d, ticker_id, date_dt)
+
+
+def write_batch(batch, ticker_id, last_id, last_timestamp):
+    """Insert a batch and advance the ticker's watermark in the same transaction.
+
+    A constraint violation no longer aborts the run: the batch is retried with
+    INSERT OR IGNORE so only the offending rows are dropped.
+    """
+    if batch:
+        try:
+            db.session.execute(insert(Anomaly), batch)
+        except IntegrityError as e:
+            db.session.rollback()
+            logger.warning(f"Batch hit a constraint ({e.orig}); retrying with INSERT OR IGNORE.")
+            db.session.execute(insert(Anomaly).prefix_with('OR IGNORE'), batch)
+    db.session.merge(SyncWatermark(ticker_id=ticker_id, last_id=str(last_id), last_timestamp=last_timestamp))
+    db.session.commit()
+    logger.info(f"Committed batch of {len(batch)} anomalies (checkpoint {last_id}).")
+
+
+def import_from_mongo(mongo_uri=None, client=None, app=None, batch_size=IMPORT_BATCH_SIZE, incremental=False):
+    """Stream the Mongo collection into SQL in fixed-size batches.
+
+    Each ticker is read in ``_id`` order with a projection, off a
+    ``(ticker, _id)`` index created on first use; ticker ids come
+    from a preloaded dict and duplicates are skipped against the dates already
+    stored, so there are no per-document queries. Every committed batch also
+    records the last ``_id`` read in SyncWatermark, and with ``incremental``
+    only documents past that watermark are fetched, so a sync interrupted
+    mid-way resumes from its last checkpoint. ``client``/``app`` can be
+    injected (e.g. mongomock, a temp DB).
+    """
     mongo_uri = mongo_uri or MONGO_URI
-    if not mongo_uri:
+    if client is None and not mongo_uri:
         return "Mongo URI not configured. Set MONGO_URI in environment or config.py"
 
+    owns_client = client is None
     try:
-        client = MongoClient(mongo_uri, serverSelectionTimeoutMS=5000)
+        if owns_client:
+            client = MongoClient(mongo_uri, serverSelectionTimeoutMS=5000)
         client.server_info()  # Test connection
         db_m = client.get_database(MONGO_DB_NAME)
         coll = db_m.get_collection(MONGO_COLLECTION)
+        # Serves each ticker's find().sort('_id') without a collection scan and
+        # in-memory sort; a no-op when the index already exists
+        coll.create_index([('ticker', 1), ('_id', 1)])
 
-        docs = list(coll.find({}))
-        if not docs:
-            return "No documents found in Mongo collection."
-
-        app = create_app()
+        app = app or create_app()
         with app.app_context():
             db.create_all()
 
-            # Insert or update tickers
-            symbols = set(d.get('ticker') for d in docs if d.get('ticker'))
-            for sym in symbols:
-                if not sym or sym not in {'NVDA', 'MSFT', 'AAPL', 'GOOGL', 'AMZN', 'META', 'AVGO', 'TSM'}:
-                    logger.warning(f"Skipping invalid ticker: {sym}")
-                    continue
-                t = Ticker.query.filter_by(symbol=sym).first()
-                if not t:
-                    t = Ticker(symbol=sym)
-                    db.session.add(t)
-            db.session.commit()
-            logger.info(f"Initialized {len(symbols)} tickers in SQL.")
-
-            # Bulk import anomalies
-            anomalies_to_add = []
-            imported = 0
-            for d in docs:
-                sym = d.get('ticker')
-                if not sym:
-                    logger.warning("Skipping document with no ticker.")
-                    continue
-                t = Ticker.query.filter_by(symbol=sym).first()
-                if not t:
-                    logger.warning(f"Ticker {sym} not found in SQL.")
-                    continue
-
-                date_str = d.get('date')
-                try:
-                    date_dt = pd.to_datetime(date_str).date()
-                except (ValueError, TypeError):
-                    logger.error(f"Invalid date for ticker {sym}: {date_str}")
-                    continue
-
-                # Check for existing record to avoid duplicates
-                exists = Anomaly.query.filter_by(ticker_id=t.id, date=date_dt).first()
-                if exists:
-                    logger.info(f"Skipping existing anomaly for {sym} on {date_dt}")
-                    continue
-
-                # Prepare anomaly record
-                meta = {k: v for k, v in d.items() if k not in ('_id', 'ticker', 'date', 'timestamp', 'close', 'anomaly', 'anomaly_score')}
-                a = Anomaly(
-                    ticker_id=t.id,
-                    date=date_dt,
-                    timestamp=pd.to_datetime(d.get('timestamp')) if d.get('timestamp') else None,
-                    close=float(d.get('close')) if d.get('close') is not None else None,
-                    anomaly=int(d.get('anomaly')) if d.get('anomaly') is not None else None,
-                    anomaly_score=float(d.get('anomaly_score')) if d.get('anomaly_score') is not None else None,
-                    meta=meta
-                )
-                anomalies_to_add.append(a)
-                imported += 1
-
-                # Commit in batches for performance
-                if len(anomalies_to_add) >= 1000:
-                    try:
-                        db.session.bulk_save_objects(anomalies_to_add)
-                        db.session.commit()
-                        logger.info(f"Committed batch of {len(anomalies_to_add)} anomalies.")
-                        anomalies_to_add = []
-                    except IntegrityError as e:
-                        db.session.rollback()
-                        logger.error(f"Batch commit failed: {e}")
-                        break
-
-            # Commit remaining records
-            if anomalies_to_add:
-                try:
-                    db.session.bulk_save_objects(anomalies_to_add)
-                    db.session.commit()
-                    logger.info(f"Committed final batch of {len(anomalies_to_add)} anomalies.")
-                except IntegrityError as e:
-                    db.session.rollback()
-                    logger.error(f"Final commit failed: {e}")
-
-            return f"Imported {imported} anomalies into SQL DB."
+            tickers = {t.symbol: t.id for t in Ticker.query.all()}
+            started = time.perf_counter()
+            seen = imported = 0
+
+            for sym in TOP_TICKERS:
+                watermark = db.session.get(SyncWatermark, tickers[sym]) if sym in tickers else None
+                query = {'ticker': sym}
+                if incremental and watermark is not None:
+                    query['_id'] = {'$gt': _mongo_id(watermark.last_id)}
+                last_timestamp = watermark.last_timestamp if watermark is not None else None
+
+                ticker_id = existing = last_id = None
+                batch = []
+                n_read = 0
+                for d in coll.find(query, PROJECTION, batch_size=batch_size).sort('_id', 1):
+                    if ticker_id is None:
+                        if sym not in tickers:
+                            t = Ticker(symbol=sym)
+                            db.session.add(t)
+                            db.session.commit()
+                            tickers[sym] = t.id
+                        ticker_id = tickers[sym]
+                        existing = load_existing_dates(ticker_id)
+                    seen += 1
+                    n_read += 1
+                    last_id = d['_id']
+
+                    row = _new_row(d, ticker_id, existing)
+                    if row is not None:
+                        if row['timestamp'] is not None and (last_timestamp is None or row['timestamp'] > last_timestamp):
+                            last_timestamp = row['timestamp']
+                        batch.append(row)
+                        imported += 1
+
+                    # Commit (and checkpoint) every batch_size documents read
+                    if n_read % batch_size == 0:
+                        write_batch(batch, ticker_id, last_id, last_timestamp)
+                        batch = []
+
+                # Final checkpoint also covers trailing documents that were all skipped
+                if last_id is not None and (batch or n_read % batch_size):
+                    write_batch(batch, ticker_id, last_id, last_timestamp)
+
+            if not seen:
+                return ("No new documents since the last sync." if incremental
+                        else "No documents found in Mongo collection.")
+            elapsed = time.perf_counter() - started
+            logger.info(f"Read {seen} documents in {elapsed:.2f}s ({seen / elapsed:,.0f} docs/s).")
+            return f"Imported {imported} anomalies into SQL DB ({seen / elapsed:,.0f} docs/s)."
 
     except Exception as e:
         logger.error(f"Migration failed: {e}")
         return f"Migration failed: {str(e)}"
     finally:
-        client.close()
+        if owns_client and client is not None:
+            client.close()
 
 if __name__ == '__main__':
-    result = import_from_mongo()
-    print(result)
\ No newline at end of file
+    parser = argparse.ArgumentParser(description='Import Mongo anomalies into the SQL database.')
+    parser.add_argument('--incremental', action='store_true',
+                        help="only fetch documents past each ticker's stored watermark")
+    parser.add_argument('--batch-size', type=int, default=IMPORT_BATCH_SIZE,
+                        help='documents per cursor batch and rows per INSERT/commit')
+    args = parser.parse_args()
+    result = import_from_mongo(batch_size=args.batch_size, incremental=args.incremental)
+    print(result)
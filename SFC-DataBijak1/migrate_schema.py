@@ -0,0 +1,34 @@
+# migrate_schema.py
+# Brings an existing database up to models.py: adds columns added to a model
+# since the file was created and builds missing indexes. Building a unique
+# index first deletes duplicate rows (the newest id wins), so this only runs
+# when invoked; the app and scripts just warn when it is due.
+#   python migrate_schema.py --dry-run   # list the changes and rows that would go
+#   python migrate_schema.py
+import argparse
+import logging
+from app import create_app
+from models import upgrade_schema
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Upgrade the database schema to the current models.')
+    parser.add_argument('--dry-run', action='store_true', help='only list the changes (and rows removed)')
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        changes = upgrade_schema(dry_run=args.dry_run)
+    if not changes:
+        logger.info('Schema is up to date.')
+    elif args.dry_run:
+        logger.info('%d change(s) pending; run without --dry-run to apply them.', len(changes))
+    else:
+        logger.info('Applied %d change(s).', len(changes))
+
+
+if __name__ == '__main__':
+    main()
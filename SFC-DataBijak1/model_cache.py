@@ -0,0 +1,110 @@
+# model_cache.py
+# Fitted StandardScaler + IsolationForest pairs, persisted with joblib and reused
+# until the training data changes, so a rescore is a decision_function call.
+import glob
+import hashlib
+import json
+import os
+import threading
+import numpy as np
+from cache import LRUCache
+from config import MODEL_CACHE_PATH, MODEL_CACHE_SIZE
+
+
+def fingerprint(X):
+    """Digest of the exact training matrix (shape, dtype and values)."""
+    X = np.ascontiguousarray(X, dtype='float64')
+    h = hashlib.blake2b(digest_size=16)
+    h.update(repr(X.shape).encode())
+    h.update(X.view(np.uint8))
+    return h.hexdigest()
+
+
+def _safe(name):
+    return ''.join(ch if ch.isalnum() or ch in '-_' else '_' for ch in str(name))
+
+
+class ModelCache:
+    """(ticker, features, params, data fingerprint) -> (scaler, model).
+
+    Lookups go memory LRU -> joblib file (memory-mapped) -> fit. A ticker's
+    older files for the same features/params are removed when it is refit.
+    """
+
+    def __init__(self, path=MODEL_CACHE_PATH, maxsize=MODEL_CACHE_SIZE):
+        self.path = path
+        self.memory = LRUCache(maxsize)
+        self.loads = 0
+        self.fits = 0
+        self._lock = threading.Lock()  # guards _file_locks
+        self._file_locks = {}  # file -> [lock, threads using it]
+
+    def _prefix(self, ticker, features, params, source):
+        spec = json.dumps([list(features), params, source], sort_keys=True, default=str)
+        prefix = f"{_safe(ticker)}_isoforest_{hashlib.blake2b(spec.encode(), digest_size=6).hexdigest()}"
+        return os.path.join(self.path, prefix)
+
+    def get(self, ticker, X, features, params, source=None):
+        """Fitted (scaler, model) for this training matrix, fitting only on a miss.
+
+        ``source`` separates models trained on different data for the same
+        ticker (e.g. SQL rows vs the loader's CSV) so they don't evict each other.
+        """
+        X = np.ascontiguousarray(X, dtype='float64')
+        prefix = self._prefix(ticker, features, params, source)
+        file = f"{prefix}_{fingerprint(X)}.joblib"
+        fitted = self.memory.get(file)
+        if fitted is not None:
+            return fitted
+
+        import joblib
+        # One lock per file: a ticker's fit doesn't hold up other tickers, and
+        # threads missing on the same file wait for the first one's result
+        with self._lock:
+            entry = self._file_locks.setdefault(file, [threading.Lock(), 0])
+            entry[1] += 1
+        try:
+            with entry[0]:
+                fitted = self.memory.get(file)
+                if fitted is not None:
+                    return fitted
+                if os.path.exists(file):
+                    fitted = joblib.load(file, mmap_mode='r')
+                    with self._lock:
+                        self.loads += 1
+                else:
+                    fitted = self._fit(X, params)
+                    with self._lock:
+                        self.fits += 1
+                    self._save(prefix, file, fitted)
+                self.memory.put(file, fitted)
+                return fitted
+        finally:
+            with self._lock:
+                entry[1] -= 1
+                if not entry[1]:
+                    del self._file_locks[file]
+
+    @staticmethod
+    def _fit(X, params):
+        from sklearn.ensemble import IsolationForest
+        from sklearn.preprocessing import StandardScaler
+        scaler = StandardScaler().fit(X)
+        model = IsolationForest(**params).fit(scaler.transform(X))
+        return scaler, model
+
+    def _save(self, prefix, file, fitted):
+        import joblib
+        os.makedirs(self.path, exist_ok=True)
+        for stale in glob.glob(f"{glob.escape(prefix)}_*.joblib"):
+            os.remove(stale)
+        # Uncompressed so joblib can memory-map the arrays; rename keeps readers off half-written files
+        tmp = f"{file}.{os.getpid()}.tmp"
+        joblib.dump(fitted, tmp)
+        os.replace(tmp, file)
+
+    def stats(self):
+        return {'memory': self.memory.stats(), 'disk_loads': self.loads, 'fits': self.fits}
+
+
+model_cache = ModelCache()
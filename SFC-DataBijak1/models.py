@@ -1,7 +1,10 @@
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import inspect, text
 from datetime import datetime
+import logging
 
 db = SQLAlchemy()
+logger = logging.getLogger(__name__)
 
 # UserSession model (from initial context)
 class UserSession(db.Model):
@@ -28,10 +31,132 @@ class Anomaly(db.Model):
     ticker_id = db.Column(db.Integer, db.ForeignKey('ticker.id'), nullable=False)
     date = db.Column(db.Date, nullable=False)
     timestamp = db.Column(db.DateTime)
+    open = db.Column(db.Float)
+    high = db.Column(db.Float)
+    low = db.Column(db.Float)
     close = db.Column(db.Float)
+    adj_close = db.Column(db.Float)
+    volume = db.Column(db.Float)
+    dividends = db.Column(db.Float)
+    stock_splits = db.Column(db.Float)
+    # Derived features (filled by backfill_features_and_anomalies.py)
+    returns = db.Column(db.Float)
+    ma_50 = db.Column(db.Float)
+    ma_200 = db.Column(db.Float)
+    vol_20 = db.Column(db.Float)
+    volume_ma_20 = db.Column(db.Float)
+    rsi_14 = db.Column(db.Float)
     anomaly = db.Column(db.Integer)  # 1 or 0
     anomaly_score = db.Column(db.Float)
     meta = db.Column(db.JSON)  # Store extra fields like volume, open, etc.
 
+    __table_args__ = (
+        # One row per ticker per day; serves every ticker_id / date-range / ORDER BY date query
+        db.Index('ix_anomaly_ticker_date', 'ticker_id', 'date', unique=True),
+        # Anomaly-only listings (anomaly = 1 [AND ticker_id = ?] [AND date range])
+        db.Index('ix_anomaly_flag_ticker_date', 'anomaly', 'ticker_id', 'date'),
+    )
+
+    def as_dict(self):
+        d = {c.name: getattr(self, c.name) for c in self.__table__.columns}
+        d['ticker'] = self.ticker.symbol if self.ticker else None
+        return d
+
+    def __repr__(self):
+        return f'<Anomaly {self.ticker_id} on {self.date}>'
+
+
+# Rolling-window tail per ticker, so incremental backfills only compute new rows
+class FeatureState(db.Model):
+    ticker_id = db.Column(db.Integer, db.ForeignKey('ticker.id'), primary_key=True)
+    last_date = db.Column(db.Date, nullable=False)  # high-water mark of computed features
+    closes = db.Column(db.JSON)   # last 200 closes (longest window: ma_200)
+    volumes = db.Column(db.JSON)  # last 20 volumes (volume_ma_20)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
     def __repr__(self):
-        return f'<Anomaly {self.ticker_id} on {self.date}>'
\ No newline at end of file
+        return f'<FeatureState {self.ticker_id} through {self.last_date}>'
+
+
+# Per-ticker Mongo sync checkpoint, advanced in the same transaction as each imported batch
+class SyncWatermark(db.Model):
+    ticker_id = db.Column(db.Integer, db.ForeignKey('ticker.id'), primary_key=True)
+    last_id = db.Column(db.String(24), nullable=False)  # max Mongo _id imported (hex ObjectId)
+    last_timestamp = db.Column(db.DateTime)  # max document timestamp imported
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<SyncWatermark {self.ticker_id} at {self.last_id}>'
+
+
+# Background pipeline runs (jobs.py); status moves queued -> running -> succeeded/failed
+class RunLog(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    ticker_id = db.Column(db.Integer, db.ForeignKey('ticker.id'))  # set when the symbol is in Ticker
+    symbol = db.Column(db.String(10), nullable=False)
+    action = db.Column(db.String(32), nullable=False, default='pipeline_run')
+    status = db.Column(db.String(16), nullable=False, default='queued')
+    message = db.Column(db.Text)  # pipeline result, or the error for failed runs
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+
+    __table_args__ = (
+        # Startup recovery looks up unfinished runs by status
+        db.Index('ix_run_log_status', 'status'),
+    )
+
+    def __repr__(self):
+        return f'<RunLog {self.id} {self.action} {self.symbol}: {self.status}>'
+
+
+def upgrade_schema(dry_run=False):
+    """Bring an existing SQLite file up to the current models; see migrate_schema.py.
+
+    db.create_all() only creates missing tables, so columns added to a model
+    later are appended here with ALTER TABLE and missing indexes are created.
+    Before a unique index is built, duplicate rows are dropped (the newest id
+    wins) and their count logged. With ``dry_run`` nothing is changed. Returns
+    the changes, one line each. Must run inside an app context.
+    """
+    changes = []
+    with db.engine.begin() as conn:
+        inspector = inspect(conn)
+        for table in db.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {c['name'] for c in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing:
+                    col_type = column.type.compile(dialect=db.engine.dialect)
+                    changes.append(f'add column {table.name}.{column.name} {col_type}')
+                    if not dry_run:
+                        conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {col_type}'))
+
+            existing_indexes = {i['name'] for i in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name in existing_indexes:
+                    continue
+                change = f'create index {index.name} on {table.name}'
+                if index.unique and all(c.name in existing for c in index.columns):
+                    cols = ', '.join(c.name for c in index.columns)
+                    duplicates = (f'FROM {table.name} WHERE id NOT IN '
+                                  f'(SELECT MAX(id) FROM {table.name} GROUP BY {cols})')
+                    if dry_run:
+                        removed = conn.execute(text(f'SELECT COUNT(*) {duplicates}')).scalar()
+                    else:
+                        removed = conn.execute(text(f'DELETE {duplicates}')).rowcount
+                    change += f' (removing {removed} duplicate row(s) on {cols}, newest id kept)'
+                changes.append(change)
+                if not dry_run:
+                    index.create(conn)
+    for change in changes:
+        logger.info('%s%s', 'would ' if dry_run else '', change)
+    return changes
+
+
+def query_plan(stmt):
+    """SQLite's EXPLAIN QUERY PLAN detail lines for a select(), e.g. to check index use."""
+    sql = stmt.compile(db.engine, compile_kwargs={'literal_binds': True})
+    with db.engine.connect() as conn:
+        return [row[-1] for row in conn.exec_driver_sql(f'EXPLAIN QUERY PLAN {sql}')]
@@ -0,0 +1,119 @@
+# responses.py
+# JSON API responses built straight from column arrays: column-oriented bodies
+# (serialized by orjson when it is installed), gzip for large bodies, and
+# ETag/Last-Modified validators derived from the loader's data version so an
+# unchanged resource is answered with 304 before anything is serialized.
+import gzip
+import json
+from datetime import datetime, timezone
+from flask import current_app, request
+
+try:
+    import orjson
+except ImportError:  # optional; the stdlib encoder is used instead
+    orjson = None
+
+GZIP_SUFFIX = '-gzip'
+
+
+def frame_columns(df, index_name='date', exclude=('ticker',)):
+    """Column name -> values for a (date-indexed) frame, without building per-row dicts.
+
+    Dates become 'YYYY-MM-DD' (the index) or ISO timestamps; NaN/NaT become null.
+    """
+    import numpy as np
+    columns = {index_name: _datetimes(df.index.values, 'D')}
+    for name in df.columns:
+        if name in exclude:
+            continue
+        values = df[name].to_numpy()
+        if values.dtype.kind == 'M':
+            columns[name] = _datetimes(values, 's')
+        elif values.dtype.kind in 'fiub':
+            # orjson only takes C-contiguous arrays
+            columns[name] = np.ascontiguousarray(values) if orjson is not None else _nan_to_none(values)
+        else:
+            columns[name] = [None if v is None or v != v else v for v in values.tolist()]
+    return columns
+
+
+def _datetimes(values, unit):
+    import numpy as np
+    text = np.datetime_as_string(values, unit=unit)
+    if np.isnat(values).any():
+        text = np.where(np.isnat(values), None, text)
+    return text.tolist()
+
+
+def _nan_to_none(values):
+    import numpy as np
+    if values.dtype.kind == 'f' and not np.isfinite(values).all():
+        return np.where(np.isfinite(values), values, None).tolist()
+    return values.tolist()
+
+
+def dumps(payload):
+    """Compact JSON bytes; numpy arrays are written directly when orjson is available."""
+    if orjson is not None:
+        return orjson.dumps(payload, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(payload, separators=(',', ':'), allow_nan=False).encode()
+
+
+def data_etag(name, snapshot):
+    """Strong ETag for a resource derived from one snapshot.
+
+    The version counter restarts with the process, so the load time is part of
+    the tag too.
+    """
+    return f'{name}-v{snapshot.version}-{int(snapshot.loaded_at * 1000):x}'
+
+
+def _http_time(timestamp):
+    # HTTP dates have whole-second resolution
+    return datetime.fromtimestamp(int(timestamp), tz=timezone.utc)
+
+
+def _wants_gzip():
+    return 'gzip' in request.headers.get('Accept-Encoding', '')
+
+
+def not_modified(etag, loaded_at):
+    """A 304 response if the request's validators still match, else None.
+
+    The gzipped representation carries its own tag (``etag + '-gzip'``), so
+    either one satisfies If-None-Match. If-Modified-Since is only consulted
+    when no If-None-Match was sent.
+    """
+    matched = None
+    if request.if_none_match:
+        for candidate in (etag + GZIP_SUFFIX, etag):
+            if request.if_none_match.contains(candidate):
+                matched = candidate
+                break
+    elif request.if_modified_since is not None and _http_time(loaded_at) <= request.if_modified_since:
+        matched = etag + GZIP_SUFFIX if _wants_gzip() else etag
+    if matched is None:
+        return None
+    response = current_app.response_class(status=304)
+    _set_validators(response, matched, loaded_at)
+    return response
+
+
+def json_response(payload, etag, loaded_at):
+    """Serialize ``payload`` and attach validators, gzipping large bodies when accepted."""
+    body = dumps(payload)
+    response = current_app.response_class(body, mimetype='application/json')
+    if len(body) >= current_app.config['JSON_GZIP_MIN_BYTES'] and _wants_gzip():
+        response.set_data(gzip.compress(body, compresslevel=current_app.config['JSON_GZIP_LEVEL']))
+        response.headers['Content-Encoding'] = 'gzip'
+        etag += GZIP_SUFFIX
+    _set_validators(response, etag, loaded_at)
+    return response
+
+
+def _set_validators(response, etag, loaded_at):
+    response.set_etag(etag)
+    response.last_modified = _http_time(loaded_at)
+    # Cacheable, but revalidate each time: the data can change on any refresh
+    response.headers['Cache-Control'] = 'no-cache'
+    response.vary.add('Accept-Encoding')
@@ -0,0 +1,170 @@
+# scoring.py
+# IsolationForest inputs shared by the backfill and POST /api/score/<ticker>,
+# which scores new bars against the ticker's model with concurrent requests
+# micro-batched into one decision_function call.
+import io
+import threading
+import time
+from collections import namedtuple
+import numpy as np
+import pandas as pd
+from cache import LRUCache
+from config import MODEL_CACHE_SIZE, SCORE_BATCH_WINDOW_MS, SCORE_MAX_BARS
+from features import FEATURE_COLUMNS, FEATURE_LOOKBACK, compute_features
+from model_cache import model_cache
+
+ISOLATION_CONTAMINATION = 0.01  # tune
+ISOLATION_PARAMS = {'contamination': ISOLATION_CONTAMINATION, 'random_state': 42}
+
+TickerModel = namedtuple('TickerModel', 'scaler model medians')
+
+
+def feature_matrix(X, medians=None):
+    """Feature frame -> float64 matrix with inf/NaN replaced by column medians.
+
+    Returns (matrix, medians); pass the training medians back in to fill new
+    rows the same way the training rows were filled.
+    """
+    X = X.replace([np.inf, -np.inf], np.nan)
+    if medians is None:
+        medians = X.median(skipna=True).fillna(0.0)
+    return X.fillna(medians).to_numpy(dtype='float64'), medians
+
+
+def parse_bars(body, mimetype):
+    """Request body (JSON records / {"bars": [...]} or CSV) -> bars sorted by date.
+
+    Needs 'date' and 'close'; 'volume' is optional. Raises ValueError on bad input.
+    """
+    if mimetype in ('text/csv', 'application/csv'):
+        bars = pd.read_csv(io.BytesIO(body))
+    else:
+        import json
+        try:
+            payload = json.loads(body or b'null')
+        except ValueError:
+            raise ValueError('Body is neither valid JSON nor text/csv')
+        if isinstance(payload, dict):
+            payload = payload.get('bars')
+        if not isinstance(payload, list):
+            raise ValueError('Expected a list of bars or {"bars": [...]}')
+        if not all(isinstance(bar, dict) for bar in payload):
+            raise ValueError('Each bar must be an object with date/close fields')
+        bars = pd.DataFrame.from_records(payload)
+    if bars.empty:
+        raise ValueError('No bars given')
+    if len(bars) > SCORE_MAX_BARS:
+        raise ValueError(f'At most {SCORE_MAX_BARS} bars per request')
+    missing = {'date', 'close'} - set(bars.columns)
+    if missing:
+        raise ValueError(f"Missing column(s): {', '.join(sorted(missing))}")
+    out = pd.DataFrame({
+        'date': pd.to_datetime(bars['date'], errors='coerce'),
+        'close': pd.to_numeric(bars['close'], errors='coerce'),
+        'volume': pd.to_numeric(bars['volume'], errors='coerce') if 'volume' in bars else np.nan,
+    })
+    if out['date'].isna().any():
+        raise ValueError('Unparseable date in bars')
+    # A NaN close would be median-filled and scored as an ordinary bar
+    if out['close'].isna().any():
+        raise ValueError('Missing or non-numeric close in bars')
+    return out.sort_values('date', kind='stable').reset_index(drop=True)
+
+
+def bar_features(history, bars):
+    """Features for ``bars`` with the ticker's preceding FEATURE_LOOKBACK rows in front."""
+    first = np.datetime64(bars['date'].iloc[0])
+    tail = history.iloc[:int(np.searchsorted(history.index.values, first, side='left'))]
+    tail = tail.iloc[-FEATURE_LOOKBACK:]
+    frame = pd.concat([
+        pd.DataFrame({'close': tail['close'].to_numpy(dtype='float64'),
+                      'volume': tail['volume'].to_numpy(dtype='float64')}),
+        bars[['close', 'volume']],
+    ], ignore_index=True)
+    return compute_features(frame)[FEATURE_COLUMNS].iloc[len(tail):]
+
+
+class MicroBatcher:
+    """Coalesce concurrent calls for the same key into one ``fn(key, rows, context)`` call.
+
+    The first caller for a key waits ``window`` seconds for others to join,
+    runs ``fn`` once on the stacked rows and hands each caller its own slice.
+    ``context`` is the first caller's, held by the batch until ``fn`` has run.
+    """
+
+    def __init__(self, fn, window):
+        self.fn = fn
+        self.window = window
+        self.calls = 0
+        self.batches = 0
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def submit(self, key, rows, context=None):
+        with self._lock:
+            self.calls += 1
+            batch = self._pending.get(key)
+            leader = batch is None
+            if leader:
+                batch = self._pending[key] = {'parts': [], 'context': context, 'done': threading.Event()}
+            slot = len(batch['parts'])
+            batch['parts'].append(rows)
+
+        if leader:
+            if self.window:
+                time.sleep(self.window)
+            with self._lock:
+                del self._pending[key]
+                self.batches += 1
+            try:
+                sizes = [len(p) for p in batch['parts']]
+                result = self.fn(key, np.concatenate(batch['parts']), batch['context'])
+                batch['results'] = np.split(result, np.cumsum(sizes)[:-1])
+            except Exception as e:
+                batch['error'] = e
+            finally:
+                batch['done'].set()
+        else:
+            batch['done'].wait()
+
+        if 'error' in batch:
+            raise batch['error']
+        return batch['results'][slot]
+
+    def stats(self):
+        with self._lock:
+            return {'calls': self.calls, 'batches': self.batches,
+                    'calls_per_batch': round(self.calls / self.batches, 2) if self.batches else 0.0}
+
+
+class BarScorer:
+    """Per-(ticker, data version) models over the loader's history, and the batcher in front."""
+
+    def __init__(self, window=SCORE_BATCH_WINDOW_MS / 1000):
+        self.models = LRUCache(MODEL_CACHE_SIZE)
+        self.batcher = MicroBatcher(self._score, window)
+
+    def model(self, ticker, version, history):
+        key = (ticker, version)
+        fitted = self.models.get(key)
+        if fitted is None:
+            X, medians = feature_matrix(compute_features(history[['close', 'volume']].copy())[FEATURE_COLUMNS])
+            scaler, model = model_cache.get(ticker, X, FEATURE_COLUMNS, ISOLATION_PARAMS, source='loader')
+            fitted = TickerModel(scaler, model, medians)
+            self.models.put(key, fitted)
+        return fitted
+
+    def _score(self, key, features, fitted):
+        # The leader's model, not a cache lookup: the LRU may have evicted it by now
+        X = np.where(np.isnan(features), fitted.medians.to_numpy(), features)
+        # Inverted decision_function, as in the backfill: large = more anomalous, > 0 = flagged
+        return -fitted.model.decision_function(fitted.scaler.transform(X))
+
+    def score(self, ticker, version, history, bars):
+        """Anomaly scores for ``bars`` (one per row); flags are ``scores > 0``."""
+        fitted = self.model(ticker, version, history)
+        features = bar_features(history, bars).replace([np.inf, -np.inf], np.nan)
+        return self.batcher.submit((ticker, version), features.to_numpy(dtype='float64'), fitted)
+
+
+scorer = BarScorer()
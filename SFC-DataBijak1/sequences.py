@@ -0,0 +1,82 @@
+# sequences.py
+# Fixed-length windows over a (rows x features) matrix for the LSTM autoencoder
+# path, without building the (N - L + 1) x L x F tensor the notebook's
+# create_sequences() loop materialises. Window i covers rows i .. i + L - 1 and
+# is labelled with (and mapped back to) the date of its last row.
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+SEQUENCE_LENGTH = 30
+BATCH_SIZE = 32
+
+
+def sliding_windows(data, sequence_length=SEQUENCE_LENGTH):
+    """Read-only (N - L + 1, L, F) view of ``data`` (N x F); no values are copied."""
+    data = np.asarray(data)
+    if data.ndim == 1:
+        data = data[:, None]
+    if len(data) < sequence_length:
+        return np.empty((0, sequence_length, data.shape[1]), dtype=data.dtype)
+    # sliding_window_view puts the window axis last: (N - L + 1, F, L)
+    return sliding_window_view(data, sequence_length, axis=0).transpose(0, 2, 1)
+
+
+def window_index(index, sequence_length=SEQUENCE_LENGTH):
+    """Dates (or labels) each window is reported under: the last row it covers."""
+    return index[sequence_length - 1:]
+
+
+def iter_batches(data, sequence_length=SEQUENCE_LENGTH, batch_size=BATCH_SIZE,
+                 shuffle=False, seed=None, drop_last=False, dtype=np.float32):
+    """Yield C-contiguous ``dtype`` mini-batches of windows, copying one batch at a time.
+
+    For Keras, wrap it with tf.data.Dataset.from_generator (autoencoder target
+    = input). With ``shuffle`` the window order is permuted per call.
+    """
+    windows = sliding_windows(np.asarray(data, dtype=dtype), sequence_length)
+    n = len(windows)
+    order = np.random.default_rng(seed).permutation(n) if shuffle else None
+    stop_at = n - n % batch_size if drop_last else n
+    for start in range(0, stop_at, batch_size):
+        stop = min(start + batch_size, n)
+        if order is None:
+            yield np.ascontiguousarray(windows[start:stop])
+        else:
+            yield windows[np.sort(order[start:stop])]
+
+
+def reconstruction_errors(predict, data, sequence_length=SEQUENCE_LENGTH, batch_size=1024):
+    """Mean squared reconstruction error per window, scored batch by batch.
+
+    ``predict`` maps a (B, L, F) batch to its reconstruction (e.g. model.predict).
+    Same values as the notebook's mean over time steps and features.
+    """
+    errors = []
+    for batch in iter_batches(data, sequence_length, batch_size):
+        errors.append(np.square(batch - predict(batch)).mean(axis=(1, 2)))
+    return np.concatenate(errors) if errors else np.empty(0)
+
+
+def error_threshold(train_errors, percentile=95):
+    """Anomaly threshold as a percentile of the training windows' errors."""
+    return float(np.percentile(train_errors, percentile))
+
+
+def window_flags_to_rows(window_flags, sequence_length=SEQUENCE_LENGTH):
+    """Per-row flags: a row is flagged if any window covering it is flagged (O(N))."""
+    flags = np.asarray(window_flags, dtype=np.int64)
+    covered = np.convolve(flags, np.ones(sequence_length, dtype=np.int64))
+    return covered[:len(flags) + sequence_length - 1] > 0
+
+
+def errors_to_flags(errors, index, threshold, sequence_length=SEQUENCE_LENGTH, spread=False):
+    """Map window errors back to per-date anomaly flags as a pandas Series of bool.
+
+    By default each window flags the date of its last row (as in the notebook);
+    with ``spread`` every date inside a flagged window is flagged.
+    """
+    import pandas as pd
+    window_flags = np.asarray(errors) > threshold
+    if spread:
+        return pd.Series(window_flags_to_rows(window_flags, sequence_length), index=index[:len(errors) + sequence_length - 1])
+    return pd.Series(window_flags, index=window_index(index, sequence_length))
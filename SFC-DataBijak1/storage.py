@@ -0,0 +1,46 @@
+# storage.py
+# SQLite connection profile shared by the web app, the backfill and the Mongo import.
+from sqlalchemy import create_engine, event
+from config import SQLITE_PRAGMAS
+from models import db
+
+# Pragmas that change how the file is written; a mode=ro connection must not issue them
+WRITE_PRAGMAS = ('journal_mode', 'synchronous')
+
+
+def use_pragmas(engine, read_only=False):
+    """Run SQLITE_PRAGMAS on every new connection ``engine`` opens (SQLite only)."""
+    if engine.dialect.name != 'sqlite':
+        return engine
+    pragmas = {k: v for k, v in SQLITE_PRAGMAS.items() if not (read_only and k in WRITE_PRAGMAS)}
+
+    @event.listens_for(engine, 'connect')
+    def _apply_pragmas(dbapi_conn, _record):
+        cursor = dbapi_conn.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name}={value}')
+        cursor.close()
+    return engine
+
+
+def init_app(app):
+    """Apply the profile to the app's Flask-SQLAlchemy engine; call before its first connection."""
+    with app.app_context():
+        use_pragmas(db.engine)
+
+
+def read_engine(app):
+    """Read-only engine over the app's SQLite file, with its own connection pool.
+
+    For SQL-backed request handlers (today: GET /api/jobs/<id>), so they never
+    queue behind a writer's pool checkout and cannot take a write lock by
+    accident. Created once per app and kept in app.extensions.
+    """
+    engine = app.extensions.get('sqlite_read_engine')
+    if engine is None:
+        with app.app_context():
+            path = db.engine.url.database  # Flask-SQLAlchemy has resolved it into instance/
+        engine = use_pragmas(create_engine(f'sqlite:///file:{path}?mode=ro&uri=true',
+                                           pool_size=app.config['SQLITE_READ_POOL_SIZE']), read_only=True)
+        app.extensions['sqlite_read_engine'] = engine
+    return engine
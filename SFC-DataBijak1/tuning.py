@@ -0,0 +1,193 @@
+# tuning.py
+# IsolationForest hyperparameter search per ticker (the notebook's detect_anomalies
+# grid), restructured so each forest is grown once:
+#  - contamination only sets the decision threshold (offset_ is the contamination
+#    percentile of the training scores), so it is swept over one set of scores;
+#  - n_estimators options are reached by growing one forest with warm_start;
+#  - tickers x max_samples run in a process pool over memory-mapped scaled matrices.
+import argparse
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from config import SUMMARY_CSV
+from features import compute_features
+
+MAX_SAMPLES_OPTIONS = [0.5, 1.0]
+N_ESTIMATORS_OPTIONS = [100, 200]
+CONTAMINATION_OPTIONS = [0.001, 0.005, 0.01, 0.05, 0.1]
+TUNING_FEATURES = ['close', 'volume', 'returns', 'ma_50', 'ma_200', 'vol_20', 'rsi_14']
+TRAIN_FRACTION = 0.8  # chronological train/test split
+CV_SPLITS = 5
+
+
+def compute_true_anomaly(df, threshold=2.5):
+    """Pseudo-ground truth: extreme returns, volatility or volume, or RSI outside 30-70."""
+    returns_std = df['returns'].std()
+    vol_std = df['vol_20'].std()
+    volume_std = df['volume'].std()
+    rsi_anomaly = (df['rsi_14'] < 30) | (df['rsi_14'] > 70)  # RSI overbought/oversold
+    return ((df['returns'].abs() > threshold * returns_std) |
+            (df['vol_20'].abs() > threshold * vol_std) |
+            (df['volume'].abs() > threshold * volume_std) |
+            rsi_anomaly).astype(int)
+
+
+def prepare_ticker(df):
+    """One ticker's rows (sorted by date) -> scaled train/test matrices and labels."""
+    from sklearn.preprocessing import StandardScaler
+    df = compute_features(df[['close', 'volume']].astype('float64')).fillna(0)
+    n_train = int(len(df) * TRAIN_FRACTION)
+    train, test = df.iloc[:n_train], df.iloc[n_train:]
+    features = [c for c in TUNING_FEATURES if train[c].var() > 1e-6]  # low-variance filter
+    scaler = StandardScaler()
+    return {
+        'X_train': scaler.fit_transform(train[features]),
+        'X_test': scaler.transform(test[features]),
+        'y_train': compute_true_anomaly(train).to_numpy(),
+        'y_test': compute_true_anomaly(test).to_numpy(),
+        'features': features,
+    }
+
+
+def contamination_grid(estimated):
+    return [c for c in CONTAMINATION_OPTIONS if c <= max(0.2, 2 * estimated)]
+
+
+def thresholds(train_scores, contaminations):
+    """IsolationForest.offset_ for each contamination, from one set of training scores."""
+    return np.percentile(train_scores, 100.0 * np.asarray(contaminations))
+
+
+def f1_rows(y, pred):
+    """F1 of each row of a (n_thresholds, n_samples) boolean prediction matrix."""
+    y = np.asarray(y, dtype=bool)
+    tp = (pred & y).sum(axis=1)
+    fp = (pred & ~y).sum(axis=1)
+    fn = (~pred & y).sum(axis=1)
+    denom = 2 * tp + fp + fn
+    return np.divide(2 * tp, denom, out=np.zeros(len(pred)), where=denom > 0)
+
+
+def search_max_samples(X_path, y_path, max_samples, n_estimators_options, contaminations, n_splits=CV_SPLITS):
+    """Mean CV F1 for every (n_estimators, contamination) at one max_samples.
+
+    Per fold, one forest is grown through the n_estimators options with
+    warm_start (same trees as separate fits with random_state=42), and each
+    size is scored once for all contaminations. Returns an
+    (n_estimators, contamination) array.
+    """
+    from sklearn.ensemble import IsolationForest
+    from sklearn.model_selection import TimeSeriesSplit
+    X = np.load(X_path, mmap_mode='r')
+    y = np.load(y_path)
+    n_estimators_options = sorted(n_estimators_options)
+    f1 = np.zeros((len(n_estimators_options), len(contaminations)))
+    for train_idx, val_idx in TimeSeriesSplit(n_splits=n_splits).split(X):
+        X_fit, X_val = X[train_idx], X[val_idx]
+        clf = IsolationForest(max_samples=max_samples, random_state=42, warm_start=True)
+        for i, n_estimators in enumerate(n_estimators_options):
+            clf.set_params(n_estimators=n_estimators).fit(X_fit)
+            offsets = thresholds(clf.score_samples(X_fit), contaminations)
+            pred = clf.score_samples(X_val)[None, :] < offsets[:, None]
+            f1[i] += f1_rows(y[val_idx], pred)
+    return f1 / n_splits
+
+
+def evaluate(X_train, y_train, X_test, y_test, params):
+    """Refit the chosen params on the full train split and score the test split."""
+    from sklearn.ensemble import IsolationForest
+    from sklearn.metrics import auc, precision_recall_curve
+    clf = IsolationForest(random_state=42, **params).fit(X_train)
+    scores = clf.decision_function(X_test)  # higher -> more normal
+    pred = scores < 0
+    y = np.asarray(y_test, dtype=bool)
+    tp, fp = int((pred & y).sum()), int((pred & ~y).sum())
+    fn, tn = int((~pred & y).sum()), int((~pred & ~y).sum())
+    precision = tp / (tp + fp) if tp + fp else 0.0
+    recall = tp / (tp + fn) if tp + fn else 0.0
+    curve_p, curve_r, _ = precision_recall_curve(y, -scores)
+    return {
+        'anomaly_count': int(pred.sum()),
+        'precision': precision,
+        'recall': recall,
+        'f1': 2 * precision * recall / (precision + recall) if precision + recall else 0.0,
+        'auprc': auc(curve_r, curve_p),
+        'fpr': fp / (fp + tn) if fp + tn else 0.0,
+    }
+
+
+def tune(frames, workers=None, max_samples_options=MAX_SAMPLES_OPTIONS,
+         n_estimators_options=N_ESTIMATORS_OPTIONS):
+    """Grid-search every ticker in ``frames`` (ticker -> rows sorted by date).
+
+    Returns the summary table, one row per ticker with its best params, CV F1
+    and test metrics.
+    """
+    workers = workers or os.cpu_count()
+    n_estimators_options = sorted(n_estimators_options)
+    with tempfile.TemporaryDirectory() as tmp, ProcessPoolExecutor(max_workers=workers) as pool:
+        prepared, grids, searches = {}, {}, {}
+        for ticker, df in frames.items():
+            data = prepared[ticker] = prepare_ticker(df)
+            # Written once, memory-mapped by every task for this ticker
+            X_path, y_path = os.path.join(tmp, f'{ticker}_X.npy'), os.path.join(tmp, f'{ticker}_y.npy')
+            np.save(X_path, data['X_train'])
+            np.save(y_path, data['y_train'])
+            grids[ticker] = contamination_grid(data['y_train'].mean())
+            for max_samples in max_samples_options:
+                searches[ticker, max_samples] = pool.submit(
+                    search_max_samples, X_path, y_path, max_samples, n_estimators_options, grids[ticker])
+
+        best = {}
+        for ticker in frames:
+            # Same order and strict '>' as the notebook loop, so ties keep the first config
+            best_score, best_params = -1.0, None
+            for c_i, contamination in enumerate(grids[ticker]):
+                for max_samples in max_samples_options:
+                    f1 = searches[ticker, max_samples].result()
+                    for n_i, n_estimators in enumerate(n_estimators_options):
+                        if f1[n_i, c_i] > best_score:
+                            best_score = f1[n_i, c_i]
+                            best_params = {'contamination': contamination, 'max_samples': max_samples,
+                                           'n_estimators': n_estimators}
+            data = prepared[ticker]
+            best[ticker] = (best_score, best_params, pool.submit(
+                evaluate, data['X_train'], data['y_train'], data['X_test'], data['y_test'], best_params))
+
+        rows = []
+        for ticker, (cv_f1, params, metrics) in best.items():
+            rows.append({'ticker': ticker, 'model': 'Isolation Forest', **metrics.result(),
+                         'estimated_contamination': prepared[ticker]['y_train'].mean(),
+                         'cv_f1': cv_f1, **params})
+    return pd.DataFrame(rows)
+
+
+def load_summary(path=SUMMARY_CSV):
+    """The last tuning summary as a list of dicts, or None if tuning has not been run."""
+    if not os.path.exists(path):
+        return None
+    return pd.read_csv(path).to_dict('records')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Tune IsolationForest per ticker and write the /reports summary.')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='processes for the grid search')
+    parser.add_argument('--out', default=SUMMARY_CSV, help='summary CSV to write')
+    args = parser.parse_args()
+
+    from data_loader import DataLoader, TOP_TICKERS
+    data = DataLoader(columns=['ticker', 'close', 'volume'], tickers=TOP_TICKERS).data
+    frames = {t: df for t, df in data.groupby('ticker', observed=True, sort=False)}
+    started = time.perf_counter()
+    summary = tune(frames, workers=args.workers)
+    summary.to_csv(args.out, index=False)
+    print(summary[['ticker', 'anomaly_count', 'precision', 'recall', 'f1', 'auprc', 'fpr',
+                   'contamination', 'max_samples', 'n_estimators']].round(4).to_string(index=False))
+    print(f"Tuned {len(frames)} tickers in {time.perf_counter() - started:.1f}s; summary written to {args.out}")
+
+
+if __name__ == '__main__':
+    main()